@@ -0,0 +1,222 @@
+import json
+import threading
+
+from .theExceptions import ArangoError, ConnectionError
+
+__all__ = ["ChangeFeed"]
+
+# the types of the markers of the write-ahead log
+COLLECTION_DROP = 2001
+COLLECTION_TRUNCATE = 2004
+TRANSACTION_COMMIT = 2201
+TRANSACTION_ABORT = 2202
+DOCUMENT = 2300
+REMOVE = 2302
+
+class ChangeFeed(object):
+    """Tails the write-ahead log of a database (/_api/wal/tail) in a background thread to keep the document caches of its collections coherent
+    without expiring them. ChangeFeeds are meant to be created by Database.activateChangeFeed().
+
+    Every change to a document removes it from the cache of its collection, with refresh = True a cached document is replaced by its new version instead
+    (the log holds whole documents, nothing is fetched). Created documents are removed from the negative caches (see Collection.activateMissCache()),
+    changed edges from the adjacency caches (see Edges.activateAdjacencyCache()).
+    Truncated or dropped collections have their caches cleared. 'collections' (names) limits the collections whose caches are kept coherent,
+    by default it is all those with a cache. Changes made in a stream transaction are applied once it commits.
+
+    Other caches, such as those of query results, can depend on collections: addListener(fct, collections) calls fct(collectionName, key) for their changes,
+    key is None when a whole collection changed.
+
+    The log is polled every 'pollInterval' seconds, and right away as long as the server has more. If a poll fails or the server no longer has
+    the ticks that follow the last one read, all the caches are cleared, since changes may have been missed. Errors are passed to onError(exception)"""
+
+    def __init__(self, database, collections = None, refresh = False, pollInterval = 1, chunkSize = 1024 * 1024, fromTick = None, onError = None, start = True):
+        self.database = database
+        self.collections = None if collections is None else set(collections)
+        self.refresh = refresh
+        self.pollInterval = pollInterval
+        self.chunkSize = chunkSize
+        self.onError = onError
+        self.listeners = []
+        self.lastError = None
+
+        self.tick = fromTick
+        self.lastScanned = None
+        # the markers of the stream transactions that have not been committed yet
+        self.transactions = {}
+        # collection names by name, id and globally unique id, the ids of the collections that are not loaded,
+        # and the size of the catalog they were read from. The catalog is read at most once per poll
+        self._names = {}
+        self._unknownIds = set()
+        self._namesVersion = None
+        self._namesRefreshed = False
+
+        self._wakeUp = threading.Event()
+        self._stopped = False
+        self._thread = None
+        if start:
+            self.start()
+
+    def start(self):
+        """starts the background thread"""
+        if self.tick is None:
+            self.tick = self.getLastTick()
+        self._thread = threading.Thread(target = self._run, name = "pyArango-change-feed")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """stops the background thread"""
+        self._stopped = True
+        self._wakeUp.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def addListener(self, fct, collections = None):
+        """calls fct(collectionName, key) for every change to the collections whose names are in 'collections' (by default all of them)"""
+        self.listeners.append((fct, None if collections is None else set(collections)))
+
+    def getLastTick(self):
+        """returns the tick of the last change in the log"""
+        r = self.database.connection.session.get("%s/wal/lastTick" % self.database.getURL())
+        data = r.json()
+        if r.status_code >= 400:
+            raise ArangoError(data)
+        return data["tick"]
+
+    def _run(self):
+        while not self._stopped:
+            try:
+                more = self.poll()
+            except Exception as e:
+                self.lastError = e
+                self._invalidateAll()
+                if self.onError is not None:
+                    self.onError(e)
+                more = False
+            if not more:
+                self._wakeUp.wait(self.pollInterval)
+
+    def poll(self):
+        """reads the changes that follow the last tick read and applies them. Returns True if the server has more"""
+        if self.tick is None:
+            self.tick = self.getLastTick()
+        self._namesRefreshed = False
+        collections = self.database.collections
+        if (id(collections), len(collections)) != self._namesVersion:
+            # collections were loaded
+            self._refreshNames()
+        params = {"from" : self.tick, "chunkSize" : self.chunkSize}
+        if self.lastScanned is not None:
+            params["lastScanned"] = self.lastScanned
+        r = self.database.connection.session.get("%s/wal/tail" % self.database.getURL(), params = params)
+        if r.status_code >= 400:
+            try:
+                raise ArangoError(r.json())
+            except (ValueError, KeyError):
+                raise ConnectionError("Unable to tail the write-ahead log", r.url, r.status_code, r.content)
+
+        headers = r.headers
+        if headers.get("x-arango-replication-frompresent", "true") == "false":
+            # ticks were collected before they could be read
+            self._invalidateAll()
+
+        if r.status_code != 204:
+            for line in r.content.decode("utf-8").splitlines():
+                if line.strip():
+                    self._apply(json.loads(line))
+
+        lastIncluded = headers.get("x-arango-replication-lastincluded", "0")
+        if lastIncluded != "0":
+            self.tick = lastIncluded
+        self.lastScanned = headers.get("x-arango-replication-lastscanned", self.lastScanned)
+        return headers.get("x-arango-replication-checkmore", "false") == "true"
+
+    def _apply(self, marker):
+        markerType = marker.get("type")
+        tid = str(marker.get("tid", "0"))
+        if markerType == TRANSACTION_COMMIT:
+            for m in self.transactions.pop(tid, []):
+                self._change(m)
+        elif markerType == TRANSACTION_ABORT:
+            self.transactions.pop(tid, None)
+        elif markerType in (DOCUMENT, REMOVE) and tid != "0":
+            self.transactions.setdefault(tid, []).append(marker)
+        elif markerType in (DOCUMENT, REMOVE, COLLECTION_DROP, COLLECTION_TRUNCATE):
+            self._change(marker)
+
+    def _refreshNames(self):
+        """maps the names, ids and globally unique ids of the collections of the database to their names"""
+        collections = self.database.collections
+        names = {}
+        for name, collection in list(collections.items()):
+            for ident in (getattr(collection, "id", None), getattr(collection, "globallyUniqueId", None), name):
+                if ident is not None:
+                    names[str(ident)] = name
+        self._names = names
+        self._unknownIds.difference_update(names)
+        self._namesVersion = (id(collections), len(collections))
+        self._namesRefreshed = True
+
+    def _collectionName(self, marker):
+        for k in ("cname", "cuid", "cid"):
+            if k in marker:
+                ident = str(marker[k])
+                name = self._names.get(ident)
+                if name is None and ident not in self._unknownIds:
+                    if not self._namesRefreshed:
+                        # a collection replaced since the last refresh
+                        self._refreshNames()
+                        name = self._names.get(ident)
+                    if name is None:
+                        self._unknownIds.add(ident)
+                if name is not None and name in self.database.collections:
+                    return name
+        return None
+
+    def _change(self, marker):
+        name = self._collectionName(marker)
+        if name is None:
+            return
+        data = marker.get("data") or {}
+        key = data.get("_key") if marker["type"] in (DOCUMENT, REMOVE) else None
+
+        if self.collections is None or name in self.collections:
+            collection = self.database.collections[name]
+            cache = getattr(collection, "documentCache", None)
+            if cache is not None:
+                if key is None:
+                    cache.clear()
+                elif self.refresh and marker["type"] == DOCUMENT:
+                    cached = cache.peek(key)
+                    if cached is not None and cached._rev != data.get("_rev"):
+                        cache.cache(collection.documentClass(collection, data))
+                else:
+                    cache.discard(key)
+            missCache = getattr(collection, "missCache", None)
+            if missCache is not None and key is not None and marker["type"] == DOCUMENT:
+                missCache.discard(key)
+            adjacencyCache = getattr(collection, "adjacencyCache", None)
+            if adjacencyCache is not None:
+                if key is None:
+                    adjacencyCache.clear()
+                else:
+                    # removal markers do not have the vertices of the edge, the entries that hold it are enough
+                    adjacencyCache.discardEdge("%s/%s" % (name, key), data.get("_from"), data.get("_to"))
+
+        for fct, collections in self.listeners:
+            if collections is None or name in collections:
+                fct(name, key)
+
+    def _invalidateAll(self):
+        for name, collection in list(self.database.collections.items()):
+            if self.collections is None or name in self.collections:
+                if getattr(collection, "documentCache", None) is not None:
+                    collection.documentCache.clear()
+                if getattr(collection, "adjacencyCache", None) is not None:
+                    collection.adjacencyCache.clear()
+                # documents created during the gap must not be reported missing
+                if getattr(collection, "missCache", None) is not None:
+                    collection.missCache.clear()
+            for fct, collections in self.listeners:
+                if collections is None or name in collections:
+                    fct(name, None)
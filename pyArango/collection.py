@@ -1,17 +1,26 @@
+import copy
 import json
+import sys
+import threading
+import time
 import types
+from collections import OrderedDict
 from future.utils import with_metaclass
 from enum import Enum
 from . import consts as CONST
 
-from .document import Document, Edge
+from .document import DocumentStore, DictStore, LazyDictStore, Document, Edge, SchemalessDocument, SchemalessEdge, _copyValue
 
-from .theExceptions import ValidationError, SchemaViolation, CreationError, UpdateError, DeletionError, InvalidDocument, ExportError, DocumentNotFoundError, ArangoError, BulkOperationError, IndexError
+from .theExceptions import ConnectionError, ValidationError, SchemaViolation, CreationError, UpdateError, DeletionError, InvalidDocument, ExportError, DocumentNotFoundError, ArangoError, BulkOperationError, IndexError, PreconditionFailedError
 
 from .query import SimpleQuery
+from .lazyjson import loadsLazy, scanArray
+from .sharedcache import SharedDocumentCache
 from .index import Index
+from .import_job import ImportJob
+from .warmup import CacheWarmUp
 
-__all__ = ["Collection", "Edges", "Field", "DocumentCache", "CachedDoc", "Collection_metaclass", "getCollectionClass", "isCollection", "isDocumentCollection", "isEdgeCollection", "getCollectionClasses"]
+__all__ = ["Collection", "Edges", "Field", "DocumentCache", "CachedDoc", "AdjacencyCache", "DocumentList", "Collection_metaclass", "getCollectionClass", "isCollection", "isDocumentCollection", "isEdgeCollection", "getCollectionClasses"]
 
 class BulkMode(Enum):
     NONE = 0
@@ -20,12 +29,22 @@ class BulkMode(Enum):
     DELETE = 3
 
 class CachedDoc(object):
-    """A cached document."""
-    def __init__(self, document, prev, nextDoc):
-        self.prev = prev
+    """A cached document, with its estimated size in bytes, its ttl and the time at which it expires"""
+
+    __slots__ = ("document", "_key", "size", "ttl", "expires")
+
+    def __init__(self, document, size = 0, ttl = None):
         self.document = document
-        self.nextDoc = nextDoc
         self._key = document._key
+        self.size = size
+        self.ttl = ttl
+        self.expires = None
+        self.rearm()
+
+    def rearm(self):
+        """the document expires 'ttl' seconds from now"""
+        if self.ttl is not None:
+            self.expires = time.monotonic() + self.ttl
 
     def __getitem__(self, k):
         return self.document[k]
@@ -33,88 +52,398 @@ class CachedDoc(object):
     def __setitem__(self, k, v):
         self.document[k] = v
 
-    def __getattribute__(self, k):
-        try:
-            return object.__getattribute__(self, k)
-        except Exception as e1:
-            try:
-                return getattr(self.document, k)
-            except Exception as e2:
-                raise e2
+    def __getattr__(self, k):
+        return getattr(self.document, k)
+
+def _valueSize(value):
+    """an estimation of the memory taken by a json value, in bytes"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for k, v in dict.items(value):
+            size += sys.getsizeof(k) + _valueSize(v)
+    elif isinstance(value, list):
+        for v in list.__iter__(value):
+            size += _valueSize(v)
+    elif isinstance(value, (DocumentStore, DictStore)):
+        size += _valueSize(value.store)
+        if isinstance(value, LazyDictStore) and value.text is not None:
+            size += sys.getsizeof(value.text)
+    return size
+
+def documentSize(document):
+    """an estimation of the memory taken by a document and its values, in bytes"""
+    store = getattr(document, "_store", None)
+    if store is None:
+        return sys.getsizeof(document)
+    return sys.getsizeof(document) + _valueSize(store)
 
 class DocumentCache(object):
-    """Document cache for collection, with insert, deletes and updates in O(1)."""
-
-    def __init__(self, cacheSize):
+    """A thread safe LRU cache of documents, with insert, deletes, updates and retrievals in O(1).
+    Documents are evicted, least recently used first, once the cache holds more than 'cacheSize' documents or when their estimated sizes add up to more than 'maxBytes'.
+    Either limit can be None. With a 'ttl' (in seconds), documents expire that long after being cached, cache() can also set the ttl of a single document.
+    With revalidate = True, expired documents are kept: 'ttl' is how long they are fresh, after that the collection asks the database whether
+    they are still at the same revision (a conditional request) before serving them again. Without a 'ttl' they are revalidated every time.
+    getStats() returns the hits, misses, revalidations, evictions and expirations counters."""
+
+    def __init__(self, cacheSize = None, maxBytes = None, ttl = None, sizeFunction = documentSize, revalidate = False):
         self.cacheSize = cacheSize
-        self.cacheStore = {}
-        self.head = None
-        self.tail = None
-
-    def cache(self, doc):
-        if doc._key in self.cacheStore:
-            ret = self.cacheStore[doc._key]
-            if ret.prev is not None:
-                ret.prev.nextDoc = ret.nextDoc
-                self.head.prev = ret
-                ret.nextDoc = self.head
-                self.head = ret
-            return self.head
-        else:
-            if len(self.cacheStore) == 0:
-                ret = CachedDoc(doc, prev = None, nextDoc = None)
-                self.head = ret
-                self.tail = self.head
-                self.cacheStore[doc._key] = ret
+        self.maxBytes = maxBytes
+        self.revalidate = revalidate
+        if revalidate and ttl is None:
+            ttl = 0
+        self.ttl = ttl
+        self.sizeFunction = sizeFunction
+        # from the least to the most recently used
+        self.cacheStore = OrderedDict()
+        self.totalBytes = 0
+        self.lock = threading.RLock()
+        self.resetStats()
+
+    def resetStats(self):
+        """sets the hits, misses, revalidations, evictions and expirations counters back to 0"""
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def getStats(self):
+        """returns the counters of the cache, its size and hit rate: the share of the lookups served by the cache, revalidated or not.
+        The size in bytes is only tracked for caches with a 'maxBytes'"""
+        with self.lock:
+            lookups = self.hits + self.revalidations + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "hitRate": float(self.hits + self.revalidations) / lookups if lookups > 0 else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "documents": len(self.cacheStore),
+                "bytes": self.totalBytes,
+            }
+
+    def cache(self, doc, ttl = None):
+        """puts the document in the cache, or refreshes it, as the most recently used. 'ttl' overrides the ttl of the cache for this document"""
+        if ttl is None:
+            ttl = self.ttl
+        size = 0
+        if self.maxBytes is not None:
+            size = self.sizeFunction(doc)
+
+        with self.lock:
+            old = self.cacheStore.pop(doc._key, None)
+            if old is not None:
+                self.totalBytes -= old.size
+            self.cacheStore[doc._key] = CachedDoc(doc, size, ttl)
+            self.totalBytes += size
+
+            while self.cacheStore and ((self.cacheSize is not None and len(self.cacheStore) > self.cacheSize) or (self.maxBytes is not None and self.totalBytes > self.maxBytes)):
+                _, evicted = self.cacheStore.popitem(last = False)
+                self.totalBytes -= evicted.size
+                self.evictions += 1
+
+    def _get(self, _key):
+        entry = self.cacheStore.get(_key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires is not None and entry.expires <= time.monotonic():
+            if not self.revalidate:
+                del self.cacheStore[_key]
+                self.totalBytes -= entry.size
+                self.expirations += 1
+            self.misses += 1
+            return None
+        self.cacheStore.move_to_end(_key)
+        self.hits += 1
+        return entry.document
+
+    def lookup(self, _key):
+        """returns (document, fresh). For a revalidating cache, the document is returned even if it is stale, fresh is then False
+        and nothing is counted until the outcome of the revalidation is reported with refresh() or replace(). (None, False) for a miss"""
+        with self.lock:
+            entry = self.cacheStore.get(_key)
+            if entry is not None and self.revalidate and entry.expires <= time.monotonic():
+                self.cacheStore.move_to_end(_key)
+                return entry.document, False
+            doc = self._get(_key)
+        return doc, doc is not None
+
+    def peek(self, _key):
+        """returns the document '_key', even if it is stale, or None. It is not marked as used and nothing is counted"""
+        with self.lock:
+            entry = self.cacheStore.get(_key)
+            if entry is None:
+                return None
+            return entry.document
+
+    def refresh(self, _key):
+        """reports that the database still has the cached revision of the document '_key': it is fresh again for 'ttl' seconds"""
+        with self.lock:
+            entry = self.cacheStore.get(_key)
+            if entry is not None:
+                entry.rearm()
+                self.cacheStore.move_to_end(_key)
+            self.revalidations += 1
+
+    def replace(self, _key, doc):
+        """reports that the document '_key' changed in the database, 'doc' is its new version or None if it was deleted.
+        A miss is counted if a revision of the document was cached, the misses of the documents that were not are counted by their lookup"""
+        with self.lock:
+            entry = self.cacheStore.get(_key)
+            if entry is not None:
+                self.misses += 1
+            if doc is None:
+                self.discard(_key)
             else:
-                if len(self.cacheStore) >= self.cacheSize:
-                    del(self.cacheStore[self.tail._key])
-                    self.tail = self.tail.prev
-                    self.tail.nextDoc = None
+                self.cache(doc, entry.ttl if entry is not None else None)
+
+    def get(self, _key, default = None):
+        """returns the document '_key' and marks it as the most recently used, 'default' if it is not in the cache or expired"""
+        with self.lock:
+            doc = self._get(_key)
+        if doc is None:
+            return default
+        return doc
 
-                ret = CachedDoc(doc, prev = None, nextDoc = self.head)
-                self.head.prev = ret
-                self.head = self.head.prev
-                self.cacheStore[doc._key] = ret
+    def __getitem__(self, _key):
+        with self.lock:
+            doc = self._get(_key)
+        if doc is None:
+            raise KeyError("Document with _key %s is not available in cache" % _key)
+        return doc
+
+    def __contains__(self, _key):
+        """returns True if the document '_key' is in the cache and fresh, without marking it as used nor counting a hit"""
+        with self.lock:
+            entry = self.cacheStore.get(_key)
+            return entry is not None and (entry.expires is None or entry.expires > time.monotonic())
+
+    def __len__(self):
+        return len(self.cacheStore)
 
     def delete(self, _key):
         """Remove a document from the cache."""
-        try:
-            doc = self.cacheStore[_key]
-            doc.prev.nextDoc = doc.nextDoc
-            doc.nextDoc.prev = doc.prev
-            del(self.cacheStore[_key])
-        except KeyError:
-            raise KeyError("Document with _key %s is not available in cache" % _key)
+        with self.lock:
+            try:
+                entry = self.cacheStore.pop(_key)
+            except KeyError:
+                raise KeyError("Document with _key %s is not available in cache" % _key)
+            self.totalBytes -= entry.size
+
+    def discard(self, _key):
+        """Remove a document from the cache if it is there."""
+        with self.lock:
+            entry = self.cacheStore.pop(_key, None)
+            if entry is not None:
+                self.totalBytes -= entry.size
+
+    def written(self, doc):
+        """reports that 'doc' was saved or patched: another object cached for the same document is stale and removed"""
+        with self.lock:
+            entry = self.cacheStore.get(doc._key)
+            if entry is not None and entry.document is not doc:
+                del self.cacheStore[doc._key]
+                self.totalBytes -= entry.size
+
+    def clear(self):
+        """Remove all the documents from the cache."""
+        with self.lock:
+            self.cacheStore.clear()
+            self.totalBytes = 0
+
+    @property
+    def head(self):
+        """the most recently used document"""
+        with self.lock:
+            if not self.cacheStore:
+                return None
+            return next(reversed(self.cacheStore.values())).document
+
+    @property
+    def tail(self):
+        """the least recently used document, the next to be evicted"""
+        with self.lock:
+            if not self.cacheStore:
+                return None
+            return next(iter(self.cacheStore.values())).document
 
     def getChain(self):
-        """Return a list of keys representing the chain of documents."""
-        l = []
-        h = self.head
-        while h:
-            l.append(h._key)
-            h = h.nextDoc
-        return l
+        """Return a list of keys representing the chain of documents, from the most to the least recently used."""
+        with self.lock:
+            return list(reversed(self.cacheStore.keys()))
 
     def stringify(self) -> str:
         """Return a pretty string of 'getChain()'."""
-        l = []
-        h = self.head
-        while h:
-            l.append(str(h._key))
-            h = h.nextDoc
-        return "<->".join(l)
+        return "<->".join(str(k) for k in self.getChain())
 
-    def __getitem__(self, _key):
-        try:
-            ret = self.cacheStore[_key]
-            self.cache(ret)
-            return ret
-        except KeyError:
-            raise KeyError("Document with _key %s is not available in cache" % _key)
+    def __repr__(self):
+        return "[DocumentCache, size: %s, maxBytes: %s, full: %d, bytes: %d]" % (self.cacheSize, self.maxBytes, len(self.cacheStore), self.totalBytes)
+
+class MissCache(object):
+    """A thread safe cache of the keys of recently missing documents: they are assumed to still be missing for 'ttl' seconds.
+    It holds at most 'cacheSize' keys, the oldest ones are forgotten first"""
+
+    def __init__(self, ttl = 1, cacheSize = 100000):
+        self.ttl = ttl
+        self.cacheSize = cacheSize
+        # from the oldest to the most recent miss
+        self.keys = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+
+    def add(self, _key):
+        """records that there is no document '_key'"""
+        with self.lock:
+            self.keys.pop(_key, None)
+            self.keys[_key] = time.monotonic() + self.ttl
+            if len(self.keys) > self.cacheSize:
+                self.keys.popitem(last = False)
+
+    def __contains__(self, _key):
+        """returns True if '_key' was missing less than ttl seconds ago"""
+        with self.lock:
+            expires = self.keys.get(_key)
+            if expires is None:
+                return False
+            if expires <= time.monotonic():
+                # the oldest misses expire first
+                now = time.monotonic()
+                while self.keys and next(iter(self.keys.values())) <= now:
+                    self.keys.popitem(last = False)
+                return False
+            self.hits += 1
+            return True
+
+    def __len__(self):
+        return len(self.keys)
+
+    def discard(self, _key):
+        """forgets a miss, for instance because the document was created"""
+        with self.lock:
+            self.keys.pop(_key, None)
+
+    def clear(self):
+        with self.lock:
+            self.keys.clear()
+
+    def __repr__(self):
+        return "[MissCache, ttl: %s, keys: %d]" % (self.ttl, len(self.keys))
+
+class DocumentList(list):
+    """The list of documents returned by Collection.getMany(), in the order of the keys with None for missing documents.
+    'hits' is the number of keys served by the caches, 'misses' the number of keys that were fetched. Repeated keys are counted once"""
+
+    def __init__(self, documents = (), hits = 0, misses = 0):
+        list.__init__(self, documents)
+        self.hits = hits
+        self.misses = misses
+
+    def __repr__(self):
+        return "<DocumentList of %d documents, hits: %d, misses: %d>" % (len(self), self.hits, self.misses)
+
+class AdjacencyCache(object):
+    """A thread safe LRU cache of the edges of vertices, by vertex _id and direction ("in", "out" or "any"), for repeated graph walks.
+    It holds the edges of at most 'cacheSize' (vertex, direction) pairs, least recently used first out, entries expire after 'ttl' seconds (never if None).
+    Edges are kept as the json returned by the database. An edge that changes is removed from all the entries that hold it, as well as
+    the entries of its _from and _to vertices. getStats() returns the hits, misses, evictions and expirations counters"""
+
+    def __init__(self, cacheSize = 10000, ttl = None):
+        self.cacheSize = cacheSize
+        self.ttl = ttl
+        # (vertex _id, direction) -> (edges, expires), from the least to the most recently used
+        self.entries = OrderedDict()
+        # edge _id -> the entries that hold it
+        self.edgeEntries = {}
+        self.lock = threading.Lock()
+        self.resetStats()
+
+    def resetStats(self):
+        """sets the hits, misses, evictions and expirations counters back to 0"""
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def getStats(self):
+        """returns the counters of the cache, its number of entries and hit rate"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": float(self.hits) / lookups if lookups > 0 else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self.entries),
+            }
+
+    def _remove(self, entryKey):
+        edges, expires = self.entries.pop(entryKey)
+        for e in edges:
+            entryKeys = self.edgeEntries.get(e["_id"])
+            if entryKeys is not None:
+                entryKeys.discard(entryKey)
+                if not entryKeys:
+                    del self.edgeEntries[e["_id"]]
+
+    def get(self, vertexId, direction):
+        """returns the list of the edges of 'vertexId' in 'direction', or None if they are not cached"""
+        entryKey = (vertexId, direction)
+        with self.lock:
+            entry = self.entries.get(entryKey)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                self._remove(entryKey)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(entryKey)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, vertexId, direction, edges):
+        """caches the list of the edges of 'vertexId' in 'direction', as the most recently used"""
+        entryKey = (vertexId, direction)
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self.lock:
+            if entryKey in self.entries:
+                self._remove(entryKey)
+            self.entries[entryKey] = (edges, expires)
+            for e in edges:
+                self.edgeEntries.setdefault(e["_id"], set()).add(entryKey)
+            while self.cacheSize is not None and len(self.entries) > self.cacheSize:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def discardVertex(self, vertexId):
+        """removes the edges of 'vertexId', in all directions"""
+        with self.lock:
+            for direction in ("in", "out", "any"):
+                if (vertexId, direction) in self.entries:
+                    self._remove((vertexId, direction))
+
+    def discardEdge(self, edgeId, fromId = None, toId = None):
+        """removes the entries that hold the edge 'edgeId' and those of the vertices 'fromId' and 'toId', for an edge that was created, modified or deleted"""
+        with self.lock:
+            for entryKey in list(self.edgeEntries.get(edgeId, ())):
+                self._remove(entryKey)
+        for vertexId in (fromId, toId):
+            if vertexId is not None:
+                self.discardVertex(vertexId)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.edgeEntries.clear()
+
+    def __len__(self):
+        return len(self.entries)
 
     def __repr__(self):
-        return "[DocumentCache, size: %d, full: %d]" %(self.cacheSize, len(self.cacheStore))
+        return "[AdjacencyCache, entries: %d/%s]" % (len(self.entries), self.cacheSize)
 
 class Field(object):
     """The class for defining pyArango fields."""
@@ -139,6 +468,151 @@ class Field(object):
             strv.append(str(v))
         return "<Field, validators: '%s'>" % ', '.join(strv)
 
+# the count of projection queries that skip documents without a limit
+_MAX_LIMIT = 2**53 - 1
+
+# the types of the default values that can be shared between documents
+_immutableTypes = frozenset((str, bytes, int, float, bool, complex))
+# the kinds of the values of default templates that are computed for every document
+_SUB_TEMPLATE, _MUTABLE, _FACTORY = "sub", "mutable", "factory"
+
+class CompiledSchema(object):
+    """The _fields of a collection class flattened by Collection_metaclass. Every sub document of the schema becomes a (parent, name, fields, allowed keys) entry
+    and every field keeps the list of its validators' validate methods, validating a document is a loop over these entries.
+    The default document is also precomputed, only the callable defaults are evaluated for every new document."""
+
+    def __init__(self, collectionClass):
+        self.collectionClass = collectionClass
+        self.allowForeignFields = collectionClass._validation['allow_foreign_fields']
+        self.checks = {}
+        nodes = []
+        self._flatten((), collectionClass._fields, nodes)
+        self.defaultsError = None
+        self.defaults = self._compileDefaults(collectionClass._fields)
+
+        # the entries of the sub tree starting at every path, parents are positions in the same list
+        self.subTrees = {}
+        for path, _, _ in nodes:
+            positions = {}
+            subTree = []
+            for nodePath, leaves, keys in nodes:
+                if nodePath[:len(path)] == path:
+                    positions[nodePath] = len(subTree)
+                    if nodePath == path:
+                        subTree.append((-1, None, leaves, keys))
+                    else:
+                        subTree.append((positions[nodePath[:-1]], nodePath[-1], leaves, keys))
+            self.subTrees[path] = tuple(subTree)
+
+    def _flatten(self, path, fields, nodes):
+        leaves = []
+        for name, field in fields.items():
+            if isinstance(field, dict):
+                continue
+            if isinstance(field, (list, tuple)) or not hasattr(field, "validate"):
+                # list fields have no validators, invalid fields are reported by defaultDocument()
+                leaves.append((name, ()))
+            else:
+                if type(field).validate is Field.validate:
+                    checks = tuple(v.validate for v in field.validators)
+                else:
+                    checks = (field.validate, )
+                self.checks[path + (name, )] = checks
+                leaves.append((name, checks))
+        nodes.append((path, tuple(leaves), frozenset(fields)))
+
+        for name, field in fields.items():
+            if isinstance(field, dict):
+                self._flatten(path + (name, ), field, nodes)
+
+    def _compileDefaults(self, fields):
+        """Return the template of the default document of 'fields': (values, dynamic values).
+        'values' holds every field in order with the immutable defaults, the dynamic values are (name, kind, value) entries in the same order,
+        for sub documents (their own template), mutable defaults (copied) and callable defaults (called)"""
+        values = {}
+        dynamic = []
+        for name, field in fields.items():
+            values[name] = None
+            if isinstance(field, dict):
+                dynamic.append((name, _SUB_TEMPLATE, self._compileDefaults(field)))
+            elif isinstance(field, (list, tuple)):
+                dynamic.append((name, _MUTABLE, []))
+            elif isinstance(field, Field):
+                if callable(field.default):
+                    dynamic.append((name, _FACTORY, field.default))
+                elif field.default is None or type(field.default) in _immutableTypes:
+                    values[name] = field.default
+                else:
+                    dynamic.append((name, _MUTABLE, field.default))
+            elif self.defaultsError is None:
+                self.defaultsError = ValueError("Field '%s' is of invalid type '%s'" % (name, type(field)))
+        return values, tuple(dynamic)
+
+    def defaultDocument(self):
+        """Return a new default document, the static values are copied from the template and the callable defaults are called"""
+        if self.defaultsError is not None:
+            raise self.defaultsError
+        return _buildDefaults(self.defaults)
+
+    def validateField(self, path, name, value):
+        """Raise a ValidationError if 'value' is not valid for the field 'name' of the sub document at 'path'."""
+        for check in self.checks.get(path + (name, ), ()):
+            try:
+                check(value)
+            except ValidationError as e:
+                raise ValidationError("'%s' -> %s" % (name, str(e)))
+        return True
+
+    def validate(self, dct, path = ()):
+        """Return the errors {field: message} of the document (or of the sub document at 'path') whose values are in 'dct'.
+        Missing fields are not validated."""
+        errors = {}
+        values = []
+        for parent, subName, leaves, keys in self.subTrees.get(path, ()):
+            if parent < 0:
+                value = dct
+            else:
+                value = values[parent].get(subName)
+                if type(value) is not dict:
+                    if value is None:
+                        value = {}
+                    elif isinstance(value, DocumentStore):
+                        value = value.store
+                    elif not isinstance(value, dict):
+                        raise ValueError("Validator expected a sub document for field '%s', got '%s' instead" % (subName, value))
+            values.append(value)
+
+            for name, checks in leaves:
+                if name in value:
+                    v = value[name]
+                    if type(v) is DocumentStore:
+                        v = v.getStore()
+                    try:
+                        for check in checks:
+                            check(v)
+                    except ValidationError as e:
+                        errors[name] = str(ValidationError("'%s' -> %s" % (name, str(e))))
+
+            if not self.allowForeignFields:
+                for name in value:
+                    if name not in keys:
+                        errors[name] = str(SchemaViolation(self.collectionClass, name))
+        return errors
+
+def _buildDefaults(template):
+    values, dynamic = template
+    dct = values.copy()
+    for name, kind, value in dynamic:
+        if kind is _SUB_TEMPLATE:
+            dct[name] = _buildDefaults(value)
+        elif kind is _FACTORY:
+            dct[name] = value()
+        elif type(value) is list or type(value) is dict:
+            dct[name] = _copyValue(value)
+        else:
+            dct[name] = copy.deepcopy(value)
+    return dct
+
 class Collection_metaclass(type):
     """The metaclass that takes care of keeping a register of all collection types."""
     collectionClasses = {}
@@ -169,6 +643,8 @@ class Collection_metaclass(type):
 
         check_set_ConfigDict('_validation')
         clsObj = type.__new__(cls, name, bases, attrs)
+        if hasattr(clsObj, "_fields"):
+            clsObj._compiledFields = CompiledSchema(clsObj)
         Collection_metaclass.collectionClasses[name] = clsObj
 
         return clsObj
@@ -224,8 +700,23 @@ def getCollectionClasses() -> bool:
     """Return a dictionary of all defined collection classes."""
     return Collection_metaclass.collectionClasses
 
+class _lazyAttribute(object):
+    """An attribute computed by 'fct(instance)' on first access, it is then stored in the instance and this is no longer called"""
+
+    def __init__(self, fct):
+        self.fct = fct
+        self.name = fct.__name__
+        self.__doc__ = fct.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = instance.__dict__[self.name] = self.fct(instance)
+        return value
+
 class Collection(with_metaclass(Collection_metaclass, object)):
-    """A document collection. Collections are meant to be instantiated by databases."""
+    """A document collection. Collections are meant to be instantiated by databases.
+    They are lightweight handles: the indexes and the state of bulk operations are only set up when they are used"""
     # here you specify the fields that you want for the documents in your collection
     _fields = {}
 
@@ -238,6 +729,16 @@ class Collection(with_metaclass(Collection_metaclass, object)):
 
     arangoPrivates = ["_id", "_key", "_rev"]
 
+    # defaults shared by all collections until they are set
+    documentCache = None
+    missCache = None
+    _isBulkInProgress = False
+    _bulkSize = 0
+    _bulkCache = ()
+    _bulkMode = BulkMode.NONE
+    # True once getIndexes() was called
+    _indexesLoaded = False
+
     def __init__(self, database, jsonData):
 
         self.database = database
@@ -246,10 +747,21 @@ class Collection(with_metaclass(Collection_metaclass, object)):
         for k in jsonData:
             setattr(self, k, jsonData[k])
 
-        self.documentCache = None
+        self.documentClass = self._documentClass()
 
-        self.documentClass = Document
-        self.indexes = {
+    @classmethod
+    def _documentClass(cls):
+        try:
+            # computed once per class
+            return cls.__dict__["_defaultDocumentClass"]
+        except KeyError:
+            cls._defaultDocumentClass = SchemalessDocument if cls.isSchemaless() else Document
+            return cls._defaultDocumentClass
+
+    @_lazyAttribute
+    def indexes(self):
+        """the indexes of the collection by type and id, filled by getIndexes() and the ensure*Index() functions"""
+        return {
             "primary" : {},
             "hash" : {},
             "skiplist" : {},
@@ -258,14 +770,15 @@ class Collection(with_metaclass(Collection_metaclass, object)):
             "geo" : {},
             "fulltext" : {},
         }
-        self.indexes_by_name = {}
-        # self.defaultDocument = None #getDefaultDoc(self._fields, {})
-        self._isBulkInProgress = False
-        self._bulkSize = 0
-        self._bulkCache = []
-        self._bulkMode = BulkMode.NONE
+
+    @_lazyAttribute
+    def indexes_by_name(self):
+        return {}
 
     def getDefaultDocument(self, fields=None, dct=None):
+        """Return a new document filled with the default values of 'fields', the schema of the collection by default"""
+        if fields is None and dct is None:
+            return self._compiledFields.defaultDocument()
         if dct is None:
             dct = {}
         if fields is None:
@@ -295,6 +808,7 @@ class Collection(with_metaclass(Collection_metaclass, object)):
     def getIndexes(self):
         """Fill 'self.indexes' with all the indexes associated with the collection and return it."""
         self.indexes_by_name = {}
+        self._indexesLoaded = True
         url = "%s/index" % self.database.getURL()
         r = self.connection.session.get(url, params = {"collection": self.name})
         data = r.json()
@@ -307,20 +821,63 @@ class Collection(with_metaclass(Collection_metaclass, object)):
         return self.indexes
 
     def getIndex(self, name):
+        """Return the index 'name', the indexes are fetched if none is known yet"""
+        if not self._indexesLoaded and len(self.indexes_by_name) == 0:
+            self.getIndexes()
         if len(self.indexes_by_name) == 0:
             raise IndexError("named indices unsupported")
         return self.indexes_by_name[name]
 
-    def activateCache(self, cacheSize):
-        """Activate the caching system.
-
-        Cached documents are only available through the __getitem__ interface."""
-        self.documentCache = DocumentCache(cacheSize)
+    def activateCache(self, cacheSize = None, maxBytes = None, ttl = None, revalidate = False, backend = None):
+        """Activate the caching system, an LRU cache of at most 'cacheSize' documents and/or 'maxBytes' bytes (estimated), whose documents expire after 'ttl' seconds.
+        With revalidate = True documents do not expire, they are revalidated after 'ttl' seconds instead: the database only sends them again
+        if their revision changed. fetchDocuments() then also only downloads the cached documents that changed.
+        With a 'backend' (see sharedcache), documents are cached in it instead of in this process, 'cacheSize' and 'maxBytes' are then those of the backend.
+
+        Cached documents are only available through the __getitem__ interface. The cache is returned, its getStats() gives its hit rate."""
+        if backend is not None:
+            if cacheSize is not None or maxBytes is not None:
+                raise ValueError("The size of a cache with a backend is set by the backend")
+            self.documentCache = SharedDocumentCache(self, backend, ttl = ttl, revalidate = revalidate)
+            return self.documentCache
+        self.documentCache = DocumentCache(cacheSize, maxBytes = maxBytes, ttl = ttl, revalidate = revalidate)
+        return self.documentCache
 
     def deactivateCache(self):
         """Deactivate the caching system."""
         self.documentCache = None
 
+    def _documentWritten(self, document):
+        """keeps the caches coherent once 'document' was saved or patched"""
+        if self.documentCache is not None:
+            self.documentCache.written(document)
+        if self.missCache is not None:
+            self.missCache.discard(document._key)
+
+    def _documentsCreated(self, docs):
+        """forgets the misses of 'docs' (dictionaries or documents), that were just created. Documents without a _key cannot have been missed"""
+        if self.missCache is not None:
+            for d in docs:
+                key = d.get("_key") if isinstance(d, dict) else getattr(d, "_key", None)
+                if key is not None:
+                    self.missCache.discard(str(key))
+
+    def _documentDeleted(self, _key):
+        """keeps the caches coherent once the document '_key' was deleted"""
+        if self.documentCache is not None:
+            self.documentCache.discard(_key)
+
+    def warmCache(self, keys = None, query = None, limit = None, bindVars = None, batchSize = 1000, background = False, onProgress = None):
+        """Preload documents into the active cache, so that it is hot before the first requests: those of 'keys', the results of the AQL 'query'
+        or by default the whole collection, at most 'limit' documents (by default as many as the cache holds).
+
+        With background = True the documents are loaded by a background thread, call wait() on the returned CacheWarmUp to block until they are.
+        onProgress(warmUp) is called after every batch of 'batchSize' documents. See CacheWarmUp for more."""
+        warmUp = CacheWarmUp(self, keys = keys, query = query, bindVars = bindVars, limit = limit, batchSize = batchSize, onProgress = onProgress)
+        if background:
+            return warmUp.start()
+        return warmUp.run()
+
     def delete(self):
         """Delete the collection from the database."""
         r = self.connection.session.delete(self.getURL())
@@ -369,6 +926,7 @@ class Collection(with_metaclass(Collection_metaclass, object)):
                 self._bulkCache[i].setPrivates(xd)
                 self._bulkCache[i]._key = \
                     xd['_key']
+                self._documentWritten(self._bulkCache[i])
             i += 1
         if bulkError is not None:
             self._bulkCache = []
@@ -392,19 +950,13 @@ class Collection(with_metaclass(Collection_metaclass, object)):
         if self._bulkMode != BulkMode.UPDATE:
             raise UpdateError("Mixed bulk operations not supported - have " + str(self._bulkMode))
         payload = []
-        for d in self._bulkCache:
-            dPayload = d._store.getPatches()
-
+        for d, dPayload in self._bulkCache:
             if d.collection._validation['on_save']:
                 d.validate()
 
-            if isinstance(d,dict):
-                payload.append(json.dumps(d, default=str))
-            else:
-                try:
-                    payload.append(d.toJson())
-                except Exception as e:
-                    payload.append(json.dumps(d.getStore(), default=str))
+            dPayload = dict(dPayload)
+            dPayload["_key"] = d._key
+            payload.append(json.dumps(dPayload, default=str))
         payload = '[' + ','.join(payload) + ']'
         r = self.connection.session.patch(self.getDocumentsURL(), params = self._batchParams, data = payload)
         data = r.json()
@@ -416,22 +968,26 @@ class Collection(with_metaclass(Collection_metaclass, object)):
             if not '_key' in xd and 'error' in xd and 'errorNum' in xd:
                 if bulkError is None:
                     bulkError = BulkOperationError("patching failed")
-                bulkError.addBulkError(ArangoError(xd), str(self._bulkCache[i]))
+                bulkError.addBulkError(ArangoError(xd), str(self._bulkCache[i][0]))
             else:
-                self._bulkCache[i].setPrivates(xd)
-                self._bulkCache[i]._key = \
+                self._bulkCache[i][0].setPrivates(xd)
+                self._bulkCache[i][0]._key = \
                     xd['_key']
+                self._documentWritten(self._bulkCache[i][0])
             i += 1
         self._bulkCache = []
         if bulkError is not None:
             raise bulkError
 
 
-    def _patchBatch(self, document, params):
+    def _patchBatch(self, document, params, payload):
+        """the patches are kept along with the document, documents patched with other parameters are sent in another batch"""
         if self._bulkMode != BulkMode.NONE and self._bulkMode != BulkMode.UPDATE:
             raise UpdateError("Mixed bulk operations not supported - have " + str(self._bulkMode))
+        if self._bulkCache and params != self._batchParams:
+            self._updateBatch()
         self._bulkMode = BulkMode.UPDATE
-        self._bulkCache.append(document)
+        self._bulkCache.append((document, payload))
         self._batchParams = params
         if len(self._bulkCache) == self._bulkSize:
             self._updateBatch()
@@ -444,7 +1000,9 @@ class Collection(with_metaclass(Collection_metaclass, object)):
             raise UpdateError("Mixed bulk operations not supported - have " + self._bulkMode)
         payload = []
         for d in self._bulkCache:
-            if isinstance(d,dict):
+            if self._batchParams.get("ignoreRevs") is False:
+                payload.append(json.dumps({"_key": d['_key'], "_rev": d['_rev']}))
+            elif isinstance(d,dict):
                 payload.append('"%s"' % d['_key'])
             else:
                 try:
@@ -465,6 +1023,7 @@ class Collection(with_metaclass(Collection_metaclass, object)):
                     bulkError = BulkOperationError("deleting failed")
                 bulkError.addBulkError(ArangoError(xd), self._bulkCache[i])
             else:
+                self._documentDeleted(xd['_key'])
                 self._bulkCache[i].reset(self)
             i += 1
         self._bulkCache = []
@@ -474,6 +1033,8 @@ class Collection(with_metaclass(Collection_metaclass, object)):
     def _deleteBatch(self, document, params):
         if self._bulkMode != BulkMode.NONE and self._bulkMode != BulkMode.DELETE:
             raise UpdateError("Mixed bulk operations not supported - have " + str(self._bulkMode))
+        if self._bulkCache and params != self._batchParams:
+            self._removeBatch()
         self._bulkMode = BulkMode.DELETE
         self._bulkCache.append(document)
         self._batchParams = params
@@ -501,11 +1062,21 @@ class Collection(with_metaclass(Collection_metaclass, object)):
         params = {"collection": self.name, "type": "auto"}
         params.update(addParams)
         r = self.connection.session.post(url , params = params, data = payload)
+        self._importDone(data)
         data = r.json()
         if not r.status_code == 201 or data["error"]:
             raise CreationError(data["errorMessage"], data)
         return data
 
+    def _importDone(self, docs = None):
+        """forgets the misses of the imported 'docs', or all of them if the documents are not known (imports of files)"""
+        if self.missCache is None:
+            return
+        if isinstance(docs, (list, tuple)):
+            self._documentsCreated(docs)
+        else:
+            self.missCache.clear()
+
     def exportDocs( self, **data):
         url = "%s/export" % (self.database.getURL())
         params = {"collection": self.name}
@@ -654,6 +1225,17 @@ class Collection(with_metaclass(Collection_metaclass, object)):
             self._fields[field].validate(value)
         return True
 
+    @classmethod
+    def isSchemaless(cls):
+        """Return 'True' if the collection has no fields, no validation and accepts foreign fields.
+        The documents of such collections are SchemalessDocuments (or SchemalessEdges) that skip all schema handling."""
+        if len(cls._fields) > 0 or not cls._validation['allow_foreign_fields']:
+            return False
+        for k in ('on_save', 'on_set', 'on_load'):
+            if cls._validation[k]:
+                return False
+        return True
+
     @classmethod
     def hasField(cls, fieldName):
         """Return 'True' or 'False' whether the collection has field 'K' in its schema.
@@ -668,27 +1250,180 @@ class Collection(with_metaclass(Collection_metaclass, object)):
                 return False
         return True
 
-    def fetchDocument(self, key, rawResults = False, rev = None):
+    def fetchDocument(self, key, rawResults = False, rev = None, lazy = False, fields = None, exclude = None, ifNoneMatch = None):
         """Fetche a document from the collection given its key.
 
         This function always goes straight to the db and bypasses the cache.
-        If you want to take advantage of the cache use the '__getitem__' interface: collection[key]"""
+        If you want to take advantage of the cache use the '__getitem__' interface: collection[key]
+        With lazy = True, the fields of a schemaless document are only decoded when they are accessed.
+        'fields' or 'exclude' (lists of top level field names) only transfer some fields of the document, see _projectionQuery().
+        With ifNoneMatch = a revision, the document is only sent if its revision is different, None is returned otherwise."""
+        if fields is not None or exclude is not None:
+            filters = "FILTER d._key == @key"
+            bindVars = {"key" : key}
+            if rev is not None:
+                filters += " FILTER d._rev == @rev"
+                bindVars["rev"] = rev
+            query = self._projectionQuery(filters, bindVars, fields, exclude, rawResults, {"lazy" : lazy})
+            if len(query) == 0:
+                raise DocumentNotFoundError("Unable to find document with _key: %s" % key, {"_key" : key, "rev" : rev})
+            return query[0]
+
         url = "%s/%s/%s" % (self.getDocumentsURL(), self.name, key)
-        if rev is not None:
+        if ifNoneMatch is not None:
+            r = self.connection.session.get(url, headers = {"If-None-Match" : '"%s"' % ifNoneMatch})
+        elif rev is not None:
             r = self.connection.session.get(url, params = {'rev' : rev})
         else:
             r = self.connection.session.get(url)
 
+        if r.status_code == 304:
+            return None
         if r.status_code < 400:
             if rawResults:
                 return r.json()
+            if lazy:
+                return self.documentClass(self, loadsLazy(r.content), on_load_validation=self._validation["on_load"])
             return self.documentClass(self, r.json(), on_load_validation=self._validation["on_load"])
         elif r.status_code == 404 :
             raise DocumentNotFoundError("Unable to find document with _key: %s" % key, r.json())
         raise DocumentNotFoundError("Unable to find document with _key: %s, response: %s" % (key, r.json()), r.json())
 
-    def fetchByExample(self, exampleDict, batchSize, rawResults = False, **queryArgs):
-        """'exampleDict' should be something like {'age' : 28}."""
+    def fetchDocuments(self, keys, rawResults = False, batchSize = 1000, lazy = False):
+        """Fetch several documents given their keys, 'batchSize' keys per request.
+
+        Return a list in the same order as 'keys', with 'None' in place of every document that could not be found.
+        Like 'fetchDocument()' this goes straight to the db, but the fetched documents are stored in the cache if it is activated.
+        If the cache revalidates, the cached documents whose revision did not change are not downloaded again, see _revalidateDocuments().
+        With lazy = True, the fields of schemaless documents are only decoded when they are accessed."""
+        keys = [str(k) for k in keys]
+        if not rawResults and self.documentCache is not None and self.documentCache.revalidate:
+            return self._revalidateDocuments(keys, batchSize)
+
+        url = "%s/%s" % (self.getDocumentsURL(), self.name)
+        ret = []
+        for i in range(0, len(keys), batchSize):
+            r = self.connection.session.put(url, params = {"onlyget" : "true"}, data = json.dumps(keys[i:i+batchSize]))
+            if lazy and not rawResults and r.status_code < 400:
+                data = scanArray(r.content.decode("utf-8"), 0)[0]
+            else:
+                data = r.json()
+            if r.status_code >= 400 or not isinstance(data, list):
+                raise DocumentNotFoundError("Unable to fetch documents from collection: %s" % self.name, data)
+
+            for docJson in data:
+                if docJson.get("error"):
+                    ret.append(None)
+                elif rawResults:
+                    ret.append(docJson)
+                else:
+                    doc = self.documentClass(self, docJson, on_load_validation=self._validation["on_load"])
+                    if self.documentCache is not None:
+                        self.documentCache.cache(doc)
+                    ret.append(doc)
+        return ret
+
+    def getMany(self, keys, batchSize = 1000):
+        """Return the documents of 'keys' like __getitem__() would, but with the requests of all the misses batched.
+
+        Fresh documents are served from the cache and keys in the negative cache are missing without a request. All the other keys are fetched
+        with fetchDocuments(), 'batchSize' keys per request, which caches them (stale documents of a revalidating cache are only downloaded if they changed).
+        Return a DocumentList, in the same order as 'keys' with 'None' in place of missing documents, whose 'hits' and 'misses' count the keys of this call."""
+        keys = [str(k) for k in keys]
+        found = {}
+        unknown = OrderedDict()
+        hits = 0
+        for key in keys:
+            if key in found or key in unknown:
+                continue
+            if self.missCache is not None and key in self.missCache:
+                found[key] = None
+                hits += 1
+                continue
+            if self.documentCache is not None:
+                doc, fresh = self.documentCache.lookup(key)
+                if fresh:
+                    found[key] = doc
+                    hits += 1
+                    continue
+            unknown[key] = True
+
+        unknown = list(unknown)
+        if len(unknown) > 0:
+            for key, doc in zip(unknown, self.fetchDocuments(unknown, batchSize = batchSize)):
+                found[key] = doc
+                if doc is None and self.missCache is not None:
+                    self.missCache.add(key)
+
+        return DocumentList((found[key] for key in keys), hits = hits, misses = len(unknown))
+
+    def _revalidateDocuments(self, keys, batchSize):
+        """fetchDocuments() for a revalidating cache. Every batch is a single AQL query that receives the revisions of the cached documents
+        and only returns the documents that changed, the keys of the others"""
+        cache = self.documentCache
+        aql = "FOR d IN @@collection FILTER d._key IN @keys RETURN d._rev == @revs[d._key] ? d._key : d"
+        ret = []
+        for i in range(0, len(keys), batchSize):
+            batch = keys[i:i+batchSize]
+            cached = {}
+            revs = {}
+            for key in batch:
+                doc = cache.peek(key)
+                if doc is not None and doc._rev is not None:
+                    cached[key] = doc
+                    revs[key] = doc._rev
+
+            found = {}
+            for row in self.database.AQLQuery(aql, bindVars = {"@collection" : self.name, "keys" : batch, "revs" : revs}, batchSize = len(batch), rawResults = True):
+                if isinstance(row, str):
+                    found[row] = cached[row]
+                else:
+                    found[row["_key"]] = self.documentClass(self, row, on_load_validation=self._validation["on_load"])
+
+            for key in batch:
+                doc = found.get(key)
+                if doc is None or doc is not cached.get(key):
+                    cache.replace(key, doc)
+                else:
+                    cache.refresh(key)
+                ret.append(doc)
+        return ret
+
+    def update_with_retry(self, key, fct, maxRetries = 10, **patchArgs):
+        """Apply 'fct(document)' to the document 'key' and patch it only if nobody else modified it in between (optimistic concurrency).
+
+        'key' can also be a document that was already fetched, otherwise it goes through the cache if it is activated: an update costs no read
+        as long as there are no conflicts. On a conflict the document is fetched again and 'fct' is reapplied, at most 'maxRetries' times
+        before the PreconditionFailedError is raised. Return the updated document. If it fails, the document is removed from the cache."""
+        if isinstance(key, Document):
+            doc = key
+        else:
+            doc = self[key]
+
+        retry = 0
+        try:
+            while True:
+                fct(doc)
+                try:
+                    doc.patch(checkRev = True, **patchArgs)
+                    return doc
+                except PreconditionFailedError:
+                    if retry >= maxRetries:
+                        raise
+                    retry += 1
+                    doc.reset(self, self.fetchDocument(doc._key, rawResults = True), on_load_validation=self._validation["on_load"])
+        except Exception:
+            # the cached document can hold the changes of fct that were not saved
+            if self.documentCache is not None:
+                self.documentCache.discard(doc._key)
+            raise
+
+    def fetchByExample(self, exampleDict, batchSize, rawResults = False, fields = None, exclude = None, **queryArgs):
+        """'exampleDict' should be something like {'age' : 28}.
+        'fields' or 'exclude' only transfer some fields of the documents, see _projectionQuery()."""
+        if fields is not None or exclude is not None:
+            queryArgs["batchSize"] = batchSize
+            return self._projectionQuery("FILTER MATCHES(d, @example)", {"example" : exampleDict}, fields, exclude, rawResults, queryArgs)
         return self.simpleQuery('by-example', rawResults, example = exampleDict, batchSize = batchSize, **queryArgs)
 
     def fetchFirstExample(self, exampleDict, rawResults = False):
@@ -697,19 +1432,51 @@ class Collection(with_metaclass(Collection_metaclass, object)):
         Return the first example found that matches the example, still in a 'SimpleQuery' object."""
         return self.simpleQuery('first-example', rawResults = rawResults, example = exampleDict)
 
-    def fetchAll(self, rawResults = False, **queryArgs):
+    def fetchAll(self, rawResults = False, fields = None, exclude = None, **queryArgs):
         """Returns all the documents in the collection.
         You can use the optinal arguments 'skip' and 'limit'::
-            fetchAlll(limit = 3, shik = 10)"""
+            fetchAlll(limit = 3, shik = 10)
+        'fields' or 'exclude' only transfer some fields of the documents, see _projectionQuery()."""
 
+        if fields is not None or exclude is not None:
+            return self._projectionQuery("", {}, fields, exclude, rawResults, queryArgs)
         return self.simpleQuery('all', rawResults = rawResults, **queryArgs)
 
+    def _projectionQuery(self, filters, bindVars, fields, exclude, rawResults, queryArgs):
+        """Runs an AQL query that returns the documents matching 'filters' projected server side: only their 'fields' (AQL KEEP) or all but their 'exclude'd fields (AQL UNSET).
+        Private fields (_id, _key...) are always returned. The documents are marked as partial: their save() patches them instead of overwriting them.
+        'queryArgs' takes the arguments of simple queries (skip, limit, batchSize, count) and those of Database.AQLQuery()"""
+        if fields is not None and exclude is not None:
+            raise ValueError("Projections take either 'fields' or 'exclude', not both")
+        if fields is not None:
+            projection = "KEEP(d, @projection)"
+            projected = list(self.arangoPrivates) + [f for f in fields if f not in self.arangoPrivates]
+        else:
+            projection = "UNSET(d, @projection)"
+            projected = [f for f in exclude if f not in self.arangoPrivates]
+
+        queryArgs = dict(queryArgs)
+        skip, limit = queryArgs.pop("skip", None), queryArgs.pop("limit", None)
+        if skip is not None or limit is not None:
+            filters += " LIMIT @skip, @limit"
+            bindVars["skip"] = skip or 0
+            # AQL has no offset without a count
+            bindVars["limit"] = limit if limit is not None else _MAX_LIMIT
+        bindVars["@collection"] = self.name
+        bindVars["projection"] = projected
+
+        aql = "FOR d IN @@collection %s RETURN %s" % (filters, projection)
+        query = self.database.AQLQuery(aql, rawResults = rawResults, bindVars = bindVars, **queryArgs)
+        query.partialResults = True
+        return query
+
     def simpleQuery(self, queryType, rawResults = False, **queryArgs):
         """General interface for simple queries.
 
         'queryType' takes the arguments known to the ArangoDB, for instance: 'all' or 'by-example'.
         See the ArangoDB documentation for a list of valid 'queryType's.
-        If 'rawResults' is set to 'True', the query will return dictionaries instead of 'Document' objetcs."""
+        If 'rawResults' is set to 'True', the query will return dictionaries instead of 'Document' objetcs.
+        With rowMode = "readonly" it returns lightweight ReadOnlyRow objects, see Query."""
         return SimpleQuery(self, queryType, rawResults, **queryArgs)
 
     def action(self, method, action, **params):
@@ -742,6 +1509,7 @@ class Collection(with_metaclass(Collection_metaclass, object)):
         url = "%s/import" % self.database.getURL()
 
         r = self.connection.session.post(url, params = params, data = payload)
+        self._importDone(docs)
         data = r.json()
         if (r.status_code == 201) and "error" not in data:
             return True
@@ -762,10 +1530,18 @@ class Collection(with_metaclass(Collection_metaclass, object)):
         with open(filename) as f:
             data = f.read()
             r = self.connection.session.post(url, params = params, data = data)
+            self._importDone()
 
             if r.status_code != 201:
                 raise UpdateError('Unable to bulk import JSON', r)
 
+    def createImportJob(self, source, checkpointFilename = None, chunkSize = 10000, onDuplicate = "error", resumeOnDuplicate = "ignore", onProgress = None, **params):
+        """Return a resumable import job for 'source': a file with one json document per line or an iterable of documents.
+
+        Call its 'run()' function to start the import, or to resume it from the last checkpoint saved in 'checkpointFilename'.
+        See 'ImportJob' for more."""
+        return ImportJob(self, source, checkpointFilename = checkpointFilename, chunkSize = chunkSize, onDuplicate = onDuplicate, resumeOnDuplicate = resumeOnDuplicate, onProgress = onProgress, **params)
+
     def bulkImport_values(self, filename, onDuplicate="error", **params):
         """Bulk import from a file following the ArangoDB json format."""
 
@@ -775,6 +1551,7 @@ class Collection(with_metaclass(Collection_metaclass, object)):
         with open(filename) as f:
             data = f.read()
             r = self.connection.session.post(url, params = params, data = data)
+            self._importDone()
 
             if r.status_code != 201:
                 raise UpdateError('Unable to bulk import values', r)
@@ -849,25 +1626,97 @@ class Collection(with_metaclass(Collection_metaclass, object)):
     def __getitem__(self, key):
         """Return a document from the cache.
 
-        If it is not there, fetch from the db and cache it first.
-        If the cache is not activated, this is equivalent to 'fetchDocument(rawResults=False)'."""
+        If it is not there, fetch from the db and cache it first. If the cache revalidates and the document is stale,
+        it is only fetched again if its revision changed.
+        If the cache is not activated, this is equivalent to 'fetchDocument(rawResults=False)'.
+        Keys in the negative cache (see activateMissCache()) raise a DocumentNotFoundError without a request."""
+        if self.missCache is not None:
+            if key in self.missCache:
+                raise DocumentNotFoundError("Unable to find document with _key: %s" % key, {"_key" : key})
+            try:
+                return self._getCached(key)
+            except DocumentNotFoundError:
+                self.missCache.add(key)
+                raise
+        return self._getCached(key)
+
+    def _getCached(self, key):
         if self.documentCache is None:
             return self.fetchDocument(key, rawResults = False)
-        try:
-            return self.documentCache[key]
-        except KeyError:
-            doc = self.fetchDocument(key, rawResults = False)
-            self.documentCache.cache(doc)
+        doc, fresh = self.documentCache.lookup(key)
+        if fresh:
+            return doc
+        if doc is not None:
+            try:
+                newDoc = self.fetchDocument(key, rawResults = False, ifNoneMatch = doc._rev)
+            except DocumentNotFoundError:
+                self.documentCache.replace(key, None)
+                raise
+            if newDoc is None:
+                self.documentCache.refresh(key)
+                return doc
+            self.documentCache.replace(key, newDoc)
+            return newDoc
+        doc = self.fetchDocument(key, rawResults = False)
+        self.documentCache.cache(doc)
         return doc
 
     def __contains__(self, key):
-        """Return 'True' or 'False' whether the doc is in the collection."""
-        try:
-            self.fetchDocument(key, rawResults = False)
+        """Return 'True' or 'False' whether the doc is in the collection.
+
+        The document is not downloaded: it is either found in the caches or checked with a HEAD request."""
+        key = str(key)
+        if self.documentCache is not None and key in self.documentCache:
             return True
-        except DocumentNotFoundError as e:
+        if self.missCache is not None and key in self.missCache:
             return False
 
+        r = self.connection.session.head("%s/%s/%s" % (self.getDocumentsURL(), self.name, key))
+        if r.status_code == 200:
+            return True
+        if r.status_code == 404:
+            if self.missCache is not None:
+                self.missCache.add(key)
+            return False
+        raise ConnectionError("Unable to check whether document %s exists" % key, r.url, r.status_code)
+
+    def existing(self, keys, batchSize = 1000):
+        """Return the set of the 'keys' that are the keys of documents of the collection.
+
+        Documents are not downloaded: each batch of 'batchSize' keys is checked with a single AQL query that only returns keys.
+        Keys that are in the caches are not sent."""
+        keys = [str(k) for k in keys]
+        res = set()
+        unknown = []
+        for key in keys:
+            if self.documentCache is not None and key in self.documentCache:
+                res.add(key)
+            elif self.missCache is None or key not in self.missCache:
+                unknown.append(key)
+
+        aql = "FOR d IN @@collection FILTER d._key IN @keys RETURN d._key"
+        for i in range(0, len(unknown), batchSize):
+            batch = unknown[i:i+batchSize]
+            found = set(self.database.AQLQuery(aql, bindVars = {"@collection" : self.name, "keys" : batch}, batchSize = len(batch), rawResults = True))
+            res.update(found)
+            if self.missCache is not None:
+                for key in batch:
+                    if key not in found:
+                        self.missCache.add(key)
+        return res
+
+    def activateMissCache(self, ttl = 1, cacheSize = 100000):
+        """Activate the negative cache: the keys of missing documents are remembered for 'ttl' seconds, during which __contains__(), existing()
+        and __getitem__() do not ask the database about them again. Documents created by this process are forgotten right away,
+        those created by others can be reported missing for up to 'ttl' seconds (unless a change feed is active, see Database.activateChangeFeed()).
+        Returns the MissCache"""
+        self.missCache = MissCache(ttl = ttl, cacheSize = cacheSize)
+        return self.missCache
+
+    def deactivateMissCache(self):
+        """Deactivate the negative cache."""
+        self.missCache = None
+
 class SystemCollection(Collection):
     """For all collections with 'isSystem=True'."""
     def __init__(self, database, jsonData):
@@ -877,11 +1726,15 @@ class Edges(Collection):
     """The default edge collection. All edge Collections must inherit from it."""
 
     arangoPrivates = ["_id", "_key", "_rev", "_to", "_from"]
+    adjacencyCache = None
 
     def __init__(self, database, jsonData):
         """This one is meant to be called by the database."""
         Collection.__init__(self, database, jsonData)
-        self.documentClass = Edge
+        if self.isSchemaless():
+            self.documentClass = SchemalessEdge
+        else:
+            self.documentClass = Edge
         self.edgesURL = "%s/edges/%s" % (self.database.getURL(), self.name)
 
     @classmethod
@@ -915,36 +1768,106 @@ class Edges(Collection):
 
         Vertex can be either a 'Document' object or a string for an '_id'.
         If 'rawResults' is set to 'True', return the results just as fetched without any processing.
-        Otherwise, return a list of Edge objects."""
-        if isinstance(vertex, Document):
-            vId = vertex._id
-        elif isinstance(vertex,str) or isinstance(vertex,bytes):
-            vId = vertex
-        else:
-            raise ValueError("Vertex is neither a Document nor a String")
+        Otherwise, return a list of Edge objects. With an adjacency cache (see activateAdjacencyCache()), cached edges are not fetched again."""
+        vId = self._vertexId(vertex)
 
         params = {"vertex" : vId}
         if inEdges and outEdges:
-            pass
+            direction = "any"
         elif inEdges:
-            params["direction"] = "in"
+            direction = params["direction"] = "in"
         elif outEdges:
-            params["direction"] = "out"
+            direction = params["direction"] = "out"
         else:
             raise ValueError("inEdges, outEdges or both must have a boolean value")
 
+        if self.adjacencyCache is not None:
+            return self.getEdgesForVertices([vId], direction, rawResults = rawResults)[vId]
+
         r = self.connection.session.get(self.edgesURL, params = params)
         data = r.json()
         if r.status_code == 200:
             if not rawResults:
                 ret = []
                 for e in data["edges"]:
-                    ret.append(Edge(self, e))
+                    ret.append(self.documentClass(self, e))
                 return ret
             return data["edges"]
         else:
             raise CreationError("Unable to return edges for vertex: %s" % vId, data)
 
+    def _vertexId(self, vertex):
+        if isinstance(vertex, Document):
+            return vertex._id
+        elif isinstance(vertex, bytes):
+            return vertex.decode("utf-8")
+        elif isinstance(vertex, str):
+            return vertex
+        raise ValueError("Vertex is neither a Document nor a String")
+
+    def getEdgesForVertices(self, vertices, direction = "any", rawResults = False, batchSize = 1000):
+        """Return the edges linked to many vertices, as a dictionary {vertex _id: list of edges} that has an entry, maybe empty, for every vertex.
+
+        Vertices can be 'Document' objects or '_id' strings, 'direction' is "in", "out" or "any". Instead of one request per vertex,
+        the edges of each batch of 'batchSize' vertices are fetched with a single AQL query that uses the edge index.
+        With an adjacency cache (see activateAdjacencyCache()), only the vertices whose edges are not cached are sent and those fetched are cached.
+        If 'rawResults' is set to 'True', the edges are dictionaries, that are shared with the cache and must not be modified.
+        Otherwise, they are Edge objects."""
+        if direction not in ("in", "out", "any"):
+            raise ValueError("direction must be 'in', 'out' or 'any', got: %s" % direction)
+
+        res = OrderedDict()
+        unknown = []
+        for vertex in vertices:
+            vId = self._vertexId(vertex)
+            if vId in res:
+                continue
+            edges = None
+            if self.adjacencyCache is not None:
+                edges = self.adjacencyCache.get(vId, direction)
+            res[vId] = edges
+            if edges is None:
+                unknown.append(vId)
+
+        if direction == "out":
+            aql = "FOR e IN @@collection FILTER e._from IN @vertices RETURN e"
+        elif direction == "in":
+            aql = "FOR e IN @@collection FILTER e._to IN @vertices RETURN e"
+        else:
+            aql = "FOR e IN @@collection FILTER e._from IN @vertices OR e._to IN @vertices RETURN e"
+
+        for i in range(0, len(unknown), batchSize):
+            batch = unknown[i:i+batchSize]
+            fetched = dict((vId, []) for vId in batch)
+            for e in self.database.AQLQuery(aql, bindVars = {"@collection" : self.name, "vertices" : batch}, batchSize = batchSize, rawResults = True):
+                if direction != "in" and e["_from"] in fetched:
+                    fetched[e["_from"]].append(e)
+                if direction != "out" and e["_to"] in fetched and (direction == "in" or e["_to"] != e["_from"]):
+                    fetched[e["_to"]].append(e)
+            for vId, edges in fetched.items():
+                res[vId] = edges
+                if self.adjacencyCache is not None:
+                    self.adjacencyCache.set(vId, direction, edges)
+
+        for vId, edges in res.items():
+            if rawResults:
+                res[vId] = list(edges)
+            else:
+                res[vId] = [self.documentClass(self, e) for e in edges]
+        return res
+
+    def activateAdjacencyCache(self, cacheSize = 10000, ttl = None):
+        """Activate the adjacency cache: the edges of at most 'cacheSize' (vertex, direction) pairs fetched by getEdges() and getEdgesForVertices()
+        are kept for 'ttl' seconds (by default until they change). Edges saved, patched or deleted through this collection's Edge objects
+        are invalidated right away, other changes (bulk operations, other processes) are only seen once entries expire, unless a change feed is active
+        (see Database.activateChangeFeed()). Returns the AdjacencyCache"""
+        self.adjacencyCache = AdjacencyCache(cacheSize = cacheSize, ttl = ttl)
+        return self.adjacencyCache
+
+    def deactivateAdjacencyCache(self):
+        """Deactivate the adjacency cache."""
+        self.adjacencyCache = None
+
 
 class BulkOperation(object):
     def __init__(self, collection, batchSize=100):
@@ -954,6 +1877,8 @@ class BulkOperation(object):
     def __enter__(self):
         self.coll._isBulkInProgress = True
         self.coll._bulkSize = self.batchSize
+        if not self.coll._bulkCache:
+            self.coll._bulkCache = []
         return self.coll
     def __exit__(self, type, value, traceback):
         self.coll._finalizeBatch();
@@ -5,9 +5,11 @@ from datetime import datetime
 import requests
 
 from .action import ConnectionAction
+from .collection import MissCache
 from .database import Database, DBHandle
 from .theExceptions import CreationError, ConnectionError
 from .users import Users
+from .writebehind import WriteBehind
 
 from .ca_certificate import CA_Certificate
 
@@ -53,11 +55,18 @@ class AikidoSession:
 
             kwargs["timeout"] = self.timeout
 
+            # a request conditional on a revision fails the same way every time
+            headers = kwargs.get("headers") or {}
+            conditional = "If-Match" in headers or "If-None-Match" in headers
+            # HEAD responses have no body
+            bodyless = getattr(self.fct, "__name__", None) == "head"
             try:
                 do_retry = True
                 retry = 0
                 while do_retry and retry < self.max_conflict_retries:
                     ret = self.fct(*args, **kwargs)
+                    if conditional or bodyless:
+                        break
                     do_retry = ret.status_code == 1200
                     try :
                         data = ret.json()
@@ -70,7 +79,8 @@ class AikidoSession:
                 print ("===\nUnable to establish connection, perhaps arango is not running.\n===")
                 raise
 
-            if len(ret.content) < 1:
+            # a 304 (not modified) answer to a conditional request and a 204 (no content) have no body
+            if len(ret.content) < 1 and ret.status_code not in (204, 304) and not bodyless:
                 raise ConnectionError("Empty server response", ret.url, ret.status_code, ret.content)
             elif ret.status_code == 401:
                 raise ConnectionError("Unauthorized access, you must supply a (username, password) with the correct credentials", ret.url, ret.status_code, ret.content)
@@ -192,6 +202,13 @@ class Connection(object):
         max number of open connections. (Not intended for grequest)
     timeout: int
         number of seconds to wait on a hanging connection before giving up
+    metadataTTL: float
+        number of seconds during which the collections and graphs already loaded are trusted, after that they are checked again one at a time.
+        None (default) trusts them until the next reload()
+    metadataMissTTL: float
+        number of seconds during which the names of missing databases, collections and graphs are not looked up again
+    lazyMetadata: bool
+        databases do not load the list of all their collections and graphs, they are fetched one at a time when accessed
     """
 
     LOAD_BLANCING_METHODS = {'round-robin', 'random'}
@@ -213,7 +230,10 @@ class Connection(object):
             max_retries=5,
             max_conflict_retries=5,
             pool_maxsize=10,
-            timeout=30
+            timeout=30,
+            metadataTTL=None,
+            metadataMissTTL=1,
+            lazyMetadata=False
     ):
 
         if loadBalancing not in Connection.LOAD_BLANCING_METHODS:
@@ -230,9 +250,15 @@ class Connection(object):
         self.max_conflict_retries = max_conflict_retries
         self.action = ConnectionAction(self)
         self.timeout = timeout
+        self.metadataTTL = metadataTTL
+        self.metadataMissTTL = metadataMissTTL
+        self.lazyMetadata = lazyMetadata
+        # the names of recently missing databases
+        self._databaseMisses = MissCache(ttl = metadataMissTTL)
 
         self.databases = {}
         self.verbose = verbose
+        self.writeBehind = None
 
         if isinstance(arangoURL, str):
             self.arangoURL = [arangoURL]
@@ -360,6 +386,7 @@ class Connection(object):
 
         data = r.json()
         if r.status_code == 200 and not data["error"]:
+            self._databaseMisses.clear()
             self.databases = {}
             for dbName in data["result"]:
                 if dbName not in self.databases:
@@ -377,13 +404,57 @@ class Connection(object):
         if r.status_code == 201 and not data["error"]:
             db = Database(self, name)
             self.databases[name] = db
+            self._databaseMisses.discard(name)
             return self.databases[name]
         else:
             raise CreationError(data["errorMessage"], r.content)
 
+    def activateWriteBehind(self, batchSize = 1000, flushInterval = 1, onError = None):
+        """From now on, the save(), patch() and delete() calls of all documents of this connection are buffered and sent in batches
+        by a background thread, every 'flushInterval' seconds or as soon as 'batchSize' writes to the same collection are waiting.
+        Failed writes are reported to onError(document, error). See WriteBehind for more. Returns the WriteBehind object,
+        use its flush() and barrier() functions to force the writing of buffered documents"""
+        if self.writeBehind is not None:
+            raise ValueError("Write-behind is already active on this connection")
+        self.writeBehind = WriteBehind(self, batchSize = batchSize, flushInterval = flushInterval, onError = onError)
+        return self.writeBehind
+
+    def deactivateWriteBehind(self):
+        """flushes all buffered writes and goes back to writing documents directly"""
+        if self.writeBehind is not None:
+            writeBehind, self.writeBehind = self.writeBehind, None
+            writeBehind.stop()
+
     def hasDatabase(self, name):
         """returns true/false wether the connection has a database by the name of 'name'"""
-        return name in self.databases
+        return self._lookupDatabase(name) is not None
+
+    def _lookupDatabase(self, name):
+        """returns the database 'name' or None. Unknown databases are checked alone (/_api/database/current), and remembered as missing
+        for metadataMissTTL seconds if they do not exist"""
+        try:
+            return self.databases[name]
+        except KeyError:
+            pass
+        if name in self._databaseMisses:
+            return None
+
+        try:
+            r = self.session.get("%s/_db/%s/_api/database/current" % (self.getEndpointURL(), name))
+            status = r.status_code
+        except ConnectionError:
+            # databases the user cannot access are answered with a 401
+            status = None
+
+        if status == 200:
+            self.databases[name] = DBHandle(self, name)
+        elif status == 404:
+            self._databaseMisses.add(name)
+        else:
+            self.reload()
+            if name not in self.databases:
+                self._databaseMisses.add(name)
+        return self.databases.get(name)
 
     def __contains__(self, name):
         """Alias for hasDatabase"""
@@ -391,14 +462,10 @@ class Connection(object):
 
     def __getitem__(self, dbName):
         """Collection[dbName] returns a database by the name of 'dbName', raises a KeyError if not found"""
-        try:
-            return self.databases[dbName]
-        except KeyError:
-            self.reload()
-            try:
-                return self.databases[dbName]
-            except KeyError:
-                raise KeyError("Can't find any database named : %s" % dbName)
+        database = self._lookupDatabase(dbName)
+        if database is None:
+            raise KeyError("Can't find any database named : %s" % dbName)
+        return database
 
     def reportStart(self, name):
         if self.statsdc != None:
@@ -1,5 +1,6 @@
 import json
 import logging
+import time
 import types
 
 from . import collection as COL
@@ -7,11 +8,13 @@ from . import consts as CONST
 from . import graph as GR
 
 from .action import DatabaseAction
+from .changefeed import ChangeFeed
 from .document import Document
 from .foxx import Foxx
 from .tasks import Tasks
 from .graph import Graph
 from .query import AQLQuery
+from .transaction import Transaction
 from .theExceptions import CreationError, UpdateError, AQLQueryError, TransactionError, AQLFetchError
 
 __all__ = ["Database", "DBHandle"]
@@ -28,12 +31,33 @@ class Database(object):
         self.graphs = {}
         self.foxx = Foxx(self)
         self.tasks = Tasks(self)
+        self.changeFeed = None
 
-        self.reload()
+        # when collections and graphs were last fetched, and the names that were recently missing
+        self._loadTimes = {}
+        self._metadataMisses = COL.MissCache(ttl = getattr(connection, "metadataMissTTL", 1))
+
+        if not getattr(connection, "lazyMetadata", False):
+            self.reload()
 
     def getURL(self):
         return '%s/_db/%s/_api' % (self.connection.getEndpointURL(), self.name)
 
+    def activateChangeFeed(self, collections = None, refresh = False, pollInterval = 1, onError = None):
+        """Starts a background thread that tails the write-ahead log of the database and removes (or with refresh = True, replaces) the cached
+        documents that change, in the caches of 'collections' or of all collections. See ChangeFeed for more. Returns the ChangeFeed object,
+        its addListener() function lets other caches depend on collections"""
+        if self.changeFeed is not None:
+            raise ValueError("A change feed is already active on this database")
+        self.changeFeed = ChangeFeed(self, collections = collections, refresh = refresh, pollInterval = pollInterval, onError = onError)
+        return self.changeFeed
+
+    def deactivateChangeFeed(self):
+        """stops tailing the write-ahead log"""
+        if self.changeFeed is not None:
+            changeFeed, self.changeFeed = self.changeFeed, None
+            changeFeed.stop()
+
     def getCollectionsURL(self):
         return '%s/collection' % (self.getURL())
     
@@ -49,31 +73,39 @@ class Database(object):
     def getTransactionURL(self):
         return "%s/transaction" % self.getURL()
     
+    def _makeCollection(self, colData):
+        colName = colData['name']
+        if colData['isSystem']:
+            return COL.SystemCollection(self, colData)
+        # no exception for the collections without a class, there can be thousands of them
+        colClass = COL.Collection_metaclass.collectionClasses.get(colName)
+        if colClass is not None:
+            return colClass(self, colData)
+        else:
+            if colData["type"] == CONST.COLLECTION_EDGE_TYPE:
+                return COL.Edges(self, colData)
+            elif colData["type"] == CONST.COLLECTION_DOCUMENT_TYPE:
+                return COL.Collection(self, colData)
+            else:
+                print(("Warning!! Collection of unknown type: %d, trying to load it as Collection nonetheless." % colData["type"]))
+                return COL.Collection(self, colData)
+
+    def _makeGraph(self, graphData):
+        try:
+            return GR.getGraphClass(graphData["_key"])(self, graphData)
+        except KeyError:
+            return Graph(self, graphData)
+
     def reloadCollections(self):
         "reloads the collection list."
         r = self.connection.session.get(self.getCollectionsURL())
         data = r.json()
         if r.status_code == 200:
             self.collections = {}
-
+            now = time.monotonic()
             for colData in data["result"]:
-                colName = colData['name']
-                if colData['isSystem']:
-                    colObj = COL.SystemCollection(self, colData)
-                else:
-                    try:
-                        colClass = COL.getCollectionClass(colName)
-                        colObj = colClass(self, colData)
-                    except KeyError:
-                        if colData["type"] == CONST.COLLECTION_EDGE_TYPE:
-                            colObj = COL.Edges(self, colData)
-                        elif colData["type"] == CONST.COLLECTION_DOCUMENT_TYPE:
-                            colObj = COL.Collection(self, colData)
-                        else:
-                            print(("Warning!! Collection of unknown type: %d, trying to load it as Collection nonetheless." % colData["type"]))
-                            colObj = COL.Collection(self, colData)
-
-                self.collections[colName] = colObj
+                self.collections[colData['name']] = self._makeCollection(colData)
+                self._loadTimes[("collection", colData['name'])] = now
         else:
             raise UpdateError(data["errorMessage"], data)
 
@@ -83,16 +115,53 @@ class Database(object):
         data = r.json()
         if r.status_code == 200:
             self.graphs = {}
+            now = time.monotonic()
             for graphData in data["graphs"]:
-                try:
-                    self.graphs[graphData["_key"]] = GR.getGraphClass(graphData["_key"])(self, graphData)
-                except KeyError:
-                    self.graphs[graphData["_key"]] = Graph(self, graphData)
+                self.graphs[graphData["_key"]] = self._makeGraph(graphData)
+                self._loadTimes[("graph", graphData["_key"])] = now
+        else:
+            raise UpdateError(data["errorMessage"], data)
+
+    def _loaded(self, kind, name):
+        self._loadTimes[(kind, name)] = time.monotonic()
+        self._metadataMisses.discard((kind, name))
+
+    def _lookup(self, kind, name):
+        """returns the collection or graph 'name' (kind is "collection" or "graph"), or None if it does not exist.
+        Known ones are returned as they are, unless they are older than the connection's metadataTTL: they are then checked with a request for this one only.
+        Unknown ones are fetched alone, and remembered as missing for metadataMissTTL seconds if they do not exist"""
+        objects = self.collections if kind == "collection" else self.graphs
+        obj = objects.get(name)
+        ttl = getattr(self.connection, "metadataTTL", None)
+        if obj is not None and (ttl is None or time.monotonic() - self._loadTimes.get((kind, name), 0) < ttl):
+            return obj
+        if obj is None and (kind, name) in self._metadataMisses:
+            return None
+
+        if kind == "collection":
+            r = self.connection.session.get("%s/%s" % (self.getCollectionsURL(), name))
         else:
+            r = self.connection.session.get("%s/%s" % (self.getGraphsURL(), name))
+        data = r.json()
+        if r.status_code == 404:
+            objects.pop(name, None)
+            self._metadataMisses.add((kind, name))
+            return None
+        if r.status_code != 200:
             raise UpdateError(data["errorMessage"], data)
 
+        self._loaded(kind, name)
+        if kind == "collection":
+            # a collection that was not dropped keeps its object, and its caches
+            if obj is None or obj.id != data.get("id", obj.id):
+                obj = objects[name] = self._makeCollection(data)
+        elif obj is None or obj._rev != data["graph"]["_rev"]:
+            obj = objects[name] = self._makeGraph(data["graph"])
+        return obj
+
     def reload(self):
         "reloads collections and graphs"
+        self._metadataMisses.clear()
         self.reloadCollections()
         self.reloadGraphs()
         self.foxx.reload()
@@ -134,6 +203,7 @@ class Database(object):
         if req.status_code == 200 and not data["error"]:
             col = colClass(self, data)
             self.collections[col.name] = col
+            self._loaded("collection", col.name)
             return self.collections[col.name]
         else:
             raise CreationError(data["errorMessage"], data)
@@ -143,6 +213,24 @@ class Database(object):
         sid = _id.split("/")
         return self[sid[0]][sid[1]]
 
+    def fetchDocuments(self, _ids, rawResults = False, batchSize = 1000):
+        """fetchs several documents using their _ids, with one request per collection and batch of 'batchSize' documents.
+        Returns a list in the same order as '_ids', with None in place of every document that could not be found"""
+        _ids = list(_ids)
+        byCollection = {}
+        for i, _id in enumerate(_ids):
+            colName, key = _id.split("/")
+            byCollection.setdefault(colName, ([], []))
+            byCollection[colName][0].append(i)
+            byCollection[colName][1].append(key)
+
+        ret = [None] * len(_ids)
+        for colName, (positions, keys) in byCollection.items():
+            docs = self[colName].fetchDocuments(keys, rawResults = rawResults, batchSize = batchSize)
+            for i, doc in zip(positions, docs):
+                ret[i] = doc
+        return ret
+
     def createGraph(self, name, createCollections = True, isSmart = False, numberOfShards = None, smartGraphAttribute = None, replicationFactor = None, writeConcern = None):
         """Creates a graph and returns it. 'name' must be the name of a class inheriting from Graph.
         Checks will be performed to make sure that every collection mentionned in the edges definition exist. Raises a ValueError in case of
@@ -195,6 +283,7 @@ class Database(object):
 
         if r.status_code == 201 or r.status_code == 202:
             self.graphs[name] = graphClass(self, data["graph"])
+            self._loaded("graph", name)
         else:
             raise CreationError(data["errorMessage"], data)
         return self.graphs[name]
@@ -204,11 +293,11 @@ class Database(object):
 
     def hasCollection(self, name):
         """returns true if the databse has a collection by the name of 'name'"""
-        return name in self.collections
+        return self._lookup("collection", name) is not None
 
     def hasGraph(self, name):
         """returns true if the databse has a graph by the name of 'name'"""
-        return name in self.graphs
+        return self._lookup("graph", name) is not None
 
     def dropAllCollections(self):
         """drops all public collections (graphs included) from the database"""
@@ -221,8 +310,10 @@ class Database(object):
         return
 
     def AQLQuery(self, query, batchSize = 100, rawResults = False, bindVars = None, options = None, count = False, fullCount = False,
-                 json_encoder = None, **moreArgs):
+                 json_encoder = None, rowMode = None, reuseRow = False, lazy = False, **moreArgs):
         """Set rawResults = True if you want the query to return dictionnaries instead of Document objects.
+        Set rowMode = "readonly" for read-only scans, results are then lightweight ReadOnlyRow objects (see Query), reuseRow = True rebinds a single one.
+        Set lazy = True to only decode the fields of the results that are accessed.
         You can use **moreArgs to pass more arguments supported by the api, such as ttl=60 (time to live)"""
         if bindVars is None:
             bindVars = {}
@@ -230,7 +321,7 @@ class Database(object):
             options = {}
 
         return AQLQuery(self, query, rawResults = rawResults, batchSize = batchSize, bindVars  = bindVars, options = options, count = count, fullCount = fullCount,
-                        json_encoder = json_encoder, **moreArgs)
+                        json_encoder = json_encoder, rowMode = rowMode, reuseRow = reuseRow, lazy = lazy, **moreArgs)
 
     def __get_logger(self, logger, log_level):
         if logger is None:
@@ -507,6 +598,16 @@ class Database(object):
         else:
             raise TransactionError(data["errorMessage"], action, data)
 
+    def begin_transaction(self, read = None, write = None, exclusive = None, waitForSync = False, allowImplicit = True, lockTimeout = None, maxTransactionSize = None):
+        """Begins a stream transaction and returns it. read, write and exclusive are lists of collections (or collection names) to lock.
+        Use the transaction as a context manager, it is commited at the end of the block, or aborted if an exception is raised::
+
+            with db.begin_transaction(write = ["users"]) as trx:
+                trx["users"].createDocument({"name": "Tesla"}).save()
+
+        See Transaction for more"""
+        return Transaction(self, read = read, write = write, exclusive = exclusive, waitForSync = waitForSync, allowImplicit = allowImplicit, lockTimeout = lockTimeout, maxTransactionSize = maxTransactionSize)
+
     def __repr__(self):
         return "ArangoDB database: %s" % self.name
 
@@ -530,16 +631,12 @@ class Database(object):
         """use database[col_or_doc_id] to get a collection from the database"""
         try:
             col_name, doc_key = col_or_doc_id.split('/')
-            return self.collections[col_name][doc_key]
+            return self[col_name][doc_key]
         except ValueError:
-            try:
-                return self.collections[col_or_doc_id]
-            except KeyError:
-                self.reload()
-                try:
-                    return self.collections[col_or_doc_id]
-                except KeyError:
-                    raise KeyError("Can't find any collection named : %s" % col_or_doc_id)
+            collection = self._lookup("collection", col_or_doc_id)
+            if collection is None:
+                raise KeyError("Can't find any collection named : %s" % col_or_doc_id)
+            return collection
 
 class DBHandle(Database):
     "As the loading of a Database also triggers the loading of collections and graphs within. Only handles are loaded first. The full database are loaded on demand in a fully transparent manner."
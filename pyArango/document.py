@@ -1,63 +1,119 @@
 import json, types
-from .theExceptions import (CreationError, UniqueConstrainViolation, DeletionError, UpdateError, ValidationError, SchemaViolation, InvalidDocument, ArangoError)
+from .theExceptions import (CreationError, UniqueConstrainViolation, DeletionError, UpdateError, ValidationError, SchemaViolation, InvalidDocument, ArangoError, PreconditionFailedError)
+from .lazyjson import LazyJSON
+from .serialization import documentState, _buildDocument, _rebuildDocument
 
-__all__ = ["DocumentStore", "Document", "Edge"]
+__all__ = ["DocumentStore", "DictStore", "Document", "Edge", "SchemalessDocument", "SchemalessEdge", "ReadOnlyRow", "LazyDictStore"]
 
 class DocumentStore(object):
     """Store all the data of a document in hierarchy of stores and handles validation.
-    Does not store private information, these are in the document."""
+    Does not store private information, these are in the document.
+    Sub documents are kept as plain dictionaries and are only wrapped into a DocumentStore when they are accessed, validated or modified.
+    Modified fields are tracked by every store, sub documents track their own fields and lists are tracked as a whole."""
+
+    __slots__ = ("collection", "validators", "validateInit", "isSubStore", "patching", "mustValidate", "store", "dirty", "subStores", "path")
 
     def __init__(self, collection, validators=None, initDct=None, patch=False, subStore=False, validateInit=False):
         if validators is None:
             validators = {}
-        if initDct is None:
-            initDct = {}
 
         self.store = {}
-        self.patchStore = {}
+        # the names of the modified and deleted fields, created on the first modification
+        self.dirty = None
+        self.subStores = None
+        # the position of the store in the schema of the collection
+        self.path = ()
         self.collection = collection
         self.validators = validators
         self.validateInit = validateInit
         self.isSubStore = subStore
-        self.subStores = {}
         self.patching = patch
-
-        if not self.validateInit :
-            self.mustValidate = False
-            self.set(initDct)
+        self.mustValidate = False
+
+        if initDct and not self.validateInit:
+            privates = collection.arangoPrivates
+            for field, value in initDct.items():
+                if field not in privates:
+                    if isinstance(value, DocumentStore):
+                        value = value.getStore()
+                    self.store[field] = value
+            if patch:
+                self.dirty = set(self.store)
 
         for v in self.collection._validation.values():
             if v:
                 self.mustValidate = True
                 break
 
-        if self.validateInit:
+        if initDct and self.validateInit:
             self.set(initDct)
-        
+
         self.patching = True
 
+    def _wrap(self, field, value = None):
+        """turns the sub document 'field' into a DocumentStore. 'value' defaults to the one in the store"""
+        if value is None:
+            value = self.store[field]
+        vals = self.validators.get(field)
+        if not isinstance(vals, dict):
+            vals = {}
+        sub = DocumentStore(self.collection, validators = vals, initDct = value, subStore=True)
+        sub.path = self.path + (field, )
+        self.store[field] = sub
+        if self.subStores is None:
+            self.subStores = {}
+        self.subStores[field] = sub
+        return sub
+
+    def _markDirty(self, field):
+        if self.dirty is None:
+            self.dirty = set()
+        self.dirty.add(field)
+
     def resetPatch(self):
         """reset patches"""
-        self.patchStore = {}
+        self.dirty = None
+        if self.subStores:
+            for v in self.subStores.values():
+                v.resetPatch()
 
     def getPatches(self):
-        """get patches as a dictionary"""
-        if not self.mustValidate:
-            return self.getStore()
-
+        """get patches as a dictionary, deleted fields are set to None"""
         res = {}
-        res.update(self.patchStore)
-        for k, v in self.subStores.items():
-            res[k] = v.getPatches()
-        
+        if self.dirty:
+            for k in self.dirty:
+                if k in self.store:
+                    res[k] = _copyValue(self.store[k])
+                else:
+                    res[k] = None
+        if self.subStores:
+            for k, v in self.subStores.items():
+                if k not in res:
+                    patches = v.getPatches()
+                    if len(patches) > 0:
+                        res[k] = patches
+
         return res
-        
+
+    def getDeletions(self):
+        """get the paths (tuples) of the deleted fields"""
+        res = []
+        if self.dirty:
+            for k in self.dirty:
+                if k not in self.store:
+                    res.append((k, ))
+        if self.subStores:
+            for k, v in self.subStores.items():
+                if not self.dirty or k not in self.dirty:
+                    for path in v.getDeletions():
+                        res.append((k, ) + path)
+        return res
+
     def getStore(self):
         """get the inner store as dictionary"""
         res = {}
-        res.update(self.store)
-        for k, v in self.subStores.items():
-            res[k] = v.getStore()
+        for k, v in self.store.items():
+            res[k] = _copyValue(v)
         return res
 
     def validateField(self, field):
@@ -66,24 +122,20 @@ class DocumentStore(object):
             raise SchemaViolation(self.collection.__class__, field)
 
         if field in self.store:
-            if isinstance(self.store[field], DocumentStore):
-                return self[field].validate()
-            
-            if field in self.patchStore:
-                try:
-                    return self.validators[field].validate(self.patchStore[field])
-                except ValidationError as e:
-                    raise ValidationError( "'%s' -> %s" % ( field, str(e)) )
-            else:
-                try:
-                    return self.validators[field].validate(self.store[field])
-                except ValidationError as e:
-                    raise ValidationError( "'%s' -> %s" % ( field, str(e)) )
-                except AttributeError:
-                    if isinstance(self.validators[field], dict) and not isinstance(self.store[field], dict):
-                        raise ValueError("Validator expected a sub document for field '%s', got '%s' instead" % (field, self.store[field]) )
-                    else:
-                        raise
+            value = self.store[field]
+            if isinstance(self.validators.get(field), dict):
+                if isinstance(value, DocumentStore):
+                    value = value.store
+                elif not isinstance(value, dict):
+                    raise ValueError("Validator expected a sub document for field '%s', got '%s' instead" % (field, value) )
+                errors = self.collection._compiledFields.validate(value, self.path + (field, ))
+                if len(errors) > 0:
+                    raise InvalidDocument(errors)
+                return True
+
+            if isinstance(value, DocumentStore):
+                value = value.getStore()
+            return self.collection._compiledFields.validateField(self.path, field, value)
         return True
 
     def validate(self):
@@ -91,35 +143,17 @@ class DocumentStore(object):
         if not self.mustValidate:
             return True
 
-        res = {}
-        for field in self.validators.keys():
-            try:
-                if isinstance(self.validators[field], dict) and field not in self.store:
-                    self.store[field] = DocumentStore(self.collection, validators = self.validators[field], initDct = {}, subStore=True, validateInit=self.validateInit)
-                self.validateField(field)
-            except InvalidDocument as e:
-                res.update(e.errors)
-            except (ValidationError, SchemaViolation) as e:
-                res[field] = str(e)
-
-        if len(res) > 0:
-            raise InvalidDocument(res)
-        
+        errors = self.collection._compiledFields.validate(self.store, self.path)
+        if len(errors) > 0:
+            raise InvalidDocument(errors)
+
         return True
 
     def set(self, dct):
         """Set the values to a dict. Any missing value will be filled by it's default"""
         for field, value in dct.items():
             if field not in self.collection.arangoPrivates:
-                if isinstance(value, dict):
-                    if field in self.validators and isinstance(self.validators[field], dict):
-                        vals = self.validators[field]
-                    else:
-                        vals = {}
-                    self[field] = DocumentStore(self.collection, validators = vals, initDct = value, patch = self.patching, subStore=True, validateInit=self.validateInit)
-                    self.subStores[field] = self.store[field]
-                else:
-                    self[field] = value
+                self[field] = value
 
     def fill_default(self):
         """replace all None values with defaults"""
@@ -128,102 +162,445 @@ class DocumentStore(object):
                 self[field].fill_default()
             elif self[field] is None:
                 self[field] = value.default
- 
+
     def __dir__(self):
         return dir(self.getStore())
 
     def __len__(self):
         return len(self.store)
 
-    def __dict__(self):
-        return dict(self.store) + dict(self.patchStore)
-
-    def __contains__(self, field):
-        return field in self.store
-        
     def __getitem__(self, field):
         """Get an element from the store"""
-        if self.mustValidate and (field in self.validators) and isinstance(self.validators[field], dict) and (field not in self.store) :
-            self.store[field] = DocumentStore(self.collection, validators = self.validators[field], initDct = {}, patch = self.patching, subStore=True, validateInit=self.validateInit)
-            self.subStores[field] = self.store[field]
-            self.patchStore[field] = self.store[field]
+        store = self.store
+        if self.mustValidate and (field in self.validators) and isinstance(self.validators[field], dict) and (field not in store) :
+            self._wrap(field, {})
 
         if self.collection._validation['allow_foreign_fields'] or self.collection.hasField(field):
-            return self.store.get(field)
-
-        if not field in self.validators:
+            value = store.get(field)
+        elif not field in self.validators:
             raise SchemaViolation(self.collection.__class__, field)
+        else:
+            try:
+                value = store[field]
+            except KeyError:
+                value = store[field] = self.validators[field].default
+
+        if type(value) is dict:
+            return self._wrap(field, value)
+        if type(value) is list:
+            value = store[field] = _TrackedList(self, field, value)
+        return value
 
-        try:
-            return self.store[field]
-        except KeyError:
-            self.store[field] = self.validators[field].default
-        return self.store[field]
-       
     def __setitem__(self, field, value):
         """Set an element in the store"""
         if self.mustValidate and (not self.collection._validation['allow_foreign_fields']) and (field not in self.validators) and (field not in self.collection.arangoPrivates):
             raise SchemaViolation(self.collection.__class__, field)
-        
+
         if field in self.collection.arangoPrivates:
             raise ValueError("DocumentStore cannot contain private field (got %s)" % field)
 
-        if isinstance(value, dict):
-            if field in self.validators and isinstance(self.validators[field], dict):
-                vals = self.validators[field]
-            else:
-                vals = {}
-            self.store[field] = DocumentStore(self.collection, validators = vals, initDct = value, patch = self.patching, subStore=True, validateInit=self.validateInit)
-            
-            self.subStores[field] = self.store[field]
-        else:
-            self.store[field] = value
+        value = _copyValue(value)
+        self.store[field] = value
+        if self.subStores and field in self.subStores:
+            del self.subStores[field]
 
         if self.patching:
-            self.patchStore[field] = self.store[field]
+            self._markDirty(field)
 
         if self.mustValidate and self.collection._validation['on_set']:
             self.validateField(field)
 
     def __delitem__(self, k):
         """removes an element from the store"""
-        try:
-            del(self.store[k])
-        except:
-            pass
+        if k in self.store:
+            del self.store[k]
+            self._markDirty(k)
+        if self.subStores:
+            self.subStores.pop(k, None)
 
-        try:
-            del(self.patchStore[k])
-        except:
-            pass
+    def __contains__(self, k):
+        """returns true or false weither the store has a key k"""
+        return (k in self.store) or (k in self.validators)
 
-        try:
-            del(self.subStores[k])
-        except:
-            pass
+    def __repr__(self):
+        return "<store: %s>" % repr(self.store)
+
+class DictStore(object):
+    """A store for the documents of collections that have neither a schema nor validation. It is a thin layer over a dictionary.
+    Sub documents and lists are returned as dictionaries and lists that report their modifications, so that patches only contain what changed"""
+
+    __slots__ = ("privates", "store", "dirty", "patching")
+
+    def __init__(self, collection, initDct = None, patch = False):
+        self.privates = collection.arangoPrivates
+        if initDct:
+            self.store = dict(initDct)
+            for priv in self.privates:
+                self.store.pop(priv, None)
+        else:
+            self.store = {}
+        # the paths (tuples) of the modified and deleted values, created on the first modification
+        self.dirty = None
+        if patch:
+            self.dirty = set((k, ) for k in self.store)
+        self.patching = True
+
+    def _markDirty(self, path):
+        if self.dirty is None:
+            self.dirty = set()
+        self.dirty.add(path)
+
+    def resetPatch(self):
+        """reset patches"""
+        self.dirty = None
+
+    def _dirtyValues(self):
+        """yields (path, value, deleted) for the modified values, those under a modified value are skipped"""
+        if not self.dirty:
+            return
+        paths = sorted(self.dirty, key = len)
+        done = set()
+        for path in paths:
+            skip = False
+            for i in range(1, len(path)):
+                if path[:i] in done:
+                    skip = True
+                    break
+            if skip:
+                continue
+            done.add(path)
+
+            value = self.store
+            for k in path:
+                if not isinstance(value, dict) or k not in value:
+                    value = _deleted
+                    break
+                value = value[k]
+            yield path, value
+
+    def getPatches(self):
+        """get patches as a dictionary, deleted values are set to None"""
+        res = {}
+        for path, value in self._dirtyValues():
+            patch = res
+            for k in path[:-1]:
+                patch = patch.setdefault(k, {})
+            if value is _deleted:
+                patch[path[-1]] = None
+            else:
+                patch[path[-1]] = _copyValue(value)
+        return res
+
+    def getDeletions(self):
+        """get the paths (tuples) of the deleted values"""
+        return [path for path, value in self._dirtyValues() if value is _deleted]
+
+    def getStore(self):
+        """get the inner store as dictionary"""
+        return _copyValue(self.store)
+
+    def validate(self):
+        """there is nothing to validate"""
+        return True
+
+    def set(self, dct):
+        """Set the values to a dict"""
+        for field, value in dct.items():
+            if field not in self.privates:
+                self[field] = value
+
+    def fill_default(self):
+        """there are no defaults"""
+        pass
+
+    def __dir__(self):
+        return dir(self.store)
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, field):
+        """Get an element from the store"""
+        value = self.store.get(field)
+        if type(value) is dict:
+            value = self.store[field] = _TrackedDict(self, (field, ), value)
+        elif type(value) is list:
+            value = self.store[field] = _TrackedList(self, (field, ), value)
+        return value
+
+    def __setitem__(self, field, value):
+        """Set an element in the store"""
+        if field in self.privates:
+            raise ValueError("DictStore cannot contain private field (got %s)" % field)
+        self.store[field] = _copyValue(value)
+        if self.patching:
+            self._markDirty((field, ))
+
+    def __delitem__(self, k):
+        """removes an element from the store"""
+        if k in self.store:
+            del self.store[k]
+            self._markDirty((k, ))
 
     def __contains__(self, k):
         """returns true or false weither the store has a key k"""
-        return (k in self.store) or (k in self.validators)
+        return k in self.store
 
     def __repr__(self):
         return "<store: %s>" % repr(self.store)
 
+class LazyDictStore(DictStore):
+    """A DictStore for documents fetched with lazy = True. It keeps the json text of the document, sliced out of the response of ArangoDB
+    so that the rest of the batch can be released, and the positions of the values in it: a value is only decoded when it is accessed.
+    The text is released once every value has been decoded"""
+
+    __slots__ = ("text", "pending")
+
+    def __init__(self, collection, lazyJson):
+        DictStore.__init__(self, collection)
+        pending = dict(lazyJson.offsets)
+        for priv in self.privates:
+            pending.pop(priv, None)
+        if not pending:
+            self.text = None
+            self.pending = pending
+            return
+        first = min(start for start, end in pending.values())
+        last = max(end for start, end in pending.values())
+        self.text = lazyJson.text[first:last]
+        self.pending = dict((field, (start - first, end - first)) for field, (start, end) in pending.items())
+
+    def _decode(self, field):
+        start, end = self.pending.pop(field)
+        self.store[field] = json.loads(self.text[start:end])
+        if not self.pending:
+            self.text = None
+
+    def _decodeAll(self):
+        for field in list(self.pending):
+            self._decode(field)
+
+    def getStore(self):
+        """get the inner store as dictionary"""
+        self._decodeAll()
+        return DictStore.getStore(self)
+
+    def __dir__(self):
+        self._decodeAll()
+        return DictStore.__dir__(self)
+
+    def __len__(self):
+        return len(self.store) + len(self.pending)
+
+    def __getitem__(self, field):
+        """Get an element from the store, decodes it on the first access"""
+        if field in self.pending:
+            self._decode(field)
+        return DictStore.__getitem__(self, field)
+
+    def __setitem__(self, field, value):
+        """Set an element in the store"""
+        DictStore.__setitem__(self, field, value)
+        self.pending.pop(field, None)
+
+    def __delitem__(self, k):
+        """removes an element from the store"""
+        if self.pending.pop(k, None) is not None:
+            self._markDirty((k, ))
+        else:
+            DictStore.__delitem__(self, k)
+
+    def __contains__(self, k):
+        """returns true or false weither the store has a key k"""
+        return k in self.store or k in self.pending
+
+    def __repr__(self):
+        return "<store: %s, undecoded: %s>" % (repr(self.store), list(self.pending))
+
+_deleted = object()
+
+class _TrackedList(list):
+    """A list of a document that reports its modifications to the store that owns it. The whole list is patched"""
+
+    __slots__ = ("_owner", "_key")
+
+    def __init__(self, owner, key, values):
+        list.__init__(self, values)
+        self._owner = owner
+        self._key = key
+
+    def _markModified(self, args):
+        self._owner._markDirty(self._key)
+
+    def _track(self, i, value):
+        if type(value) is dict:
+            value = _TrackedDict(self._owner, self._key, value, True)
+            list.__setitem__(self, i, value)
+        elif type(value) is list:
+            value = _TrackedList(self._owner, self._key, value)
+            list.__setitem__(self, i, value)
+        return value
+
+    def __getitem__(self, i):
+        value = list.__getitem__(self, i)
+        if isinstance(i, slice):
+            return value
+        return self._track(i, value)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._track(i, list.__getitem__(self, i))
+
+    def __reduce_ex__(self, protocol):
+        return (list, (_copyValue(self), ))
+
+def _trackedMethod(cls, name):
+    method = getattr(cls.__bases__[0], name)
+    def mutate(self, *args, **kwargs):
+        res = method(self, *args, **kwargs)
+        self._markModified(args)
+        return res
+    mutate.__name__ = name
+    setattr(cls, name, mutate)
+
+class _TrackedDict(dict):
+    """A dictionary of a document that reports its modifications to the store that owns it.
+    Inside of lists the whole list is patched, otherwise only the keys that are modified"""
+
+    __slots__ = ("_owner", "_key", "_inList")
+
+    def __init__(self, owner, key, values, inList = False):
+        dict.__init__(self, values)
+        self._owner = owner
+        self._key = key
+        self._inList = inList
+
+    def _markModified(self, args):
+        if self._inList:
+            self._owner._markDirty(self._key)
+        else:
+            self._owner._markDirty(self._key + (args[0], ))
+
+    def _track(self, k, value):
+        if type(value) is dict:
+            if self._inList:
+                value = _TrackedDict(self._owner, self._key, value, True)
+            else:
+                value = _TrackedDict(self._owner, self._key + (k, ), value)
+            dict.__setitem__(self, k, value)
+        elif type(value) is list:
+            if self._inList:
+                value = _TrackedList(self._owner, self._key, value)
+            else:
+                value = _TrackedList(self._owner, self._key + (k, ), value)
+            dict.__setitem__(self, k, value)
+        return value
+
+    def __getitem__(self, k):
+        return self._track(k, dict.__getitem__(self, k))
+
+    def get(self, k, default = None):
+        if k in self:
+            return self[k]
+        return default
+
+    def __setitem__(self, k, value):
+        dict.__setitem__(self, k, _copyValue(value))
+        self._markModified((k, ))
+
+    def __delitem__(self, k):
+        dict.__delitem__(self, k)
+        self._markModified((k, ))
+
+    def pop(self, k, *default):
+        if k in self:
+            self._markModified((k, ))
+        return dict.pop(self, k, *default)
+
+    def setdefault(self, k, default = None):
+        if k not in self:
+            self[k] = default
+        return self[k]
+
+    def update(self, *args, **kwargs):
+        for k, v in dict(*args, **kwargs).items():
+            self[k] = v
+
+    def popitem(self):
+        k, v = dict.popitem(self)
+        self._markModified((k, ))
+        return k, v
+
+    def clear(self):
+        for k in list(self.keys()):
+            del self[k]
+
+    def __reduce_ex__(self, protocol):
+        return (dict, (_copyValue(self), ))
+
+for _name in ("__setitem__", "__delitem__", "__iadd__", "__imul__", "append", "extend", "insert", "pop", "remove", "clear", "sort", "reverse"):
+    _trackedMethod(_TrackedList, _name)
+
+def _copyValue(value):
+    """copies the dictionaries and lists in 'value', returns plain ones for those of documents"""
+    if isinstance(value, dict):
+        res = {}
+        for k, v in dict.items(value):
+            res[k] = _copyValue(v)
+        return res
+    if isinstance(value, list):
+        return [_copyValue(v) for v in list.__iter__(value)]
+    if isinstance(value, (DocumentStore, DictStore)):
+        return value.getStore()
+    return value
+
+def _withoutPaths(patches, paths):
+    """removes the values at 'paths' from the patches"""
+    for path in paths:
+        patch = patches
+        for k in path[:-1]:
+            patch = patch[k]
+        del patch[path[-1]]
+    return patches
+
+def _nullPaths(paths):
+    """returns patches that set the values at 'paths' to null"""
+    res = {}
+    for path in paths:
+        patch = res
+        for k in path[:-1]:
+            patch = patch.setdefault(k, {})
+        patch[path[-1]] = None
+    return res
+
+def _containsNull(patches, deletions, path = ()):
+    """returns True if the patches set a value to None that is not a deletion"""
+    for k, v in patches.items():
+        if v is None:
+            if path + (k, ) not in deletions:
+                return True
+        elif isinstance(v, dict) and _containsNull(v, deletions, path + (k, )):
+            return True
+    return False
+
 class Document(object):
     """The class that represents a document. Documents are meant to be instanciated by collections"""
 
+    privates = ["_id", "_key", "_rev"]
+    typeName = "ArangoDoc"
+
     def __init__(self, collection, jsonFieldInit = None, on_load_validation=False) :
         if jsonFieldInit is None :
             jsonFieldInit = {}
-        self.privates = ["_id", "_key", "_rev"]
         self.reset(collection, jsonFieldInit, on_load_validation=on_load_validation)
-        self.typeName = "ArangoDoc"
-        # self._store = None
 
     def reset(self, collection, jsonFieldInit = None, on_load_validation=False) :
         """replaces the current values in the document by those in jsonFieldInit"""
         if not jsonFieldInit:
             jsonFieldInit = {}
+        elif isinstance(jsonFieldInit, LazyJSON):
+            # documents with a schema are decoded at once
+            jsonFieldInit = jsonFieldInit.decode()
         for k in self.privates:
             setattr(self, k, None)
 
@@ -231,6 +608,8 @@ class Document(object):
         self.connection = self.collection.connection
         
         self.setPrivates(jsonFieldInit)
+        # True for documents fetched with a projection, they are only patched
+        self.partial = False
         self._store = DocumentStore(self.collection, validators=self.collection._fields, initDct=jsonFieldInit, validateInit=on_load_validation)
         if self.collection._validation['on_load']:
             self.validate()
@@ -270,17 +649,27 @@ class Document(object):
         self.setPrivates(fieldDict)
         self._store.set(fieldDict)
 
-    def save(self, waitForSync = False, **docArgs):
+    def save(self, waitForSync = False, checkRev = False, **docArgs):
         """Saves the document to the database by either performing a POST (for a new document) or a PUT (complete document overwrite).
         If you want to only update the modified fields use the .patch() function.
         Use docArgs to put things such as 'waitForSync = True' (for a full list cf ArangoDB's doc).
+        With checkRev = True, the overwrite only happens if the document still has the revision self._rev in the database, otherwise a PreconditionFailedError is raised.
+        Partial documents, fetched with a projection, are patched instead so that the fields that were not fetched are kept.
         It will only trigger a saving of the document if it has been modified since the last save. If you want to force the saving you can use forceSave()"""
+        if self.partial and self._id is not None:
+            return self.patch(checkRev = checkRev, waitForSync = waitForSync, **docArgs)
         self._store.fill_default()
         payload = self._store.getStore()
         # print(payload)
-        self._save(payload, waitForSync = False, **docArgs)
+        self._save(payload, waitForSync = waitForSync, checkRev = checkRev, **docArgs)
+
+    def _revHeaders(self, checkRev):
+        """the headers that make a request conditional on the revision of the document"""
+        if checkRev and self._rev is not None:
+            return {"If-Match": self._rev}
+        return None
 
-    def _save(self, payload, waitForSync = False, **docArgs):
+    def _save(self, payload, waitForSync = False, checkRev = False, **docArgs):
 
         if self.modified:
 
@@ -294,6 +683,12 @@ class Document(object):
                     payload["_key"] = self._key
                 self.collection._saveBatch(self, params)
                 return self._store.resetPatch()
+            if self.connection.writeBehind is not None:
+                if checkRev and self._rev is not None:
+                    payload["_rev"] = self._rev
+                    params["ignoreRevs"] = False
+                self.connection.writeBehind.save(self, payload, params)
+                return self._store.resetPatch()
             if self._id is None:
                 if self._key is not None:
                     payload["_key"] = self._key
@@ -304,7 +699,7 @@ class Document(object):
                 self.setPrivates(data)
             else:
                 payload = json.dumps(payload, default=str)
-                r = self.connection.session.put(self.getURL(), params = params, data = payload)
+                r = self.connection.session.put(self.getURL(), params = params, data = payload, headers = self._revHeaders(checkRev))
                 update = True
                 data = r.json()
 
@@ -314,8 +709,11 @@ class Document(object):
                     self._rev = data['_rev']
                 else:
                     self.set(data)
+                self.collection._documentWritten(self)
             else:
                 if update:
+                    if r.status_code == 412:
+                        raise PreconditionFailedError(data['errorMessage'], data)
                     raise UpdateError(data['errorMessage'], data)
                 else:
                     if data["errorNum"] == 1210:
@@ -339,56 +737,97 @@ class Document(object):
         self.save()
         return (old_key, self._key)
 
-    def patch(self, keepNull = True, **docArgs):
-        """Saves the document by only updating the modified fields.
-        The default behaviour concening the keepNull parameter is the opposite of ArangoDB's default, Null values won't be ignored
+    def patch(self, keepNull = True, checkRev = False, **docArgs):
+        """Saves the document by only updating the modified fields, including those of sub documents. Lists are sent whole.
+        The default behaviour concening the keepNull parameter is the opposite of ArangoDB's default, Null values won't be ignored.
+        Deleted fields are removed by sending them as null with keepNull = False, unless the patch also sets values to null: then the whole document is saved,
+        or for partial documents, the deletions are sent by a second patch.
+        With checkRev = True, the update only happens if the document still has the revision self._rev in the database, otherwise a PreconditionFailedError is raised.
         Use docArgs for things such as waitForSync = True"""
 
         if self._id is None:
             raise ValueError("Cannot patch a document that was not previously saved")
 
+        payload = self._store.getPatches()
+        deletions = self._store.getDeletions()
+        if len(deletions) > 0 and keepNull:
+            if _containsNull(payload, set(deletions)):
+                if not self.partial:
+                    self.modified = True
+                    return self.save(checkRev = checkRev, **docArgs)
+                self._sendPatch(_withoutPaths(payload, deletions), True, checkRev, docArgs)
+                self._sendPatch(_nullPaths(deletions), False, False, docArgs)
+                return self._store.resetPatch()
+            keepNull = False
+
+        self._sendPatch(payload, keepNull, checkRev, docArgs)
+        self._store.resetPatch()
+
+    def _sendPatch(self, payload, keepNull, checkRev, docArgs):
         params = dict(docArgs)
         params.update({'collection': self.collection.name, 'keepNull' : keepNull})
+        if checkRev and self._rev is not None and (self.collection._isBulkInProgress or self.connection.writeBehind is not None):
+            # multi-document requests check the revisions in the documents
+            payload["_rev"] = self._rev
+            params["ignoreRevs"] = False
 
         if self.collection._isBulkInProgress:
-            self.collection._patchBatch(self, params )
-            return self._store.resetPatch()
+            if len(payload) > 0:
+                self.collection._patchBatch(self, params, payload)
+            return
 
-        payload = self._store.getPatches()
-        
         if self.collection._validation['on_save']:
             self.validate()
 
+        if self.connection.writeBehind is not None:
+            if len(payload) > 0:
+                self.connection.writeBehind.patch(self, payload, params)
+            return
+
         if len(payload) > 0:
             payload = json.dumps(payload, default=str)
 
-            r = self.connection.session.patch(self.getURL(), params = params, data = payload)
+            r = self.connection.session.patch(self.getURL(), params = params, data = payload, headers = self._revHeaders(checkRev))
             data = r.json()
             if (r.status_code == 201 or r.status_code == 202) and "error" not in data:
                 self._rev = data['_rev']
+                self.collection._documentWritten(self)
+            elif r.status_code == 412:
+                raise PreconditionFailedError(data['errorMessage'], data)
             else:
                 raise UpdateError(data['errorMessage'], data)
 
             self.modified = False
 
-        self._store.resetPatch()
-
-    def delete(self):
-        "deletes the document from the database"
-        if self._id is None:
+    def delete(self, checkRev = False):
+        """deletes the document from the database.
+        With checkRev = True, the deletion only happens if the document still has the revision self._rev in the database, otherwise a PreconditionFailedError is raised."""
+        if self._id is None and (self.connection.writeBehind is None or not self.connection.writeBehind.isPending(self)):
             raise DeletionError("Can't delete a document that was not saved")
-        
+
+        params = {'collection': self.collection.name}
+        if checkRev and self._rev is not None and (self.collection._isBulkInProgress or self.connection.writeBehind is not None):
+            # multi-document requests check the revisions in the documents
+            params["ignoreRevs"] = False
+
         if self.collection._isBulkInProgress:
-            params = {'collection': self.collection.name}
             self.collection._deleteBatch(self, params)
             self.modified = True
             return
 
-        r = self.connection.session.delete(self.getURL())
+        if self.connection.writeBehind is not None:
+            self.connection.writeBehind.delete(self, params)
+            self.modified = True
+            return
+
+        r = self.connection.session.delete(self.getURL(), headers = self._revHeaders(checkRev))
         data = r.json()
 
+        if r.status_code == 412:
+            raise PreconditionFailedError(data['errorMessage'], data)
         if (r.status_code != 200 and r.status_code != 202) or 'error' in data:
             raise DeletionError(data['errorMessage'], data)
+        self.collection._documentDeleted(self._key)
         self.reset(self.collection)
 
         self.modified = True
@@ -474,7 +913,21 @@ class Document(object):
         """removes an element from the document"""
         self.modified = True
         del(self._store[k])
-    
+
+    def __reduce__(self):
+        """Documents are pickled without their collection nor connection: only their values, privates and the names of their database and collection.
+        They are bound to the collection again when unpickled, in another process that must call serialization.registerConnection() first"""
+        return (_rebuildDocument, documentState(self))
+
+    def __copy__(self):
+        """copies are bound to the collection of the document, not to the connection of serialization.registerConnection()"""
+        privates = tuple(getattr(self, p) for p in self.privates)
+        return _buildDocument(self.collection, privates, self._store.getStore(), self.partial)
+
+    def __deepcopy__(self, memo):
+        # the values are already copied
+        return self.__copy__()
+
     def __str__(self):
         return repr(self)
 
@@ -488,12 +941,14 @@ class Document(object):
 
 class Edge(Document):
     """An Edge document"""
+
+    privates = ["_id", "_key", "_rev", "_from", "_to"]
+    typeName = "ArangoEdge"
+
     def __init__(self, edgeCollection, jsonFieldInit = None, on_load_validation=False) :
         if not jsonFieldInit:
             jsonFieldInit = {}
-            
-        self.typeName = "ArangoEdge"
-        self.privates = ["_id", "_key", "_rev", "_from", "_to"]
+
         self.reset(edgeCollection, jsonFieldInit, on_load_validation=on_load_validation)
 
     def reset(self, edgeCollection, jsonFieldInit = None, on_load_validation=False) :
@@ -532,14 +987,132 @@ class Edge(Document):
 
         if not getattr(self, "_from") or not getattr(self, "_to"):
             raise AttributeError("You must specify '_from' and '_to' attributes before saving. You can also use the function 'links()'")
+        if self.partial and self._id is not None:
+            return self.patch(**edgeArgs)
 
         payload = self._store.getStore()
         payload["_from"] = self._from
         payload["_to"] = self._to
         Document._save(self, payload, **edgeArgs)
+        self._adjacencyChanged(self._id, self._from, self._to)
+
+    def patch(self, keepNull = True, checkRev = False, **docArgs):
+        """Works like Document's, the edge is also removed from the adjacency cache of its collection"""
+        Document.patch(self, keepNull = keepNull, checkRev = checkRev, **docArgs)
+        self._adjacencyChanged(self._id, self._from, self._to)
+
+    def delete(self, checkRev = False):
+        """Works like Document's, the edge is also removed from the adjacency cache of its collection"""
+        # delete() resets the edge
+        _id, _from, _to = self._id, self._from, self._to
+        Document.delete(self, checkRev = checkRev)
+        self._adjacencyChanged(_id, _from, _to)
+
+    def _adjacencyChanged(self, _id, _from, _to):
+        adjacencyCache = getattr(self.collection, "adjacencyCache", None)
+        if adjacencyCache is not None:
+            adjacencyCache.discardEdge(_id, _from, _to)
 
     # def __getattr__(self, k):
     #     if k == "_from" or k == "_to":
     #         return self._store[k]
     #     else:
     #         return Document.__getattr__(self, k)
+
+class SchemalessDocument(Document):
+    """A document of a collection that has neither fields nor validation, collections use it automatically instead of Document.
+    Its values are kept in a DictStore, sub documents are plain dictionaries. If it is created from a LazyJSON, its values are decoded on first access"""
+
+    def reset(self, collection, jsonFieldInit = None, on_load_validation=False) :
+        """replaces the current values in the document by those in jsonFieldInit"""
+        if not jsonFieldInit:
+            jsonFieldInit = {}
+        self.collection = collection
+        self.connection = collection.connection
+        for priv in self.privates:
+            setattr(self, priv, jsonFieldInit.get(priv))
+        self.partial = False
+        if isinstance(jsonFieldInit, LazyJSON):
+            self._store = LazyDictStore(collection, jsonFieldInit)
+        else:
+            self._store = DictStore(collection, jsonFieldInit)
+        self.modified = True
+
+class SchemalessEdge(SchemalessDocument, Edge):
+    """An edge of a collection that has neither fields nor validation, edge collections use it automatically instead of Edge"""
+    pass
+
+class ReadOnlyRow(object):
+    """A lightweight and immutable view on a document returned by a query run with rowMode = "readonly".
+    Fields are read as items or attributes (row["name"], row.name, row._key) straight from the json returned by ArangoDB, there is
+    no DocumentStore, no validation and no patch tracking. The nested values are those of the json and must not be modified.
+    getCollection() returns the collection of the row, toDocument() a full Document."""
+
+    __slots__ = ("_collection", "_dct")
+
+    def __init__(self, collection, dct):
+        object.__setattr__(self, "_collection", collection)
+        object.__setattr__(self, "_dct", dct)
+
+    def _rebind(self, collection, dct):
+        object.__setattr__(self, "_collection", collection)
+        object.__setattr__(self, "_dct", dct)
+
+    def __getattr__(self, k):
+        try:
+            return object.__getattribute__(self, "_dct")[k]
+        except KeyError:
+            raise AttributeError("Row has no field '%s'" % k)
+
+    def __setattr__(self, k, v):
+        raise AttributeError("Rows are read-only, use toDocument() to get a document that can be modified")
+
+    def __delattr__(self, k):
+        raise AttributeError("Rows are read-only, use toDocument() to get a document that can be modified")
+
+    def __getitem__(self, k):
+        return self._dct[k]
+
+    def __setitem__(self, k, v):
+        raise TypeError("Rows are read-only, use toDocument() to get a document that can be modified")
+
+    def __delitem__(self, k):
+        raise TypeError("Rows are read-only, use toDocument() to get a document that can be modified")
+
+    def get(self, k, default = None):
+        return self._dct.get(k, default)
+
+    def __contains__(self, k):
+        return k in self._dct
+
+    def __iter__(self):
+        return iter(self._dct)
+
+    def __len__(self):
+        return len(self._dct)
+
+    def keys(self):
+        return self._dct.keys()
+
+    def values(self):
+        return self._dct.values()
+
+    def items(self):
+        return self._dct.items()
+
+    def getStore(self):
+        """returns a copy of the row as a dictionary"""
+        return _copyValue(dict(self._dct.items()))
+
+    def getCollection(self):
+        """returns the collection of the row, None if it has no _id or its collection is unknown"""
+        return self._collection
+
+    def toDocument(self):
+        """returns a Document (or Edge) of the row's collection, that can be modified and saved"""
+        if self._collection is None:
+            raise CreationError("This row does not belong to a collection")
+        return self._collection.documentClass(self._collection, self.getStore())
+
+    def __repr__(self):
+        return "ReadOnlyRow: %s" % repr(self._dct)
@@ -1,7 +1,7 @@
 import json
 from future.utils import with_metaclass
 
-from .theExceptions import (CreationError, DeletionError, UpdateError, TraversalError)
+from .theExceptions import (CreationError, DeletionError, UpdateError, TraversalError, ArangoError, BulkOperationError, InvalidDocument)
 from . import collection as COL
 from . import document as DOC
 
@@ -49,6 +49,14 @@ def getGraphClasses():
     "returns a dictionary of all defined graph classes"
     return Graph_metaclass.graphClasses
 
+def _validateAttributes(collection, attributes):
+    """raises an InvalidDocument if the values of a new document of 'collection' do not respect its schema. The dictionary is validated as it is, no document is built"""
+    if any(k in attributes for k in collection.arangoPrivates):
+        attributes = dict((k, v) for k, v in attributes.items() if k not in collection.arangoPrivates)
+    errors = collection._compiledFields.validate(attributes)
+    if len(errors) > 0:
+        raise InvalidDocument(errors)
+
 class EdgeDefinition(object):
     """An edge definition for a graph"""
 
@@ -125,10 +133,68 @@ class Graph(with_metaclass(Graph_metaclass, object)):
 
         data = r.json()
         if r.status_code == 201 or r.status_code == 202:
+            self.database[collectionName]._documentsCreated([data["vertex"]])
             return self.database[collectionName][data["vertex"]["_key"]]
 
         raise CreationError("Unable to create vertice, %s" % data["errorMessage"], data)
 
+    def createVertices(self, collectionName, docs, batchSize = 1000, waitForSync = False, rawResults = False):
+        """adds several vertices to the graph, 'batchSize' vertices per request, and returns them as a list of documents,
+        or with rawResults = True of dictionaries holding their values and privates.
+        The vertices are validated like in createVertex(), raises a BulkOperationError listing the vertices that could not be saved"""
+        if collectionName not in self.getVertexCollections():
+            raise KeyError("'%s' is not among the vertex collections of the graph" % collectionName)
+
+        collection = self.database[collectionName]
+        mustValidate = not collection.isSchemaless()
+        payloads = []
+        for attributes in docs:
+            if mustValidate:
+                _validateAttributes(collection, attributes)
+            payloads.append(attributes)
+
+        return self._saveBatches(collection, payloads, batchSize, waitForSync, "creating vertices failed", rawResults)
+
+    def getVertexCollections(self):
+        """returns the set of the names of all vertex collections of the graph"""
+        res = set(self._orphanedCollections)
+        for ed in self.definitions.values():
+            res.update(ed.fromCollections)
+            res.update(ed.toCollections)
+        return res
+
+    def _saveBatches(self, collection, payloads, batchSize, waitForSync, errorMessage, rawResults):
+        url = "%s/%s" % (collection.getDocumentsURL(), collection.name)
+        ret = []
+        bulkError = None
+        for i in range(0, len(payloads), batchSize):
+            batch = payloads[i:i+batchSize]
+            r = self.connection.session.post(url, data = json.dumps(batch, default=str), params = {'waitForSync' : waitForSync})
+            data = r.json()
+            if r.status_code >= 400 or not isinstance(data, list):
+                raise CreationError("%s, %s" % (errorMessage, data.get("errorMessage")), data)
+
+            for payload, res in zip(batch, data):
+                if res.get("error"):
+                    if bulkError is None:
+                        bulkError = BulkOperationError(errorMessage)
+                    bulkError.addBulkError(ArangoError(res), payload)
+                elif rawResults:
+                    doc = dict(payload)
+                    for priv in collection.arangoPrivates:
+                        if priv in res:
+                            doc[priv] = res[priv]
+                    ret.append(doc)
+                else:
+                    doc = collection.documentClass(collection, payload)
+                    doc.setPrivates(res)
+                    ret.append(doc)
+            collection._documentsCreated(data)
+
+        if bulkError is not None:
+            raise bulkError
+        return ret
+
     def deleteVertex(self, document, waitForSync = False):
         """deletes a vertex from the graph as well as al linked edges"""
         url = "%s/vertex/%s" % (self.getURL(), document._id)
@@ -166,20 +232,63 @@ class Graph(with_metaclass(Graph_metaclass, object)):
         r = self.connection.session.post(url, data = json.dumps(payload, default=str), params = {'waitForSync' : waitForSync})
         data = r.json()
         if r.status_code == 201 or r.status_code == 202:
+            self.database[collectionName]._documentsCreated([data["edge"]])
             return self.database[collectionName][data["edge"]["_key"]]
         # print "\ngraph 160, ", data, payload, _fromId
         raise CreationError("Unable to create edge, %s" % r.json()["errorMessage"], data)
 
+    def createEdges(self, collectionName, triples, batchSize = 1000, waitForSync = False, rawResults = False):
+        """creates several edges, 'batchSize' edges per request, and returns them as a list of documents, or with rawResults = True of dictionaries.
+        'triples' is an iterable of (_from, _to, edgeAttributes), where _from and _to can be either _ids or saved documents.
+        The edge definition is checked once for the whole batch, raises a BulkOperationError listing the edges that could not be saved"""
+        if collectionName not in self.definitions:
+            raise KeyError("'%s' is not among the edge definitions" % collectionName)
+
+        definition = self.definitions[collectionName]
+        fromCollections = set(definition.fromCollections)
+        toCollections = set(definition.toCollections)
+        collection = self.database[collectionName]
+        mustValidate = not collection.isSchemaless()
+
+        payloads = []
+        for _from, _to, edgeAttributes in triples:
+            _fromId = getattr(_from, "_id", _from)
+            _toId = getattr(_to, "_id", _to)
+            if not _fromId:
+                raise ValueError("Invalid _fromId: %s" % _fromId)
+            if not _toId:
+                raise ValueError("Invalid _toId: %s" % _toId)
+            if _fromId.split("/")[0] not in fromCollections:
+                raise ValueError("'%s' is not in the 'from' collections of edge definition '%s'" % (_fromId, collectionName))
+            if _toId.split("/")[0] not in toCollections:
+                raise ValueError("'%s' is not in the 'to' collections of edge definition '%s'" % (_toId, collectionName))
+
+            if mustValidate:
+                collection.validatePrivate("_from", _fromId)
+                collection.validatePrivate("_to", _toId)
+                # like createEdge(), without building the edge
+                payload = collection.getDefaultDocument()
+                for k, v in edgeAttributes.items():
+                    if k not in collection.arangoPrivates:
+                        payload[k] = v
+                _validateAttributes(collection, payload)
+            else:
+                payload = dict(edgeAttributes)
+            payload.update({'_from' : _fromId, '_to' : _toId})
+            payloads.append(payload)
+
+        return self._saveBatches(collection, payloads, batchSize, waitForSync, "creating edges failed", rawResults)
+
     def link(self, definition, doc1, doc2, edgeAttributes, waitForSync = False):
         """A shorthand for createEdge that takes two documents as input"""
-        if type(doc1) is DOC.Document:
+        if isinstance(doc1, DOC.Document):
             if not doc1._id:
                 doc1.save()
             doc1_id = doc1._id
         else:
             doc1_id = doc1
 
-        if type(doc2) is DOC.Document:
+        if isinstance(doc2, DOC.Document):
             if not doc2._id:
                 doc2.save()
             doc2_id = doc2._id
@@ -216,7 +325,7 @@ class Graph(with_metaclass(Graph_metaclass, object)):
         """
 
         url = "%s/traversal" % self.database.getURL()
-        if type(startVertex) is DOC.Document:
+        if isinstance(startVertex, DOC.Document):
             startVertex_id = startVertex._id
         else:
             startVertex_id = startVertex
@@ -0,0 +1,223 @@
+import itertools
+import json
+import os
+import time
+
+from .theExceptions import UpdateError
+
+__all__ = ["ImportJob"]
+
+# the figures of the import results that are totaled
+_COUNTS = ("documents", "created", "errors", "empty", "updated", "ignored")
+
+class ImportJob(object):
+    """A resumable bulk import, meant to be created by Collection.createImportJob().
+
+    'source' is either the name of a file with one json document per line, or an iterable of dictionaries or documents
+    that yields the same documents in the same order every time. It is sent 'chunkSize' documents at a time through the import API.
+    After every chunk acknowledged by ArangoDB, its results and details are appended to the json lines file 'checkpointFilename'.chunks
+    (see getChunks()), then the offset of the next chunk (in bytes for files, in documents for iterables) and the totals of the import
+    are written to the json file 'checkpointFilename'.
+
+    If this file exists when the job is created, run() resumes the import from the last checkpoint. The first chunk sent after resuming
+    may already have landed before the failure, unless onDuplicate is 'update' or 'replace' it is sent with onDuplicate = resumeOnDuplicate.
+    Documents without a '_key' in that chunk will be created a second time.
+
+    onProgress(job) is called after every chunk, job.progress() returns the figures of the import."""
+
+    def __init__(self, collection, source, checkpointFilename = None, chunkSize = 10000, onDuplicate = "error", resumeOnDuplicate = "ignore", onProgress = None, **params):
+        self.collection = collection
+        self.source = source
+        self.checkpointFilename = checkpointFilename
+        self.chunkSize = chunkSize
+        self.onDuplicate = onDuplicate
+        self.resumeOnDuplicate = resumeOnDuplicate
+        self.onProgress = onProgress
+        self.params = params
+
+        self.isFile = isinstance(source, str)
+        if self.isFile:
+            self.total = os.path.getsize(source)
+        else:
+            try:
+                self.total = len(source)
+            except TypeError:
+                self.total = None
+
+        self.offset = 0
+        # the totals of the chunks committed so far, their results are in the chunk log
+        self.counts = dict((k, 0) for k in _COUNTS)
+        self.counts["chunks"] = 0
+        self.runDocuments = 0
+        self.startOffset = 0
+        self.startTime = None
+        self.done = False
+        self.resuming = False
+
+        if checkpointFilename is None:
+            self.chunksFilename = None
+        else:
+            self.chunksFilename = "%s.chunks" % checkpointFilename
+        self.chunksSize = 0
+
+        if checkpointFilename is not None and os.path.exists(checkpointFilename):
+            self._loadCheckpoint()
+
+    def _sourceName(self):
+        if self.isFile:
+            return os.path.abspath(self.source)
+        return None
+
+    def _loadCheckpoint(self):
+        with open(self.checkpointFilename) as f:
+            checkpoint = json.load(f)
+        if checkpoint["collection"] != self.collection.name or checkpoint["source"] != self._sourceName():
+            raise ValueError("Checkpoint file %s belongs to another import: %s into %s" % (self.checkpointFilename, checkpoint["source"], checkpoint["collection"]))
+        self.offset = checkpoint["offset"]
+        self.counts = checkpoint["counts"]
+        self.done = checkpoint["done"]
+        self.chunksSize = checkpoint["chunksSize"]
+        self.resuming = True
+
+    def _saveCheckpoint(self):
+        if self.checkpointFilename is None:
+            return
+        checkpoint = {
+            "collection": self.collection.name,
+            "source": self._sourceName(),
+            "offset": self.offset,
+            "done": self.done,
+            "counts": self.counts,
+            "chunksSize": self.chunksSize,
+        }
+        tmpFilename = "%s.tmp" % self.checkpointFilename
+        with open(tmpFilename, "w") as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmpFilename, self.checkpointFilename)
+
+    def _logChunk(self, chunk):
+        if self.chunksFilename is None:
+            return
+        with open(self.chunksFilename, "ab") as f:
+            # drops what a run interrupted before its checkpoint logged, the chunk is sent again
+            f.truncate(self.chunksSize)
+            f.write(json.dumps(chunk, default=str).encode("utf-8") + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+            self.chunksSize = f.tell()
+
+    def getChunks(self):
+        """returns the results of the chunks committed so far, with their 'details', as read from the chunk log. Empty without a checkpoint file"""
+        if self.chunksFilename is None or not os.path.exists(self.chunksFilename):
+            return []
+        with open(self.chunksFilename, "rb") as f:
+            data = f.read(self.chunksSize)
+        return [json.loads(line) for line in data.decode("utf-8").splitlines() if line.strip()]
+
+    def _fileChunks(self):
+        with open(self.source, "rb") as f:
+            f.seek(self.offset)
+            while True:
+                lines = []
+                while len(lines) < self.chunkSize:
+                    line = f.readline()
+                    if not line:
+                        break
+                    if line.strip():
+                        lines.append(line.rstrip(b"\r\n"))
+                if len(lines) == 0:
+                    return
+                yield b"\n".join(lines), len(lines), f.tell()
+
+    def _iterableChunks(self):
+        docs = iter(self.source)
+        offset = self.offset
+        if offset > 0:
+            next(itertools.islice(docs, offset - 1, offset), None)
+        while True:
+            payload = []
+            for d in itertools.islice(docs, self.chunkSize):
+                if isinstance(d, dict):
+                    payload.append(json.dumps(d, default=str))
+                else:
+                    payload.append(json.dumps(d.getStore(), default=str))
+            if len(payload) == 0:
+                return
+            offset += len(payload)
+            yield "\n".join(payload), len(payload), offset
+
+    def run(self):
+        """runs the import until the end of the source, or resumes it from the last checkpoint. Returns the job"""
+        if self.done:
+            return self
+
+        url = "%s/import" % self.collection.database.getURL()
+        params = dict(self.params)
+        params.update({"collection": self.collection.name, "type": "documents", "details": "true"})
+
+        self.startOffset = self.offset
+        self.runDocuments = 0
+        self.startTime = time.time()
+        # a chunk sent by a previous run may have landed without being acknowledged
+        resuming, self.resuming = self.resuming, True
+        self._saveCheckpoint()
+        if self.isFile:
+            chunks = self._fileChunks()
+        else:
+            chunks = self._iterableChunks()
+
+        for payload, nbDocuments, nextOffset in chunks:
+            if resuming and self.onDuplicate not in ("update", "replace"):
+                params["onDuplicate"] = self.resumeOnDuplicate
+            else:
+                params["onDuplicate"] = self.onDuplicate
+            resuming = False
+
+            r = self.collection.connection.session.post(url, params = params, data = payload)
+            self.collection._importDone()
+            data = r.json()
+            if r.status_code != 201 or data.get("error"):
+                raise UpdateError("Import into %s failed at offset %d, it can be resumed from there" % (self.collection.name, self.offset), data)
+
+            chunk = {"start": self.offset, "end": nextOffset, "documents": nbDocuments, "details": data.get("details", [])}
+            for k in _COUNTS[1:]:
+                chunk[k] = data.get(k, 0)
+            self._logChunk(chunk)
+            for k in _COUNTS:
+                self.counts[k] += chunk[k]
+            self.counts["chunks"] += 1
+            self.runDocuments += nbDocuments
+            self.offset = nextOffset
+            self._saveCheckpoint()
+            if self.onProgress is not None:
+                self.onProgress(self)
+
+        self.done = True
+        self._saveCheckpoint()
+        return self
+
+    def progress(self):
+        """returns a dictionary with the figures of the import so far, throughputs are those of the current run"""
+        res = {"offset": self.offset, "total": self.total, "done": self.done}
+        res.update(self.counts)
+
+        if self.total:
+            res["fraction"] = float(self.offset) / self.total
+        else:
+            res["fraction"] = None
+
+        elapsed = 0
+        if self.startTime is not None:
+            elapsed = time.time() - self.startTime
+        res["elapsed"] = elapsed
+
+        if elapsed > 0:
+            res["documentsPerSecond"] = self.runDocuments / elapsed
+            if self.isFile:
+                res["bytesPerSecond"] = (self.offset - self.startOffset) / elapsed
+        return res
+
+    def __repr__(self):
+        return "<ImportJob into %s, offset: %s/%s, done: %s>" % (self.collection.name, self.offset, self.total, self.done)
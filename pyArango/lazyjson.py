@@ -0,0 +1,226 @@
+import json
+import re
+
+__all__ = ["LazyJSON", "loadsLazy", "scanObject", "scanArray"]
+
+def _containerPattern(maxDepth):
+    """a regular expression that matches objects and arrays nested at most 'maxDepth' levels deep, brackets are assumed to be balanced"""
+    string = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+    other = r'[^"\[\]{}]*'
+    inner = string
+    for i in range(maxDepth):
+        container = r'[\[{]%s(?:(?:%s)%s)*[\]}]' % (other, inner, other)
+        inner = "%s|%s" % (string, container)
+    return re.compile(container, re.DOTALL)
+
+# objects and arrays are skipped in a single match, those nested deeper are walked by _skipContainer()
+_container = _containerPattern(8)
+# the brackets of a segment that contains no string
+_bracket = re.compile(r'[\[\]{}]')
+# numbers, true, false and null
+_scalar = re.compile(r'[^,}\]\s]*')
+_whitespace = re.compile(r'[ \t\n\r]*')
+_key = re.compile(r'[ \t\n\r]*("[^"\\]*(?:\\.[^"\\]*)*")[ \t\n\r]*:[ \t\n\r]*', re.DOTALL)
+_separator = re.compile(r'[ \t\n\r]*([,}\]])')
+
+def _scanError(text, pos):
+    return ValueError("Invalid json at position %d: %s" % (pos, text[pos:pos + 20]))
+
+# strings are skipped with str.find(), that runs at memory speed on long ones
+
+def _skipString(text, pos):
+    """returns the position right after the string that starts at 'pos'"""
+    end = pos
+    while True:
+        end = text.find('"', end + 1)
+        if end < 0:
+            raise _scanError(text, pos)
+        if text[end - 1] != "\\":
+            return end + 1
+        # the quote is escaped if it follows an odd number of backslashes
+        b = end - 1
+        while text[b] == "\\":
+            b -= 1
+        if (end - b) % 2 == 1:
+            return end + 1
+
+def _skipContainer(text, pos):
+    """returns the position right after the object or array that starts at 'pos', whatever its depth"""
+    depth = 1
+    i = pos + 1
+    length = len(text)
+    while True:
+        q = text.find('"', i)
+        if q < 0:
+            q = length
+        closes = text.count("]", i, q) + text.count("}", i, q)
+        if closes >= depth:
+            # the container may end before the next string
+            for m in _bracket.finditer(text, i, q):
+                if m.group() in "[{":
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return m.end()
+        else:
+            depth += text.count("[", i, q) + text.count("{", i, q) - closes
+        if q == length:
+            raise _scanError(text, pos)
+        i = _skipString(text, q)
+
+def _skipValue(text, pos):
+    """returns the position right after the json value that starts at 'pos', without decoding it"""
+    c = text[pos:pos + 1]
+    if c == '"':
+        return _skipString(text, pos)
+    if c == "{" or c == "[":
+        m = _container.match(text, pos)
+        if m is not None:
+            return m.end()
+        return _skipContainer(text, pos)
+    end = _scalar.match(text, pos).end()
+    if end == pos:
+        raise _scanError(text, pos)
+    return end
+
+def _scanObject(text, pos, scanValue):
+    """scans the json object that starts at 'pos' (after whitespace), 'scanValue(key, start)' must return the value of every field and the position right after it.
+    Returns a dictionary of those values and the position right after the object"""
+    pos = _whitespace.match(text, pos).end()
+    if text[pos:pos + 1] != "{":
+        raise _scanError(text, pos)
+    res = {}
+    pos = _whitespace.match(text, pos + 1).end()
+    if text[pos:pos + 1] == "}":
+        return res, pos + 1
+
+    while True:
+        m = _key.match(text, pos)
+        if m is None:
+            raise _scanError(text, pos)
+        key = m.group(1)
+        if "\\" in key:
+            key = json.loads(key)
+        else:
+            key = key[1:-1]
+        res[key], end = scanValue(key, m.end())
+
+        m = _separator.match(text, end)
+        if m is None or m.group(1) == "]":
+            raise _scanError(text, end)
+        if m.group(1) == "}":
+            return res, m.end()
+        pos = m.end()
+
+def scanObject(text, pos = 0):
+    """scans the json object that starts at 'pos', its values are skipped and not decoded.
+    Returns a dictionary {field: (start, end)} with the position of every value in 'text', and the position right after the object"""
+    def offsets(key, start):
+        end = _skipValue(text, start)
+        return (start, end), end
+    return _scanObject(text, pos, offsets)
+
+def scanArray(text, pos):
+    """scans the json array that starts at 'pos', the objects it contains become LazyJSONs and the other values are decoded.
+    Returns the list of values and the position right after the array"""
+    pos = _whitespace.match(text, pos).end()
+    if text[pos:pos + 1] != "[":
+        raise _scanError(text, pos)
+    values = []
+    pos = _whitespace.match(text, pos + 1).end()
+    if text[pos:pos + 1] == "]":
+        return values, pos + 1
+
+    while True:
+        if text[pos:pos + 1] == "{":
+            offsets, end = scanObject(text, pos)
+            values.append(LazyJSON(text, offsets))
+        else:
+            end = _skipValue(text, pos)
+            values.append(json.loads(text[pos:end]))
+
+        m = _separator.match(text, end)
+        if m is None or m.group(1) == "}":
+            raise _scanError(text, end)
+        if m.group(1) == "]":
+            return values, m.end()
+        pos = _whitespace.match(text, m.end()).end()
+
+def loadsLazy(text, lazyKeys = ()):
+    """decodes the json object in 'text', except the values of 'lazyKeys': objects become LazyJSONs and arrays are lists whose objects are LazyJSONs.
+    Without 'lazyKeys' the whole object is returned as a LazyJSON. 'text' can also be the utf-8 bytes of a response"""
+    if isinstance(text, bytes):
+        text = text.decode("utf-8")
+    if not lazyKeys:
+        return LazyJSON(text, scanObject(text)[0])
+
+    def value(key, start):
+        if key in lazyKeys:
+            c = text[start:start + 1]
+            if c == "[":
+                return scanArray(text, start)
+            if c == "{":
+                offsets, end = scanObject(text, start)
+                return LazyJSON(text, offsets), end
+        end = _skipValue(text, start)
+        return json.loads(text[start:end]), end
+    return _scanObject(text, 0, value)[0]
+
+class LazyJSON(object):
+    """A json object whose values are only decoded when they are accessed. It keeps a reference to the whole text it comes from
+    and the positions of its values in it (the tape), decoded values are memoized"""
+
+    __slots__ = ("text", "offsets", "decoded")
+
+    def __init__(self, text, offsets):
+        self.text = text
+        self.offsets = offsets
+        self.decoded = None
+
+    def __getitem__(self, k):
+        if self.decoded is None:
+            self.decoded = {}
+        else:
+            try:
+                return self.decoded[k]
+            except KeyError:
+                pass
+        start, end = self.offsets[k]
+        value = self.decoded[k] = json.loads(self.text[start:end])
+        return value
+
+    def get(self, k, default = None):
+        if k in self.offsets:
+            return self[k]
+        return default
+
+    def __contains__(self, k):
+        return k in self.offsets
+
+    def __iter__(self):
+        return iter(self.offsets)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def keys(self):
+        return self.offsets.keys()
+
+    def values(self):
+        return [self[k] for k in self.offsets]
+
+    def items(self):
+        return [(k, self[k]) for k in self.offsets]
+
+    def raw(self, k):
+        """returns the undecoded json text of the value 'k'"""
+        start, end = self.offsets[k]
+        return self.text[start:end]
+
+    def decode(self):
+        """returns the whole object as a dictionary"""
+        return dict(self.items())
+
+    def __repr__(self):
+        return "<LazyJSON: %s>" % ", ".join(self.offsets)
@@ -2,19 +2,24 @@ import json
 
 from future.utils import implements_iterator
 
-from .document import Document, Edge
+from .document import Document, Edge, ReadOnlyRow
+from .lazyjson import LazyJSON, loadsLazy
 from .theExceptions import QueryError, AQLQueryError, SimpleQueryError, CreationError, CursorError
 from . import consts as CONST
 
 __all__ = ["Query", "AQLQuery", "SimpleQuery", "Cursor", "RawCursor"]
 
+# the keys of query responses that are left undecoded with lazy = True
+_lazyKeys = ("result", "document")
+
 @implements_iterator
 class RawCursor(object):
     "a raw interface to cursors that returns json"
-    def __init__(self, database, cursorId):
+    def __init__(self, database, cursorId, lazy = False):
         self.database = database
         self.connection = self.database.connection
         self.id = cursorId
+        self.lazy = lazy
 
     def getURL(self):
         return "%s/%s" % (self.database.getCursorsURL(), self.id)
@@ -22,20 +27,33 @@ class RawCursor(object):
     def __next__(self):
         "returns the next batch"
         r = self.connection.session.put(self.getURL())
-        data = r.json()
         if r.status_code in [400, 404]:
+            data = r.json()
             raise CursorError(data["errorMessage"], self.id, data)
+        if self.lazy:
+            return loadsLazy(r.content, _lazyKeys)
         return r.json()
 
 @implements_iterator
 class Query(object):
     "This class is abstract and should not be instanciated. All query classes derive from it"
 
-    def __init__(self, request, database, rawResults):
-        "If rawResults = True, the results will be returned as dictionaries instead of Document objects."
+    # set by the collections for projections, the documents are then marked as partial
+    partialResults = False
+
+    def __init__(self, request, database, rawResults, rowMode = None, reuseRow = False, lazy = False):
+        """If rawResults = True, the results will be returned as dictionaries instead of Document objects.
+        If rowMode = "readonly", they are returned as ReadOnlyRow objects: immutable views on the json without validation nor patch tracking.
+        With reuseRow = True a single ReadOnlyRow is rebound to every result, a row must then not be kept once the iteration moved on.
+        With lazy = True the results are kept as json text and their fields are only decoded when accessed (see lazyjson), documents with a schema are still decoded at once."""
 
         self.rawResults = rawResults
-        self.response = request.json()
+        self._setRowMode(rowMode, reuseRow)
+        self.lazy = lazy and (not rawResults or self.readOnlyRows)
+        if self.lazy:
+            self.response = loadsLazy(request.content, _lazyKeys)
+        else:
+            self.response = request.json()
         if self.response.get("error") and self.response["errorMessage"] != "no match":
             raise QueryError(self.response["errorMessage"], self.response)
 
@@ -53,7 +71,7 @@ class Query(object):
 
             if "hasMore" in self.response and self.response["hasMore"]:
                 cursor_id = self.response.get("id","")
-                self.cursor = RawCursor(self.database, cursor_id)
+                self.cursor = RawCursor(self.database, cursor_id, self.lazy)
             else:
                 self.cursor = None
         elif request.status_code == 404:
@@ -66,6 +84,44 @@ class Query(object):
         "must be implemented in child, this called if the __init__ fails"
         raise NotImplementedError("Must be implemented in child")
 
+    def _setRowMode(self, rowMode, reuseRow):
+        if rowMode not in (None, "document", "readonly"):
+            raise ValueError("rowMode must be 'document' or 'readonly', got: %s" % rowMode)
+        self.readOnlyRows = rowMode == "readonly"
+        self.reuseRow = reuseRow
+        self._row = None
+        self._rowCollections = {}
+
+    def _rowCollection(self, docJson):
+        """returns the collection of a result, None if it has no _id or if its collection is unknown to the database"""
+        try:
+            collectionName = docJson["_id"].split("/")[0]
+        except (KeyError, AttributeError):
+            return None
+        try:
+            return self._rowCollections[collectionName]
+        except KeyError:
+            try:
+                collection = self.database[collectionName]
+            except KeyError:
+                collection = None
+            self._rowCollections[collectionName] = collection
+            return collection
+
+    def _developRow(self, i):
+        """returns a ReadOnlyRow on the ith result, results that are not dictionaries are returned as they are"""
+        docJson = self.result[i]
+        if not isinstance(docJson, (dict, LazyJSON)):
+            return docJson
+        collection = self._rowCollection(docJson)
+        if not self.reuseRow:
+            return ReadOnlyRow(collection, docJson)
+        if self._row is None:
+            self._row = ReadOnlyRow(collection, docJson)
+        else:
+            self._row._rebind(collection, docJson)
+        return self._row
+
     def _developDoc(self, i):
         """private function that transforms a json returned by ArangoDB into a pyArango Document or Edge"""
         docJson = self.result[i]
@@ -74,10 +130,9 @@ class Query(object):
         except KeyError:
             raise CreationError("result %d is not a valid Document. Try setting rawResults to True" % i)
 
-        if collection.type == CONST.COLLECTION_EDGE_TYPE:
-            self.result[i] = Edge(collection, docJson)
-        else:
-            self.result[i] = Document(collection, docJson)
+        self.result[i] = collection.documentClass(collection, docJson)
+        if self.partialResults:
+            self.result[i].partial = True
 
     def nextBatch(self):
         "become the next batch. raises a StopIteration if there is None"
@@ -101,7 +156,7 @@ class Query(object):
             v = self[self.currI]
         except IndexError:
             self.nextBatch()
-        v = self[self.currI]
+            v = self[self.currI]
         self.currI += 1
         return v
 
@@ -114,6 +169,8 @@ class Query(object):
 
     def __getitem__(self, i):
         "returns a ith result of the query. Raises IndexError if we reached the end of the current batch."
+        if self.readOnlyRows:
+            return self._developRow(i)
         if not self.rawResults and (not isinstance(self.result[i], (Edge, Document))):
             self._developDoc(i)
         return self.result[i]
@@ -135,7 +192,7 @@ class Query(object):
 class AQLQuery(Query):
     "AQL queries are attached to and instanciated by a database"
     def __init__(self, database, query, batchSize, bindVars, options, count, fullCount, rawResults = True,
-                 json_encoder = None, **moreArgs):
+                 json_encoder = None, rowMode = None, reuseRow = False, lazy = False, **moreArgs):
         # fullCount is passed in the options dict per https://docs.arangodb.com/3.1/HTTP/AqlQueryCursor/AccessingCursors.html
         options["fullCount"] = fullCount
         payload = {'query' : query, 'batchSize' : batchSize, 'bindVars' : bindVars, 'options' : options, 'count' : count}
@@ -149,7 +206,7 @@ class AQLQuery(Query):
         self.connection.reportItem()
 
         try:
-            Query.__init__(self, request, database, rawResults)
+            Query.__init__(self, request, database, rawResults, rowMode, reuseRow, lazy)
         except QueryError as e:
             raise AQLQueryError( message = e.message, query = self.query, errors = e.errors)
 
@@ -165,11 +222,14 @@ class AQLQuery(Query):
 
 class Cursor(Query):
     "Cursor queries are attached to and instanciated by a database, use them to continue from where you left"
-    def __init__(self, database, cursorId, rawResults):
+    def __init__(self, database, cursorId, rawResults, rowMode = None, reuseRow = False, lazy = False):
         self.rawResults = rawResults
+        self.database = database
+        self._setRowMode(rowMode, reuseRow)
+        self.lazy = lazy and (not rawResults or self.readOnlyRows)
         self._developed = set()
         self.batchNumber = 1
-        self.cursor = RawCursor(database, cursorId)
+        self.cursor = RawCursor(database, cursorId, self.lazy)
         self.response = next(self.cursor)
 
     def _raiseInitFailed(self, request):
@@ -179,7 +239,7 @@ class Cursor(Query):
 
 class SimpleQuery(Query):
     "Simple queries are attached to and instanciated by a collection"
-    def __init__(self, collection, queryType, rawResults, json_encoder = None,
+    def __init__(self, collection, queryType, rawResults, json_encoder = None, rowMode = None, reuseRow = False, lazy = False,
                  **queryArgs):
 
         self.collection = collection
@@ -191,7 +251,7 @@ class SimpleQuery(Query):
         URL = "%s/simple/%s" % (collection.database.getURL(), queryType)
         request = self.connection.session.put(URL, data = payload)
 
-        Query.__init__(self, request, collection.database, rawResults)
+        Query.__init__(self, request, collection.database, rawResults, rowMode, reuseRow, lazy)
 
     def _raiseInitFailed(self, request):
         data = request.json()
@@ -199,7 +259,7 @@ class SimpleQuery(Query):
 
     def _developDoc(self, i):
         docJson = self.result[i]
-        if self.collection.type == CONST.COLLECTION_EDGE_TYPE:
-            self.result[i] = Edge(self.collection, docJson)
-        else:
-            self.result[i] = Document(self.collection, docJson)
+        self.result[i] = self.collection.documentClass(self.collection, docJson)
+
+    def _rowCollection(self, docJson):
+        return self.collection
@@ -0,0 +1,113 @@
+import pickle
+import weakref
+
+__all__ = ["registerConnection", "dumpDocuments", "loadDocuments"]
+
+# the connection documents are bound to when they are loaded, and the collections already found in it
+_registry = {"connection": None, "collections": {}}
+# the collections of the documents serialized by this process, so that copies made in the same process need no registered connection
+_localCollections = weakref.WeakValueDictionary()
+
+_PICKLE, _MSGPACK = b"P", b"M"
+
+def registerConnection(connection):
+    """Documents unpickled or loaded by loadDocuments() in this process are bound to the collections of 'connection'.
+    'connection' can also be a function that returns a connection, it is only called when the first document is loaded. For a multiprocessing pool::
+
+        pool = multiprocessing.Pool(initializer = registerConnection, initargs = (makeConnection, ))"""
+    _registry["connection"] = connection
+    _registry["collections"] = {}
+
+def _getCollection(databaseName, collectionName):
+    key = (databaseName, collectionName)
+    try:
+        return _registry["collections"][key]
+    except KeyError:
+        pass
+
+    connection = _registry["connection"]
+    if connection is None:
+        collection = _localCollections.get(key)
+        if collection is None:
+            raise ValueError("There is no connection to bind documents of %s/%s to, use pyArango.serialization.registerConnection()" % key)
+        return collection
+
+    if callable(connection) and not hasattr(connection, "databases"):
+        connection = _registry["connection"] = connection()
+    collection = connection[databaseName][collectionName]
+    _registry["collections"][key] = collection
+    return collection
+
+def documentState(document):
+    """returns what is needed to rebuild the document: the names of its database and collection, its privates, its values and whether it is partial"""
+    collection = document.collection
+    key = (collection.database.name, collection.name)
+    if key not in _localCollections:
+        _localCollections[key] = collection
+    privates = tuple(getattr(document, p) for p in document.privates)
+    return key[0], key[1], privates, document._store.getStore(), document.partial
+
+def _buildDocument(collection, privates, store, partial):
+    values = dict(store)
+    for name, value in zip(collection.documentClass.privates, privates):
+        if value is not None:
+            values[name] = value
+    document = collection.documentClass(collection, values)
+    document.partial = partial
+    return document
+
+def _rebuildDocument(databaseName, collectionName, privates, store, partial):
+    """called by pickle to rebuild a document in the receiving process"""
+    return _buildDocument(_getCollection(databaseName, collectionName), privates, store, partial)
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError("msgpack is not installed, try pip install msgpack")
+    return msgpack
+
+def dumpDocuments(documents, format = "pickle"):
+    """Serializes documents into a single buffer for loadDocuments(). Only their values, privates and the names of their collections are kept,
+    each collection name once. 'documents' can contain None, for instance the misses of Collection.fetchDocuments().
+    'format' is 'pickle' or 'msgpack', which must then be installed and only supports json values."""
+    collections = []
+    positions = {}
+    entries = []
+    for document in documents:
+        if document is None:
+            entries.append(None)
+            continue
+        databaseName, collectionName, privates, store, partial = documentState(document)
+        key = (databaseName, collectionName)
+        position = positions.get(key)
+        if position is None:
+            position = positions[key] = len(collections)
+            collections.append(key)
+        entries.append((position, privates, store, partial))
+
+    if format == "pickle":
+        return _PICKLE + pickle.dumps((collections, entries), protocol = pickle.HIGHEST_PROTOCOL)
+    if format == "msgpack":
+        return _MSGPACK + _msgpack().packb((collections, entries), use_bin_type = True)
+    raise ValueError("Unknown serialization format: %s, it must be 'pickle' or 'msgpack'" % format)
+
+def loadDocuments(buffer):
+    """Returns the list of documents serialized by dumpDocuments(), bound to the collections of the registered connection"""
+    header, body = buffer[:1], buffer[1:]
+    if header == _PICKLE:
+        collections, entries = pickle.loads(body)
+    elif header == _MSGPACK:
+        collections, entries = _msgpack().unpackb(body, raw = False)
+    else:
+        raise ValueError("This buffer was not made by dumpDocuments()")
+
+    collections = [_getCollection(databaseName, collectionName) for databaseName, collectionName in collections]
+    res = []
+    for entry in entries:
+        if entry is None:
+            res.append(None)
+        else:
+            position, privates, store, partial = entry
+            res.append(_buildDocument(collections[position], privates, store, partial))
+    return res
@@ -0,0 +1,364 @@
+import abc
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from future.utils import with_metaclass
+
+__all__ = ["CacheBackend", "MmapCacheBackend", "SharedDocumentCache"]
+
+class CacheBackend(with_metaclass(abc.ABCMeta, object)):
+    """The interface of the stores behind SharedDocumentCache. A backend can be shared by the caches of several collections and processes,
+    its keys and values are bytes and expiration times are time.time() timestamps (0 for never). Backends must implement all its methods"""
+
+    @abc.abstractmethod
+    def get(self, key):
+        """returns (value, expires), or None if 'key' is not stored"""
+
+    @abc.abstractmethod
+    def set(self, key, value, expires):
+        """stores 'value', returns False if it could not be stored"""
+
+    @abc.abstractmethod
+    def touch(self, key, expires):
+        """sets the expiration time of 'key', returns False if it is not stored"""
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """removes 'key', returns False if it was not stored"""
+
+    @abc.abstractmethod
+    def clear(self, prefix = b""):
+        """removes all the keys that start with 'prefix'"""
+
+    @abc.abstractmethod
+    def count(self, prefix = b""):
+        """returns the number of keys that start with 'prefix'"""
+
+class MmapCacheBackend(CacheBackend):
+    """A cache backend in a memory mapped file, shared by all the processes that open the same 'path'. Put it on a tmpfs such as /dev/shm
+    for the entries to stay in memory. The file holds 'nbSlots' slots of 'slotSize' bytes, grouped in sets of 'ways' slots: a key can only
+    be stored in the slots of the set its hash points to, where it replaces the least recently used entry. Values that do not fit in a slot
+    are not stored. Sets are locked with fcntl (POSIX only) for the other processes and with a lock for the other threads.
+    All the processes must use the same 'nbSlots', 'slotSize' and 'ways': a file made with other ones, that other processes may still have mapped,
+    is not touched and a ValueError is raised"""
+
+    _MAGIC = b"PYACACHE"
+    # magic, version, nbSlots, slotSize, ways
+    _header = struct.Struct("<8sIIII")
+    _headerSize = 64
+    # hash (0 for an empty slot), last used, expires, key length, value length
+    _slot = struct.Struct("<QddHI")
+    _slotHeaderSize = 32
+
+    def __init__(self, path, nbSlots = 16384, slotSize = 4096, ways = 8):
+        if fcntl is None:
+            raise OSError("MmapCacheBackend needs fcntl, it is only available on POSIX systems")
+        if nbSlots % ways != 0:
+            raise ValueError("nbSlots must be a multiple of ways")
+        if slotSize <= self._slotHeaderSize:
+            raise ValueError("slotSize must be larger than %d bytes" % self._slotHeaderSize)
+
+        self.path = path
+        self.nbSlots = nbSlots
+        self.slotSize = slotSize
+        self.ways = ways
+        self.nbSets = nbSlots // ways
+        self.size = self._headerSize + nbSlots * slotSize
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(self.fd, fcntl.LOCK_EX, self._headerSize, 0)
+        try:
+            expected = self._header.pack(self._MAGIC, 1, nbSlots, slotSize, ways)
+            if os.fstat(self.fd).st_size == 0:
+                os.ftruncate(self.fd, self.size)
+                os.pwrite(self.fd, expected, 0)
+            else:
+                header = os.pread(self.fd, self._header.size, 0)
+                if header != expected or os.fstat(self.fd).st_size != self.size:
+                    os.close(self.fd)
+                    if header[:len(self._MAGIC)] != self._MAGIC:
+                        raise ValueError("%s is not a cache file" % path)
+                    magic, version, fileSlots, fileSlotSize, fileWays = self._header.unpack(header)
+                    raise ValueError("%s is a cache of %d slots of %d bytes in sets of %d, not %d x %d in sets of %d. Remove it or use another path"
+                                     % (path, fileSlots, fileSlotSize, fileWays, nbSlots, slotSize, ways))
+            self.mmap = mmap.mmap(self.fd, self.size)
+        finally:
+            try:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, self._headerSize, 0)
+            except OSError:
+                # the file was closed
+                pass
+
+    def close(self):
+        self.mmap.close()
+        os.close(self.fd)
+
+    def _hash(self, key):
+        # hash() is salted differently in every process
+        h = int.from_bytes(hashlib.blake2b(key, digest_size = 8).digest(), "little")
+        return h or 1
+
+    def _locked(self, setIndex, fct):
+        """runs 'fct' with the set 'setIndex' locked"""
+        setSize = self.ways * self.slotSize
+        offset = self._headerSize + setIndex * setSize
+        with self.lock:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, setSize, offset)
+            try:
+                return fct(offset)
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, setSize, offset)
+
+    def _find(self, offset, h, key):
+        """returns the offset of the slot that holds 'key' in the set at 'offset', or None"""
+        for way in range(self.ways):
+            slot = offset + way * self.slotSize
+            slotHash, used, expires, keyLength, valueLength = self._slot.unpack_from(self.mmap, slot)
+            if slotHash == h and self.mmap[slot + self._slotHeaderSize:slot + self._slotHeaderSize + keyLength] == key:
+                return slot
+        return None
+
+    def get(self, key):
+        h = self._hash(key)
+        def get(offset):
+            slot = self._find(offset, h, key)
+            if slot is None:
+                return None
+            slotHash, used, expires, keyLength, valueLength = self._slot.unpack_from(self.mmap, slot)
+            self._slot.pack_into(self.mmap, slot, slotHash, time.time(), expires, keyLength, valueLength)
+            start = slot + self._slotHeaderSize + keyLength
+            return self.mmap[start:start + valueLength], expires
+        return self._locked(h % self.nbSets, get)
+
+    def set(self, key, value, expires):
+        if self._slotHeaderSize + len(key) + len(value) > self.slotSize:
+            return False
+        h = self._hash(key)
+        def store(offset):
+            slot = self._find(offset, h, key)
+            if slot is None:
+                oldest = None
+                for way in range(self.ways):
+                    candidate = offset + way * self.slotSize
+                    slotHash, used = self._slot.unpack_from(self.mmap, candidate)[:2]
+                    if slotHash == 0:
+                        slot = candidate
+                        break
+                    if oldest is None or used < oldest:
+                        oldest = used
+                        slot = candidate
+                else:
+                    self.evictions += 1
+            start = slot + self._slotHeaderSize
+            self.mmap[start:start + len(key) + len(value)] = key + value
+            self._slot.pack_into(self.mmap, slot, h, time.time(), expires, len(key), len(value))
+            return True
+        return self._locked(h % self.nbSets, store)
+
+    def touch(self, key, expires):
+        h = self._hash(key)
+        def touch(offset):
+            slot = self._find(offset, h, key)
+            if slot is None:
+                return False
+            slotHash, used, oldExpires, keyLength, valueLength = self._slot.unpack_from(self.mmap, slot)
+            self._slot.pack_into(self.mmap, slot, slotHash, time.time(), expires, keyLength, valueLength)
+            return True
+        return self._locked(h % self.nbSets, touch)
+
+    def delete(self, key):
+        h = self._hash(key)
+        def delete(offset):
+            slot = self._find(offset, h, key)
+            if slot is None:
+                return False
+            self._slot.pack_into(self.mmap, slot, 0, 0, 0, 0, 0)
+            return True
+        return self._locked(h % self.nbSets, delete)
+
+    def _scan(self, prefix, remove):
+        def scan(offset):
+            n = 0
+            for way in range(self.ways):
+                slot = offset + way * self.slotSize
+                slotHash = self._slot.unpack_from(self.mmap, slot)[0]
+                start = slot + self._slotHeaderSize
+                if slotHash != 0 and self.mmap[start:start + len(prefix)] == prefix:
+                    n += 1
+                    if remove:
+                        self._slot.pack_into(self.mmap, slot, 0, 0, 0, 0, 0)
+            return n
+        return sum(self._locked(setIndex, scan) for setIndex in range(self.nbSets))
+
+    def clear(self, prefix = b""):
+        self._scan(prefix, True)
+
+    def count(self, prefix = b""):
+        return self._scan(prefix, False)
+
+    def __len__(self):
+        return self.count()
+
+    def __repr__(self):
+        return "[MmapCacheBackend %s, slots: %d x %d bytes]" % (self.path, self.nbSlots, self.slotSize)
+
+class SharedDocumentCache(object):
+    """The document cache of a collection, kept in a CacheBackend that can be shared with other collections and processes. Documents are stored
+    as json, with their _rev, so that hot documents are cached once per host. It has the interface of DocumentCache, except for the LRU order
+    and size limits that are those of the backend. Every hit decodes a new Document object.
+    See DocumentCache for 'ttl' and 'revalidate', counters are those of the current process"""
+
+    def __init__(self, collection, backend, ttl = None, revalidate = False):
+        self.collection = collection
+        self.backend = backend
+        self.revalidate = revalidate
+        if revalidate and ttl is None:
+            ttl = 0
+        self.ttl = ttl
+        self.prefix = ("%s/%s/" % (collection.database.name, collection.name)).encode("utf-8")
+        self.lock = threading.Lock()
+        self.resetStats()
+
+    def resetStats(self):
+        """sets the hits, misses, revalidations and expirations counters back to 0"""
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.expirations = 0
+
+    def getStats(self):
+        """returns the counters of the cache, and the number of entries in the whole backend"""
+        lookups = self.hits + self.revalidations + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "hitRate": float(self.hits + self.revalidations) / lookups if lookups > 0 else None,
+            "evictions": getattr(self.backend, "evictions", None),
+            "expirations": self.expirations,
+            "documents": self.backend.count(),
+        }
+
+    def _count(self, counter):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _backendKey(self, _key):
+        return self.prefix + str(_key).encode("utf-8")
+
+    def _expires(self, ttl):
+        if ttl is None:
+            return 0
+        return time.time() + ttl
+
+    def cache(self, doc, ttl = None):
+        """stores the document, 'ttl' overrides the ttl of the cache for this document"""
+        if ttl is None:
+            ttl = self.ttl
+        values = dict(doc._store.getStore())
+        for name in doc.privates:
+            value = getattr(doc, name)
+            if value is not None:
+                values[name] = value
+        self.backend.set(self._backendKey(doc._key), json.dumps(values, default=str).encode("utf-8"), self._expires(ttl))
+
+    def _load(self, _key):
+        """returns (document, fresh) or (None, False)"""
+        entry = self.backend.get(self._backendKey(_key))
+        if entry is None:
+            return None, False
+        value, expires = entry
+        doc = self.collection.documentClass(self.collection, json.loads(value))
+        return doc, expires == 0 or expires > time.time()
+
+    def lookup(self, _key):
+        """returns (document, fresh), see DocumentCache.lookup()"""
+        doc, fresh = self._load(_key)
+        if fresh:
+            self._count("hits")
+        elif doc is not None and self.revalidate:
+            return doc, False
+        else:
+            if doc is not None:
+                self.backend.delete(self._backendKey(_key))
+                self._count("expirations")
+            self._count("misses")
+            doc = None
+        return doc, fresh
+
+    def peek(self, _key):
+        """returns the document '_key', even if it is stale, or None. Nothing is counted"""
+        return self._load(_key)[0]
+
+    def refresh(self, _key):
+        """reports that the database still has the cached revision of the document '_key'"""
+        self.backend.touch(self._backendKey(_key), self._expires(self.ttl))
+        self._count("revalidations")
+
+    def replace(self, _key, doc):
+        """reports that the document '_key' changed in the database, 'doc' is its new version or None if it was deleted.
+        See DocumentCache.replace() for the misses"""
+        if self.backend.get(self._backendKey(_key)) is not None:
+            self._count("misses")
+        if doc is None:
+            self.discard(_key)
+        else:
+            self.cache(doc)
+
+    def get(self, _key, default = None):
+        """returns the document '_key' if it is fresh, 'default' otherwise"""
+        doc, fresh = self._load(_key)
+        if fresh:
+            self._count("hits")
+            return doc
+        if doc is not None and not self.revalidate:
+            self.backend.delete(self._backendKey(_key))
+            self._count("expirations")
+        self._count("misses")
+        return default
+
+    def __getitem__(self, _key):
+        doc = self.get(_key)
+        if doc is None:
+            raise KeyError("Document with _key %s is not available in cache" % _key)
+        return doc
+
+    def __contains__(self, _key):
+        """returns True if the document '_key' is in the cache and fresh, it is not decoded"""
+        entry = self.backend.get(self._backendKey(_key))
+        return entry is not None and (entry[1] == 0 or entry[1] > time.time())
+
+    def __len__(self):
+        return self.backend.count(self.prefix)
+
+    def delete(self, _key):
+        """Remove a document from the cache."""
+        if not self.backend.delete(self._backendKey(_key)):
+            raise KeyError("Document with _key %s is not available in cache" % _key)
+
+    def discard(self, _key):
+        """Remove a document from the cache if it is there."""
+        self.backend.delete(self._backendKey(_key))
+
+    def written(self, doc):
+        """reports that 'doc' was saved or patched: the version in the backend is stale and removed, for all the processes"""
+        self.discard(doc._key)
+
+    def clear(self):
+        """Remove all the documents of the collection from the cache."""
+        self.backend.clear(self.prefix)
+
+    def __repr__(self):
+        return "[SharedDocumentCache %s, backend: %s]" % (self.prefix.decode("utf-8"), self.backend)
@@ -0,0 +1,534 @@
+import unittest, time, threading, os, tempfile, json, datetime
+from pyArango.collection import Collection, DocumentCache, MissCache, AdjacencyCache, Edges, BulkOperation
+from pyArango.writebehind import WriteBehind
+from pyArango.theExceptions import PreconditionFailedError
+from pyArango.sharedcache import CacheBackend, MmapCacheBackend, SharedDocumentCache
+
+class DummyDoc(object):
+    def __init__(self, key, size = 10):
+        self._key = key
+        self.size = size
+
+def dummySize(doc):
+    return doc.size
+
+class DocumentCacheTests(unittest.TestCase):
+
+    def test_lru_order(self):
+        cache = DocumentCache(3)
+        for i in range(3):
+            cache.cache(DummyDoc(i))
+        cache[0]
+        cache.cache(DummyDoc(3))
+        self.assertEqual(cache.getChain(), [3, 0, 2])
+        self.assertEqual(cache.tail._key, 2)
+        self.assertEqual(cache.getStats()["evictions"], 1)
+        self.assertRaises(KeyError, cache.__getitem__, 1)
+
+    def test_recache_does_not_duplicate(self):
+        cache = DocumentCache(3)
+        cache.cache(DummyDoc(0))
+        cache.cache(DummyDoc(1))
+        doc = DummyDoc(0)
+        cache.cache(doc)
+        self.assertEqual(cache.getChain(), [0, 1])
+        self.assertIs(cache[0], doc)
+
+    def test_delete_anywhere(self):
+        cache = DocumentCache(5)
+        for i in range(5):
+            cache.cache(DummyDoc(i))
+        cache.delete(4)
+        cache.delete(0)
+        cache.delete(2)
+        self.assertEqual(cache.getChain(), [3, 1])
+        self.assertRaises(KeyError, cache.delete, 2)
+        cache.discard(2)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertIsNone(cache.head)
+
+    def test_byte_budget(self):
+        cache = DocumentCache(maxBytes = 100, sizeFunction = dummySize)
+        for i in range(10):
+            cache.cache(DummyDoc(i, 30))
+        self.assertEqual(cache.getChain(), [9, 8, 7])
+        self.assertEqual(cache.getStats()["bytes"], 90)
+        cache.cache(DummyDoc(10, 200))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.totalBytes, 0)
+
+    def test_ttl(self):
+        cache = DocumentCache(10, ttl = 60)
+        cache.cache(DummyDoc(0))
+        cache.cache(DummyDoc(1), ttl = 0.01)
+        time.sleep(0.02)
+        self.assertNotIn(1, cache)
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache[0]._key, 0)
+        stats = cache.getStats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["expirations"]), (1, 1, 1))
+        self.assertEqual(stats["hitRate"], 0.5)
+
+    def test_revalidate(self):
+        cache = DocumentCache(10, ttl = 0.01, revalidate = True)
+        doc = DummyDoc(0)
+        cache.cache(doc)
+        self.assertEqual(cache.lookup(0), (doc, True))
+        time.sleep(0.02)
+        self.assertEqual(cache.lookup(0), (doc, False))
+        self.assertNotIn(0, cache)
+        cache.refresh(0)
+        self.assertEqual(cache.lookup(0), (doc, True))
+        newDoc = DummyDoc(0)
+        cache.replace(0, newDoc)
+        self.assertIs(cache.peek(0), newDoc)
+        cache.replace(0, None)
+        self.assertEqual(cache.lookup(0), (None, False))
+        stats = cache.getStats()
+        self.assertEqual((stats["hits"], stats["revalidations"], stats["misses"], stats["expirations"]), (2, 1, 3, 0))
+
+    def test_outcomes_are_counted_once(self):
+        cache = DocumentCache(10, ttl = 0.01, revalidate = True)
+        self.assertEqual(cache.lookup(0), (None, False))
+        cache.replace(0, DummyDoc(0))
+        cache.cache(DummyDoc(1))
+        time.sleep(0.02)
+        self.assertEqual(cache.lookup(1)[1], False)
+        cache.replace(1, DummyDoc(1))
+        stats = cache.getStats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["revalidations"]), (0, 2, 0))
+
+    def test_threads(self):
+        cache = DocumentCache(50)
+        def work(start):
+            for i in range(2000):
+                key = (start + i) % 100
+                if cache.get(key) is None:
+                    cache.cache(DummyDoc(key))
+        threads = [threading.Thread(target = work, args = (i * 7, )) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(cache), 50)
+        stats = cache.getStats()
+        self.assertEqual(stats["hits"] + stats["misses"], 8000)
+
+class MissCacheTests(unittest.TestCase):
+
+    def test_expiry(self):
+        cache = MissCache(ttl = 0.02)
+        cache.add("a")
+        time.sleep(0.01)
+        cache.add("b")
+        self.assertIn("a", cache)
+        time.sleep(0.015)
+        self.assertNotIn("a", cache)
+        self.assertIn("b", cache)
+        time.sleep(0.01)
+        self.assertNotIn("b", cache)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.hits, 2)
+
+    def test_size_and_discard(self):
+        cache = MissCache(ttl = 60, cacheSize = 3)
+        for k in "abcd":
+            cache.add(k)
+        self.assertNotIn("a", cache)
+        cache.discard("b")
+        self.assertNotIn("b", cache)
+        self.assertIn("d", cache)
+
+def edge(key, _from, _to):
+    return {"_id" : "Links_cache/%s" % key, "_key" : key, "_rev" : "r", "_from" : _from, "_to" : _to}
+
+class AdjacencyCacheTests(unittest.TestCase):
+
+    def test_lru_and_ttl(self):
+        cache = AdjacencyCache(cacheSize = 2, ttl = 0.02)
+        cache.set("v/0", "out", [edge("0", "v/0", "v/1")])
+        cache.set("v/1", "in", [edge("0", "v/0", "v/1")])
+        cache.get("v/0", "out")
+        cache.set("v/2", "any", [])
+        self.assertIsNone(cache.get("v/1", "in"))
+        self.assertEqual(cache.get("v/2", "any"), [])
+        time.sleep(0.03)
+        self.assertIsNone(cache.get("v/0", "out"))
+        stats = cache.getStats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"], stats["expirations"]), (2, 2, 1, 1))
+
+    def test_discard_edge(self):
+        cache = AdjacencyCache()
+        cache.set("v/0", "out", [edge("0", "v/0", "v/1"), edge("1", "v/0", "v/2")])
+        cache.set("v/2", "in", [edge("1", "v/0", "v/2")])
+        cache.set("v/3", "any", [edge("2", "v/3", "v/4")])
+        # the edge moved from v/2 to v/4
+        cache.discardEdge("Links_cache/1", "v/0", "v/4")
+        self.assertEqual(len(cache), 1)
+        cache.discardEdge("Links_cache/2")
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.edgeEntries, {})
+
+class StandInDatabase(object):
+    """runs the edge queries over a list of edges"""
+    name = "db"
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.connection = None
+        self.queries = []
+
+    def getURL(self):
+        return "http://localhost:8529/_db/db/_api"
+
+    def AQLQuery(self, aql, bindVars, batchSize, rawResults):
+        self.queries.append(bindVars["vertices"])
+        vertices = set(bindVars["vertices"])
+        res = []
+        for e in self.edges:
+            if ("_from IN" in aql and e["_from"] in vertices) or ("_to IN" in aql and e["_to"] in vertices):
+                res.append(e)
+        return iter(res)
+
+class Links_cache(Edges):
+    pass
+
+class GetEdgesForVerticesTests(unittest.TestCase):
+
+    def setUp(self):
+        self.db = StandInDatabase([edge("0", "v/0", "v/1"), edge("1", "v/1", "v/2"), edge("2", "v/2", "v/2")])
+        self.links = Links_cache(self.db, {"name" : "Links_cache", "type" : 3, "id" : "43"})
+
+    def test_grouping(self):
+        res = self.links.getEdgesForVertices(["v/2", "v/1", "v/3"], rawResults = True)
+        self.assertEqual(list(res.keys()), ["v/2", "v/1", "v/3"])
+        self.assertEqual([e["_key"] for e in res["v/1"]], ["0", "1"])
+        self.assertEqual([e["_key"] for e in res["v/2"]], ["1", "2"])
+        self.assertEqual(res["v/3"], [])
+        res = self.links.getEdgesForVertices(["v/1", "v/2"], direction = "in", batchSize = 1)
+        self.assertEqual([e._key for e in res["v/2"]], ["1", "2"])
+        self.assertEqual(self.db.queries[1:], [["v/1"], ["v/2"]])
+        self.assertRaises(ValueError, self.links.getEdgesForVertices, ["v/1"], "both")
+
+    def test_cache(self):
+        cache = self.links.activateAdjacencyCache(10)
+        self.links.getEdgesForVertices(["v/0", "v/1"], direction = "out")
+        res = self.links.getEdgesForVertices(["v/1", "v/2"], direction = "out")
+        self.assertEqual(self.db.queries, [["v/0", "v/1"], ["v/2"]])
+        self.assertEqual(res["v/1"][0]._key, "1")
+        self.assertEqual([e._key for e in self.links.getOutEdges("v/0")], ["0"])
+        self.assertEqual(cache.getStats()["hits"], 2)
+
+class StandInResponse(object):
+    def __init__(self, data):
+        self.status_code = 200
+        self.content = json.dumps(data).encode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+class StandInSession(object):
+    """counts the collection and serves multi-key fetches from a dictionary of documents"""
+    def __init__(self, documents):
+        self.documents = documents
+        self.deleted = []
+
+    def get(self, url, params = None):
+        return StandInResponse({"count" : len(self.documents)})
+
+    def put(self, url, params = None, data = None):
+        return StandInResponse([self.documents.get(k, {"error" : True}) for k in json.loads(data)])
+
+    def delete(self, url):
+        self.deleted.append(url)
+
+class StandInCursor(object):
+    def __init__(self, rows, hasMore):
+        self.rows = iter(rows)
+        self.response = {"hasMore" : hasMore}
+        self.cursor = self if hasMore else None
+
+    def getURL(self):
+        return "cursor/1"
+
+    def __iter__(self):
+        return self.rows
+
+class StandInConnection(object):
+    def __init__(self, documents):
+        self.session = StandInSession(documents)
+
+class WarmUpDatabase(object):
+    name = "db"
+
+    def __init__(self, documents):
+        self.connection = StandInConnection(documents)
+        self.queries = []
+
+    def getURL(self):
+        return "http://localhost:8529/_db/db/_api"
+
+    def AQLQuery(self, aql, bindVars, batchSize, rawResults, options):
+        self.queries.append((aql, bindVars, options))
+        rows = sorted(self.connection.session.documents.values(), key = lambda d: d["_key"])
+        if "limit" in bindVars:
+            rows = rows[:bindVars["limit"]]
+        return StandInCursor(rows, aql.startswith("FOR d IN Users"))
+
+class Users_warmup(Collection):
+    pass
+
+class CacheWarmUpTests(unittest.TestCase):
+
+    def setUp(self):
+        documents = dict((str(i), {"_key" : str(i), "_id" : "Users_warmup/%d" % i, "_rev" : "r", "n" : i}) for i in range(10))
+        self.db = WarmUpDatabase(documents)
+        self.users = Users_warmup(self.db, {"name" : "Users_warmup", "type" : 2, "id" : "44"})
+
+    def test_needs_a_cache(self):
+        self.assertRaises(ValueError, self.users.warmCache)
+
+    def test_collection(self):
+        cache = self.users.activateCache(4)
+        progress = []
+        warmUp = self.users.warmCache(batchSize = 3, onProgress = lambda w: progress.append(w.progress()["loaded"]))
+        self.assertEqual(progress, [3, 4])
+        self.assertEqual(cache.getChain(), ["3", "2", "1", "0"])
+        self.assertEqual(self.db.queries[0][1]["limit"], 4)
+        self.assertEqual(self.db.queries[0][2], {"stream" : True})
+        self.assertEqual(warmUp.progress()["fraction"], 1)
+
+    def test_keys_in_background(self):
+        cache = self.users.activateCache(10)
+        warmUp = self.users.warmCache(keys = ["1", "5", "nope"], background = True)
+        self.assertTrue(warmUp.wait(5))
+        self.assertEqual(sorted(cache.getChain()), ["1", "5"])
+        self.assertEqual(warmUp.progress()["loaded"], 2)
+
+    def test_query(self):
+        self.users.activateCache()
+        warmUp = self.users.warmCache(query = "FOR d IN Users_warmup FILTER d.n > @n RETURN d", bindVars = {"n" : 5}, limit = 2)
+        self.assertEqual(warmUp.loaded, 2)
+        self.assertEqual(self.db.connection.session.deleted, ["cursor/1"])
+        self.assertEqual(self.db.queries[0][1], {"n" : 5})
+
+        self.db.AQLQuery = lambda *args, **kwargs: StandInCursor([1, 2], False)
+        warmUp = self.users.warmCache(query = "RETURN 1", background = True)
+        self.assertRaises(ValueError, warmUp.wait)
+
+class GetManyTests(unittest.TestCase):
+
+    def setUp(self):
+        documents = dict((str(i), {"_key" : str(i), "_id" : "Users_warmup/%d" % i, "_rev" : "r", "n" : i}) for i in range(10))
+        self.db = WarmUpDatabase(documents)
+        self.users = Users_warmup(self.db, {"name" : "Users_warmup", "type" : 2, "id" : "44"})
+        self.puts = []
+        put = self.db.connection.session.put
+        def countedPut(url, params = None, data = None):
+            self.puts.append(json.loads(data))
+            return put(url, params = params, data = data)
+        self.db.connection.session.put = countedPut
+
+    def test_hits_and_misses(self):
+        cache = self.users.activateCache(10)
+        missCache = self.users.activateMissCache(60)
+        self.users.fetchDocuments(["1", "2"])
+        docs = self.users.getMany([2, "3", "nope", "1", "3"])
+        self.assertEqual([d["n"] if d is not None else None for d in docs], [2, 3, None, 1, 3])
+        self.assertIs(docs[0], cache["2"])
+        self.assertEqual((docs.hits, docs.misses), (2, 2))
+        self.assertEqual(self.puts[1:], [["3", "nope"]])
+        self.assertIn("nope", missCache)
+
+        docs = self.users.getMany(["nope", "3"])
+        self.assertEqual((docs.hits, docs.misses), (2, 0))
+        self.assertEqual(len(self.puts), 2)
+
+    def test_without_cache(self):
+        docs = self.users.getMany(["1", "2", "3"], batchSize = 2)
+        self.assertEqual([d._key for d in docs], ["1", "2", "3"])
+        self.assertEqual((docs.hits, docs.misses), (0, 3))
+        self.assertEqual(self.puts, [["1", "2"], ["3"]])
+
+class MmapCacheBackendTests(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.backend = MmapCacheBackend(self.path, nbSlots = 16, slotSize = 128, ways = 4)
+
+    def tearDown(self):
+        self.backend.close()
+        os.remove(self.path)
+
+    def test_get_set(self):
+        self.assertTrue(self.backend.set(b"db/col/1", b"value", 0))
+        self.assertEqual(self.backend.get(b"db/col/1"), (b"value", 0))
+        self.assertTrue(self.backend.touch(b"db/col/1", 12.5))
+        self.assertEqual(self.backend.get(b"db/col/1"), (b"value", 12.5))
+        self.assertFalse(self.backend.set(b"db/col/2", b"x" * 200, 0))
+        self.assertIsNone(self.backend.get(b"db/col/2"))
+        self.assertTrue(self.backend.delete(b"db/col/1"))
+        self.assertFalse(self.backend.delete(b"db/col/1"))
+
+    def test_shared(self):
+        self.backend.set(b"db/col/1", b"value", 0)
+        other = MmapCacheBackend(self.path, nbSlots = 16, slotSize = 128, ways = 4)
+        self.assertEqual(other.get(b"db/col/1"), (b"value", 0))
+        other.close()
+
+        self.assertRaises(ValueError, MmapCacheBackend, self.path, nbSlots = 32, slotSize = 128, ways = 4)
+        self.assertEqual(self.backend.get(b"db/col/1"), (b"value", 0))
+
+    def test_eviction_and_prefixes(self):
+        for i in range(100):
+            self.backend.set(("db/%s/%d" % ("a" if i % 2 else "b", i)).encode(), b"v", 0)
+        self.assertEqual(len(self.backend), 16)
+        self.assertEqual(self.backend.evictions, 84)
+        self.backend.clear(b"db/a/")
+        self.assertEqual(self.backend.count(b"db/a/"), 0)
+        self.assertEqual(self.backend.count(), self.backend.count(b"db/b/"))
+
+    def test_incomplete_backends(self):
+        class DictBackend(CacheBackend):
+            def get(self, key):
+                return None
+        self.assertRaises(TypeError, DictBackend)
+
+class WritingSession(object):
+    """acknowledges every write with a new revision"""
+    def __init__(self):
+        self.rev = 1
+
+    def _write(self, url, params = None, data = None, headers = None):
+        self.rev += 1
+        key = url.split("/")[-1]
+        r = StandInResponse({"_id" : "Users_shared/%s" % key, "_key" : key, "_rev" : "r%d" % self.rev})
+        r.status_code = 202
+        return r
+
+    put = patch = _write
+
+class ConflictingSession(object):
+    """refuses every conditional patch, the document always has revision r9"""
+    def get(self, url, params = None, headers = None):
+        key = url.split("/")[-1]
+        return StandInResponse({"_id" : "Users_shared/%s" % key, "_key" : key, "_rev" : "r9", "name" : "old"})
+
+    def patch(self, url, params = None, data = None, headers = None):
+        r = StandInResponse({"error" : True, "errorNum" : 1200, "errorMessage" : "conflict"})
+        r.status_code = 412
+        return r
+
+class InsertingSession(object):
+    """creates the documents it receives"""
+    def post(self, url, params = None, data = None):
+        if url.endswith("/import"):
+            r = StandInResponse({"error" : False, "created" : len(data.splitlines()), "updated" : 0})
+            r.status_code = 201
+            return r
+        docs = json.loads(data)
+        r = StandInResponse([{"_id" : "Users_inserts/%s" % d["_key"], "_key" : d["_key"], "_rev" : "r"} for d in docs])
+        r.status_code = 202
+        return r
+
+class Users_inserts(Collection):
+    pass
+
+class MissCacheInsertTests(unittest.TestCase):
+
+    def setUp(self):
+        self.db = WarmUpDatabase({})
+        self.db.connection.session = InsertingSession()
+        self.db.connection.writeBehind = None
+        self.users = Users_inserts(self.db, {"name" : "Users_inserts", "type" : 2, "id" : "47"})
+        self.missCache = self.users.activateMissCache(60)
+        for key in "abcde":
+            self.missCache.add(key)
+
+    def test_bulk_and_import(self):
+        with BulkOperation(self.users, batchSize = 10) as users:
+            users.createDocument({"_key" : "a"}).save()
+        self.assertNotIn("a", self.missCache)
+
+        self.users.bulkSave([{"_key" : "b"}])
+        self.assertNotIn("b", self.missCache)
+        self.assertIn("c", self.missCache)
+
+        self.users.createImportJob([{"_key" : "x"}]).run()
+        self.assertEqual(len(self.missCache), 0)
+
+    def test_write_behind(self):
+        writeBehind = WriteBehind(self.db.connection, flushInterval = 60)
+        self.db.connection.writeBehind = writeBehind
+        self.users.createDocument({"_key" : "d"}).save()
+        self.assertIn("d", self.missCache)
+        writeBehind.stop()
+        self.assertNotIn("d", self.missCache)
+
+class Users_shared(Collection):
+    pass
+
+class SharedDocumentCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.backend = MmapCacheBackend(self.path, nbSlots = 16, slotSize = 512, ways = 4)
+        self.db = WarmUpDatabase({})
+        self.db.connection.session = WritingSession()
+        self.db.connection.writeBehind = None
+        self.users = Users_shared(self.db, {"name" : "Users_shared", "type" : 2, "id" : "46"})
+        self.cache = self.users.activateCache(backend = self.backend)
+        self.cache.cache(self.users.documentClass(self.users, {"_id" : "Users_shared/k", "_key" : "k", "_rev" : "r1", "name" : "old"}))
+
+    def tearDown(self):
+        self.backend.close()
+        os.remove(self.path)
+
+    def test_writes_invalidate(self):
+        doc = self.cache["k"]
+        doc["name"] = "new"
+        doc.save()
+        self.assertNotIn("k", self.cache)
+
+        self.cache.cache(doc)
+        doc["name"] = "newer"
+        doc.patch()
+        self.assertIsNone(self.cache.peek("k"))
+
+    def test_failed_updates_are_not_cached(self):
+        cache = self.users.activateCache(10)
+        cache.cache(self.users.documentClass(self.users, {"_id" : "Users_shared/k", "_key" : "k", "_rev" : "r1", "name" : "old"}))
+        self.db.connection.session = ConflictingSession()
+        def rename(doc):
+            doc["name"] = "new"
+        self.assertRaises(PreconditionFailedError, self.users.update_with_retry, "k", rename, maxRetries = 2)
+        self.assertNotIn("k", cache)
+
+    def test_outcomes_are_counted_once(self):
+        cache = self.users.activateCache(backend = self.backend, ttl = 0.01, revalidate = True)
+        cache.cache(self.users.documentClass(self.users, {"_key" : "k", "_rev" : "r1"}))
+        self.assertIsNone(cache.get("nope"))
+        cache.replace("nope", self.users.documentClass(self.users, {"_key" : "nope", "_rev" : "r1"}))
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.lookup("k")[1], False)
+        cache.replace("k", None)
+        self.assertEqual((cache.hits, cache.misses, cache.revalidations), (0, 3, 0))
+
+    def test_contains_does_not_decode(self):
+        def fail(*args, **kwargs):
+            raise AssertionError("decoded")
+        self.users.documentClass = fail
+        self.assertIn("k", self.cache)
+        self.assertNotIn("nope", self.cache)
+
+    def test_values_that_are_not_json(self):
+        doc = self.users.documentClass(self.users, {"_key" : "d", "_rev" : "r1", "when" : datetime.datetime(2020, 1, 1)})
+        self.cache.cache(doc)
+        self.assertEqual(self.cache["d"]["when"], "2020-01-01 00:00:00")
+
+if __name__ == "__main__":
+    unittest.main()
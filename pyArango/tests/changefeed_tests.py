@@ -0,0 +1,197 @@
+import unittest, json, threading
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from urllib.parse import urlparse, parse_qs
+except ImportError:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from urlparse import urlparse, parse_qs
+from pyArango.connection import Connection
+from pyArango.database import Database
+from pyArango.collection import Collection, Edges
+from pyArango.changefeed import ChangeFeed
+
+class StandInServer(object):
+    """a local http server that serves a canned change stream, one chunk per request to /wal/tail"""
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                server.requests.append((url.path, {k : v[0] for k, v in parse_qs(url.query).items()}))
+                headers = {}
+                if url.path == "/_api/database/user":
+                    status, content = 200, b'{"error": false, "code": 200, "result": ["db"]}'
+                elif url.path == "/_db/db/_api/wal/lastTick":
+                    status, content = 200, b'{"tick": "1"}'
+                elif url.path == "/_db/db/_api/wal/tail" and server.chunks:
+                    markers, headers = server.chunks.pop(0)
+                    content = "\n".join(json.dumps(m) for m in markers).encode("utf-8")
+                    status = 200 if markers else 204
+                else:
+                    status, content = 404, b'{"error": true, "code": 404, "errorNum": 404, "errorMessage": "not found"}'
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                if status != 204:
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                if status != 204:
+                    self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = HTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target = self.httpd.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = "http://127.0.0.1:%d" % self.httpd.server_address[1]
+
+    def tailRequests(self):
+        return [params for path, params in self.requests if path.endswith("/wal/tail")]
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def connect(chunks):
+    server = StandInServer(chunks)
+    db = Database(Connection(arangoURL = server.url, lazyMetadata = True), "db")
+    return server, db
+
+class Users_changefeed(Collection):
+    pass
+
+def document(key, rev, tid = "0", **values):
+    values.update({"_key" : key, "_id" : "Users_changefeed/%s" % key, "_rev" : rev})
+    return {"type" : 2300, "tid" : tid, "cuid" : "c42", "data" : values}
+
+def removal(key, tid = "0"):
+    return {"type" : 2302, "tid" : tid, "cuid" : "c42", "data" : {"_key" : key, "_rev" : "x"}}
+
+def more(lastIncluded, checkMore):
+    return {"x-arango-replication-lastincluded" : lastIncluded, "x-arango-replication-checkmore" : "true" if checkMore else "false", "x-arango-replication-frompresent" : "true"}
+
+class ChangeFeedTests(unittest.TestCase):
+
+    def setUp(self):
+        self.chunks = []
+        self.server, self.db = connect(self.chunks)
+        self.users = Users_changefeed(self.db, {"name" : "Users_changefeed", "type" : 2, "globallyUniqueId" : "c42", "id" : "42"})
+        self.db.collections["Users_changefeed"] = self.users
+        self.cache = self.users.activateCache(10)
+        for i in range(5):
+            self.cache.cache(self.users.documentClass(self.users, {"_key" : str(i), "_rev" : "r%d" % i, "n" : i}))
+        self.changes = []
+
+    def tearDown(self):
+        self.server.stop()
+
+    def feed(self, **kwargs):
+        feed = ChangeFeed(self.db, start = False, **kwargs)
+        feed.addListener(lambda name, key: self.changes.append((name, key)))
+        return feed
+
+    def test_invalidation(self):
+        self.chunks.extend([
+            ([document("0", "r0b"), removal("1")], more("10", True)),
+            ([document("2", "r2b", tid = "5"), document("3", "r3b", tid = "6"), {"type" : 2201, "tid" : "5"}, {"type" : 2202, "tid" : "6"}], more("14", False)),
+            ([], more("0", False)),
+        ])
+        feed = self.feed()
+        self.assertTrue(feed.poll())
+        self.assertEqual(self.cache.getChain(), ["4", "3", "2"])
+        self.assertFalse(feed.poll())
+        self.assertEqual(self.cache.getChain(), ["4", "3"])
+        self.assertFalse(feed.poll())
+        self.assertEqual([params["from"] for params in self.server.tailRequests()], ["1", "10", "14"])
+        self.assertEqual(self.changes, [("Users_changefeed", "0"), ("Users_changefeed", "1"), ("Users_changefeed", "2")])
+
+    def test_refresh(self):
+        missCache = self.users.activateMissCache(60)
+        missCache.add("9")
+        self.chunks.append(([document("0", "r0b", n = 100), document("9", "r9")], more("3", False)))
+        self.feed(refresh = True).poll()
+        self.assertEqual(self.cache["0"]["n"], 100)
+        self.assertNotIn("9", self.cache)
+        self.assertNotIn("9", missCache)
+
+    def test_truncate_and_lost_ticks(self):
+        self.chunks.append(([{"type" : 2004, "cuid" : "c42"}], more("3", False)))
+        self.feed().poll()
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.changes, [("Users_changefeed", None)])
+
+        self.cache.cache(self.users.documentClass(self.users, {"_key" : "0", "_rev" : "r0"}))
+        headers = more("0", False)
+        headers["x-arango-replication-frompresent"] = "false"
+        self.chunks.append(([], headers))
+        self.feed(fromTick = "3").poll()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_gaps_clear_miss_caches(self):
+        missCache = self.users.activateMissCache(60)
+        missCache.add("9")
+        headers = more("0", False)
+        headers["x-arango-replication-frompresent"] = "false"
+        self.chunks.append(([], headers))
+        self.feed(fromTick = "3").poll()
+        self.assertNotIn("9", missCache)
+
+    def test_other_collections(self):
+        self.chunks.append(([removal("0")], more("3", False)))
+        self.feed(collections = ["Others"]).poll()
+        self.assertIn("0", self.cache)
+        self.assertEqual(self.changes, [("Users_changefeed", "0")])
+
+    def test_collections_loaded_later(self):
+        other = {"type" : 2302, "tid" : "0", "cuid" : "c44", "data" : {"_key" : "0", "_rev" : "x"}}
+        self.chunks.append(([other], more("3", False)))
+        feed = self.feed()
+        feed.poll()
+        self.assertEqual(self.changes, [])
+
+        # the catalog is read at most once per poll, and not for the collections already known to be missing from it
+        refreshes = []
+        refreshNames = feed._refreshNames
+        feed._refreshNames = lambda: refreshes.append(1) or refreshNames()
+        for i in range(3):
+            self.chunks.append(([other, dict(other, cuid = "c45"), dict(other, cuid = "c46")], more("4", False)))
+            feed.poll()
+        self.assertEqual(len(refreshes), 1)
+
+        self.db.collections["Others_changefeed"] = Collection(self.db, {"name" : "Others_changefeed", "type" : 2, "globallyUniqueId" : "c44", "id" : "44"})
+        self.chunks.append(([other], more("5", False)))
+        feed.poll()
+        self.assertEqual(self.changes, [("Others_changefeed", "0")])
+        self.assertEqual(len(refreshes), 2)
+
+class Links_changefeed(Edges):
+    pass
+
+class AdjacencyChangeFeedTests(unittest.TestCase):
+
+    def test_edges(self):
+        chunks = []
+        server, db = connect(chunks)
+        self.addCleanup(server.stop)
+        links = Links_changefeed(db, {"name" : "Links_changefeed", "type" : 3, "globallyUniqueId" : "c43", "id" : "43"})
+        db.collections["Links_changefeed"] = links
+        cache = links.activateAdjacencyCache()
+        e = {"_id" : "Links_changefeed/0", "_key" : "0", "_from" : "v/0", "_to" : "v/1"}
+        cache.set("v/0", "out", [e])
+        cache.set("v/1", "in", [e])
+        cache.set("v/2", "any", [])
+        cache.set("v/3", "any", [])
+        created = {"type" : 2300, "tid" : "0", "cuid" : "c43", "data" : {"_key" : "1", "_rev" : "r", "_from" : "v/2", "_to" : "v/5"}}
+        removed = {"type" : 2302, "tid" : "0", "cuid" : "c43", "data" : {"_key" : "0", "_rev" : "r"}}
+        chunks.append(([created, removed], more("3", False)))
+        ChangeFeed(db, start = False).poll()
+        self.assertEqual(list(cache.entries.keys()), [("v/3", "any")])
+
+if __name__ == "__main__":
+    unittest.main()
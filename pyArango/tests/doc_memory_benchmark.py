@@ -0,0 +1,69 @@
+import json
+import sys
+import tracemalloc
+
+from pyArango.collection import Collection, Field
+
+# A little script to measure the memory taken by hydrated documents, it does not need a running ArangoDB
+
+class Database_stub(object):
+    """Documents are hydrated without ever talking to the database"""
+    connection = None
+
+class Users_benchmark(Collection):
+    _fields = {
+        "name" : Field(),
+        "address" : {
+            "street" : Field(),
+            "city" : Field(),
+            "geo" : {
+                "lat" : Field(),
+                "lng" : Field(),
+            }
+        },
+    }
+
+def makeJson(i):
+    return json.dumps({
+        "_id" : "Users_benchmark/%d" % i,
+        "_key" : str(i),
+        "_rev" : "_bKxYZ--%d" % i,
+        "name" : "Tesla-%d" % i,
+        "number" : i,
+        "address" : {"street" : "%d Wardenclyffe road" % i, "city" : "Shoreham", "geo" : {"lat" : 40.95, "lng" : -72.89}},
+        "settings" : {"theme" : "dark", "notifications" : {"email" : True, "sms" : False}, "tags" : ["a", "b", "c"]},
+        "history" : [{"date" : "1901-01-%02d" % (i % 28 + 1), "event" : "lab"}, {"date" : "1917-05-18", "event" : "medal"}],
+    })
+
+def measure(fct, jsons):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [fct(j) for j in jsons]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / float(len(objs)), objs
+
+def touchAll(store):
+    """reads every nested field, this wraps all sub documents"""
+    for k in list(store.getStore().keys()):
+        v = store[k]
+        if hasattr(v, "getStore"):
+            touchAll(v)
+
+nbDocs = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+collection = Users_benchmark(Database_stub(), {"name" : "Users_benchmark", "type" : 2})
+jsons = [makeJson(i) for i in range(nbDocs)]
+
+print("json text:", sum(len(j) for j in jsons) / float(nbDocs), "bytes/doc")
+rawSize, _ = measure(json.loads, jsons)
+print("decoded json dicts:", rawSize, "bytes/doc")
+docSize, docs = measure(lambda j: collection.documentClass(collection, json.loads(j)), jsons)
+print("hydrated documents:", docSize, "bytes/doc")
+
+tracemalloc.start()
+before = tracemalloc.get_traced_memory()[0]
+for doc in docs:
+    touchAll(doc._store)
+after = tracemalloc.get_traced_memory()[0]
+tracemalloc.stop()
+print("hydrated documents, all fields accessed:", docSize + (after - before) / float(nbDocs), "bytes/doc")
@@ -0,0 +1,69 @@
+import unittest, json
+from pyArango.lazyjson import *
+from pyArango.document import LazyDictStore
+from pyArango.collection import documentSize
+
+class LazyJSONTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dct = {
+            "_key" : "tesla",
+            "name" : "Nikola \"Tesla\" \\",
+            "quote\"key" : 1,
+            "inventions" : ["coil", {"name" : "]}{[", "years" : [1891, 1893]}, []],
+            "address" : {"city" : "Smiljan", "geo" : {"lat" : 44.5, "lng" : 15.3}},
+            "deep" : [[[[[[[[[[[{"x" : "]\""}]]]]]]]]]]],
+            "alive" : False,
+            "death" : None,
+            "unicode" : u"é",
+        }
+
+    def tearDown(self):
+        pass
+
+    def test_decode(self):
+        for text in (json.dumps(self.dct), json.dumps(self.dct, indent = 2), json.dumps(self.dct, ensure_ascii = False)):
+            lazy = loadsLazy(text)
+            self.assertEqual(set(lazy.keys()), set(self.dct.keys()))
+            for k, v in self.dct.items():
+                self.assertEqual(lazy[k], v)
+                self.assertEqual(json.loads(lazy.raw(k)), v)
+            self.assertEqual(lazy.decode(), self.dct)
+
+    def test_lazy_keys(self):
+        response = {"result" : [self.dct, 1, "two", None], "hasMore" : True, "extra" : {"stats" : {}}}
+        res = loadsLazy(json.dumps(response).encode("utf-8"), ("result", ))
+        self.assertEqual(res["hasMore"], True)
+        self.assertEqual(res["extra"], {"stats" : {}})
+        self.assertTrue(isinstance(res["result"][0], LazyJSON))
+        self.assertEqual(res["result"][0].decode(), self.dct)
+        self.assertEqual(res["result"][1:], [1, "two", None])
+
+    def test_invalid(self):
+        for text in ('{"a" : }', '{"a" : 1', '{"a" 1}', '[1]', '{"a" : "x}', '{"a" : [1, 2}'):
+            self.assertRaises(ValueError, loadsLazy, text)
+
+class StandInCollection(object):
+    arangoPrivates = ["_id", "_key", "_rev"]
+
+class StandInDocument(object):
+    def __init__(self, store):
+        self._store = store
+
+class LazyDictStoreTests(unittest.TestCase):
+
+    def test_only_keeps_its_document(self):
+        batch = [{"_key" : str(i), "name" : "n%d" % i, "padding" : "x" * 1000} for i in range(100)]
+        docs = loadsLazy(json.dumps({"result" : batch}), ("result", ))["result"]
+        store = LazyDictStore(StandInCollection(), docs[5])
+        self.assertLess(len(store.text), 1100)
+        self.assertEqual(store["name"], "n5")
+        self.assertEqual(store["padding"], "x" * 1000)
+        self.assertIsNone(store.text)
+
+        size = documentSize(StandInDocument(LazyDictStore(StandInCollection(), docs[6])))
+        self.assertGreater(size, 1000)
+        self.assertLess(size, 5000)
+
+if __name__ == "__main__":
+    unittest.main()
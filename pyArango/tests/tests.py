@@ -124,6 +124,38 @@ class pyArangoTests(unittest.TestCase):
         self.assertEqual(doc["address"]["street"], "Paper street")
         self.assertEqual(doc["name"], "Tyler Durden")
 
+    # @unittest.skip("stand by")
+    def test_default_document_template(self):
+        counter = [0]
+        def nextNumber():
+            counter[0] += 1
+            return counter[0]
+
+        class theCol(Collection):
+            _fields = {
+                "number": Field(default = nextNumber),
+                "tags": Field(default = ["new"]),
+                "address" : {
+                    "street" : Field(default = "Paper street"),
+                    "history" : [],
+                },
+            }
+
+        col = self.db.createCollection("theCol")
+        doc1 = col.createDocument()
+        doc2 = col.createDocument({"address" : {"street" : "North street"}})
+        self.assertEqual(doc1["number"], 1)
+        self.assertEqual(doc2["number"], 2)
+        self.assertEqual(doc2["address"]["street"], "North street")
+
+        defaults = col.getDefaultDocument()
+        self.assertEqual(defaults["address"], {"street" : "Paper street", "history" : []})
+        defaults["tags"].append("modified")
+        defaults["address"]["history"].append("modified")
+        self.assertEqual(col.getDefaultDocument()["tags"], ["new"])
+        self.assertEqual(col.getDefaultDocument()["address"]["history"], [])
+        self.assertEqual(theCol._fields["tags"].default, ["new"])
+
     # @unittest.skip("stand by")
     def test_fill_default(self):
         class theCol(Collection):
@@ -240,6 +272,40 @@ class pyArangoTests(unittest.TestCase):
 
         collection.delete()
 
+    # @unittest.skip("stand by")
+    def test_write_behind(self):
+        users = self.db.createCollection(name = "users")
+        pets = self.db.createCollection(name = "pets")
+        errors = []
+        writeBehind = self.conn.activateWriteBehind(batchSize = 50, flushInterval = 60, onError = lambda doc, err: errors.append(doc))
+        try:
+            docs = []
+            for i in range(20):
+                doc = users.createDocument({"number" : i})
+                doc.save()
+                docs.append(doc)
+                doc = pets.createDocument({"number" : i})
+                doc.save()
+            self.assertEqual(len(writeBehind), 40)
+            self.assertEqual(users.count(), 0)
+
+            writeBehind.flush()
+            self.assertEqual(users.count(), 20)
+            self.assertEqual(pets.count(), 20)
+            self.assertTrue(docs[0]._key is not None)
+
+            docs[0]["name"] = "Tesla"
+            docs[0].patch()
+            docs[1].delete()
+            dup = users.createDocument({"_key" : docs[2]._key})
+            dup.save()
+            writeBehind.barrier()
+            self.assertEqual(users[docs[0]._key]["name"], "Tesla")
+            self.assertEqual(users.count(), 19)
+            self.assertEqual(errors, [dup])
+        finally:
+            self.conn.deactivateWriteBehind()
+
     # @unittest.skip("stand by")
     def test_bulk_import(self):
         usersCollection = self.db.createCollection(name = "users")
@@ -254,6 +320,69 @@ class pyArangoTests(unittest.TestCase):
         usersCollection.importBulk(users)
         self.assertEqual(usersCollection.count(), len(users))
 
+    # @unittest.skip("stand by")
+    def test_resumable_import(self):
+        import tempfile
+        usersCollection = self.db.createCollection(name="users")
+        tmpDir = tempfile.mkdtemp()
+        filename = os.path.join(tmpDir, "users.jsonl")
+        checkpointFilename = os.path.join(tmpDir, "users.checkpoint")
+        with open(filename, "w") as f:
+            for i in range(100):
+                f.write('{"_key": "tesla-%d", "number": %d}\n' % (i, i))
+
+        def fail(job):
+            if job.offset > 1000:
+                raise KeyboardInterrupt()
+
+        job = usersCollection.createImportJob(filename, checkpointFilename, chunkSize = 30, onProgress = fail)
+        self.assertRaises(KeyboardInterrupt, job.run)
+        landed = usersCollection.count()
+        self.assertEqual(landed, job.progress()["created"])
+        self.assertTrue(0 < landed < 100)
+
+        # the landed documents are sent again with onDuplicate = "ignore"
+        job = usersCollection.createImportJob(filename, checkpointFilename, chunkSize = 30)
+        job.run()
+        progress = job.progress()
+        self.assertTrue(progress["done"])
+        self.assertEqual(progress["created"], 100)
+        self.assertEqual(progress["errors"], 0)
+        self.assertEqual(usersCollection.count(), 100)
+        # the checkpoint only holds the totals, the results of the chunks are in their log
+        self.assertEqual([c["documents"] for c in job.getChunks()], [30, 30, 30, 10])
+
+    # @unittest.skip("stand by")
+    def test_schemaless_documents(self):
+        class Schemaless_test(Collection):
+            pass
+
+        class Schema_test(Collection):
+            _fields = {
+                "name" : Field()
+            }
+
+        col = self.db.createCollection("Schemaless_test")
+        self.assertTrue(col.documentClass is SchemalessDocument)
+        self.assertTrue(self.db.createCollection("Schema_test").documentClass is Document)
+
+        doc = col.createDocument({"name" : "Tesla", "address" : {"city" : "Smiljan"}})
+        doc.save()
+        doc["address"]["city"] = "Shoreham"
+        doc["number"] = 1
+        doc.patch()
+        self.assertEqual(doc.getPatches(), {})
+        doc2 = col[doc._key]
+        self.assertTrue(isinstance(doc2, SchemalessDocument))
+        self.assertEqual(doc2.name, "Tesla")
+        self.assertEqual(doc2["address"], {"city" : "Shoreham"})
+        self.assertEqual(doc2["number"], 1)
+
+        q = self.db.AQLQuery("FOR d IN Schemaless_test RETURN d", rawResults = False)
+        self.assertTrue(isinstance(q[0], SchemalessDocument))
+        doc2.delete()
+        self.assertEqual(col.count(), 0)
+
     # @unittest.skip("stand by")
     def test_bulk_import_exception(self):
         usersCollection = self.db.createCollection(name="users")
@@ -433,6 +562,24 @@ class pyArangoTests(unittest.TestCase):
         doc2 = collection.fetchDocument(doc._key)
         self.assertEqual(doc._id, doc2._id)
 
+    # @unittest.skip("stand by")
+    def test_document_fetch_by_keys(self):
+        collection = self.createManyUsers(10)
+        keys = [doc["_key"] for doc in collection.fetchAll(rawResults = True)]
+        keys.reverse()
+        keys.insert(3, "not_a_key")
+
+        docs = collection.fetchDocuments(keys, batchSize = 4)
+        self.assertEqual(len(docs), len(keys))
+        self.assertIsNone(docs[3])
+        for key, doc in zip(keys, docs):
+            if key != "not_a_key":
+                self.assertEqual(doc._key, key)
+
+        docs = self.db.fetchDocuments(["users/%s" % keys[0], "users/not_a_key"], rawResults = True)
+        self.assertEqual(docs[0]["_key"], keys[0])
+        self.assertIsNone(docs[1])
+
     def test_database_contains_id(self):
         collection = self.db.createCollection(name="lala")
         doc = collection.createDocument()
@@ -510,6 +657,137 @@ class pyArangoTests(unittest.TestCase):
         self.assertEqual(q[0]['name'], 'Tesla-3')
         self.assertTrue(isinstance(q[0], Document))
 
+    # @unittest.skip("stand by")
+    def test_aql_query_readonly_rows(self):
+        from pyArango.document import ReadOnlyRow
+        nbUsers = 20
+        self.createManyUsers(nbUsers)
+
+        aql = "FOR c IN users RETURN c"
+        rows = list(self.db.AQLQuery(aql, rowMode = "readonly", batchSize = 3))
+        self.assertEqual(len(rows), nbUsers)
+        row = rows[0]
+        self.assertTrue(isinstance(row, ReadOnlyRow))
+        self.assertEqual(row.name, row["name"])
+        self.assertEqual(row._id, "users/%s" % row._key)
+        self.assertEqual(row.getCollection().name, "users")
+        with self.assertRaises(AttributeError):
+            row.name = "Edison"
+        with self.assertRaises(TypeError):
+            row["name"] = "Edison"
+
+        doc = row.toDocument()
+        doc["name"] = "Edison"
+        doc.patch()
+        self.assertEqual(self.db["users"][row._key]["name"], "Edison")
+
+        # a field named 'collection' is a field like the others
+        row = self.db.AQLQuery("RETURN MERGE(DOCUMENT('users', @key), {collection: 'pets'})", bindVars = {"key" : row._key}, rowMode = "readonly")[0]
+        self.assertEqual(row.collection, "pets")
+        self.assertEqual(row["collection"], "pets")
+        self.assertEqual(row.getCollection().name, "users")
+        # rows of collections the database does not know have none
+        row = self.db.AQLQuery("RETURN {_id: 'pyArangoNotACollection/1', name: 'Edison'}", rowMode = "readonly")[0]
+        self.assertIsNone(row.getCollection())
+        self.assertEqual(row.name, "Edison")
+
+        numbers = [r["number"] for r in self.db.AQLQuery(aql, rowMode = "readonly", reuseRow = True, batchSize = 3)]
+        self.assertEqual(sorted(numbers), list(range(nbUsers)))
+        numbers = [r["number"] for r in self.db["users"].fetchAll(rowMode = "readonly", reuseRow = True)]
+        self.assertEqual(sorted(numbers), list(range(nbUsers)))
+
+    # @unittest.skip("stand by")
+    def test_lazy_decoding(self):
+        from pyArango.document import LazyDictStore
+        col = self.db.createCollection(name = "lazy_docs")
+        for i in range(10):
+            doc = col.createDocument({"name" : "Tesla-%d" % i, "number" : i, "blob" : "x" * 10000, "events" : [{"date" : "1901-01-01", "tags" : ["a", "]"]}] * 20})
+            doc.save()
+
+        doc = col.fetchDocument(doc._key, lazy = True)
+        self.assertTrue(isinstance(doc._store, LazyDictStore))
+        self.assertEqual(doc["number"], 9)
+        self.assertTrue("blob" in doc._store.pending)
+        self.assertEqual(doc["events"][0]["tags"], ["a", "]"])
+
+        del doc["blob"]
+        doc["name"] = "Edison"
+        doc.patch()
+        doc2 = col.fetchDocument(doc._key)
+        self.assertFalse("blob" in doc2)
+        self.assertEqual(doc2["name"], "Edison")
+        self.assertEqual(len(doc2["events"]), 20)
+
+        numbers = [d["number"] for d in self.db.AQLQuery("FOR d IN lazy_docs RETURN d", lazy = True, batchSize = 3)]
+        self.assertEqual(sorted(numbers), list(range(10)))
+        numbers = [d.number for d in self.db.AQLQuery("FOR d IN lazy_docs RETURN d", lazy = True, rowMode = "readonly", batchSize = 3)]
+        self.assertEqual(sorted(numbers), list(range(10)))
+
+    # @unittest.skip("stand by")
+    def test_projections(self):
+        col = self.createManyUsers(10)
+        doc = col.fetchFirstExample({"number" : 3})[0]
+        doc["blob"] = "x" * 1000
+        doc.save()
+
+        partial = col.fetchDocument(doc._key, fields = ["name"])
+        self.assertTrue(partial.partial)
+        self.assertEqual(partial._key, doc._key)
+        self.assertEqual(partial["name"], "Tesla-3")
+        self.assertFalse("blob" in partial._store)
+        partial["name"] = "Edison"
+        partial.save()
+
+        full = col.fetchDocument(doc._key)
+        self.assertFalse(full.partial)
+        self.assertEqual(full["name"], "Edison")
+        self.assertEqual(full["blob"], "x" * 1000)
+
+        partial = col.fetchDocument(doc._key, exclude = ["blob"])
+        self.assertFalse("blob" in partial._store)
+        self.assertEqual(partial["number"], 3)
+
+        q = col.fetchByExample({"species" : "human"}, batchSize = 3, fields = ["number"], count = True)
+        self.assertEqual(q.count, 10)
+        docs = list(q)
+        self.assertEqual(sorted(d["number"] for d in docs), list(range(10)))
+        self.assertFalse("name" in docs[0]._store)
+
+        q = col.fetchAll(exclude = ["name", "blob"], skip = 2, limit = 5)
+        self.assertEqual(len(list(q)), 5)
+
+    # @unittest.skip("stand by")
+    def test_document_serialization(self):
+        import pickle
+        from pyArango.serialization import registerConnection, dumpDocuments, loadDocuments
+        col = self.createManyUsers(10)
+        docs = list(col.fetchAll())
+
+        # the other tests must not find documents bound to the registered connection
+        self.addCleanup(registerConnection, None)
+        # copies keep their collection, the registered connection is only used to unpickle
+        registerConnection(lambda: self.fail("copies must not use the registered connection"))
+        for c in (copy.copy(docs[0]), copy.deepcopy(docs[0])):
+            self.assertIs(c.collection, docs[0].collection)
+            self.assertEqual(c["name"], docs[0]["name"])
+
+        data = pickle.dumps(docs[0])
+        self.assertTrue(len(data) < 1000)
+        registerConnection(self.conn)
+        doc = pickle.loads(data)
+        self.assertEqual(doc._key, docs[0]._key)
+        self.assertEqual(doc["name"], docs[0]["name"])
+        doc["name"] = "Edison"
+        doc.patch()
+        self.assertEqual(col[doc._key]["name"], "Edison")
+
+        buff = dumpDocuments(docs + [None])
+        loaded = loadDocuments(buff)
+        self.assertEqual(loaded[-1], None)
+        self.assertEqual([d._key for d in loaded[:-1]], [d._key for d in docs])
+        self.assertEqual(sorted(d["number"] for d in loaded[:-1]), list(range(10)))
+        self.assertEqual(loaded[0].collection.name, "users")
+
     # @unittest.skip("stand by")
     def test_aql_query_batch(self):
         nbUsers = 100
@@ -729,6 +1007,92 @@ class pyArangoTests(unittest.TestCase):
         doc.patch()
         self.assertEqual(myCol[doc._key]._store.getStore(), doc._store.getStore())
 
+    # @unittest.skip("stand by")
+    def test_nested_patches(self):
+        col = self.db.createCollection(name = "users")
+        doc = col.createDocument({"name" : "Tesla", "address" : {"city" : "Smiljan", "country" : "Croatia"}, "inventions" : ["coil"], "age" : 86})
+        doc.save()
+
+        doc["address"]["city"] = "Shoreham"
+        doc["inventions"].append("radio")
+        del doc["age"]
+        self.assertEqual(doc.getPatches(), {"address" : {"city" : "Shoreham"}, "inventions" : ["coil", "radio"], "age" : None})
+        doc.patch()
+        self.assertEqual(doc.getPatches(), {})
+
+        doc2 = col[doc._key]
+        self.assertEqual(doc2["address"], {"city" : "Shoreham", "country" : "Croatia"})
+        self.assertEqual(doc2["inventions"], ["coil", "radio"])
+        self.assertFalse("age" in doc2)
+
+        # removing a field while setting another one to null replaces the document
+        doc2["address"]["country"] = None
+        del doc2["name"]
+        doc2.patch()
+        doc3 = col[doc._key]
+        self.assertEqual(doc3["address"], {"city" : "Shoreham", "country" : None})
+        self.assertFalse("name" in doc3)
+
+    # @unittest.skip("stand by")
+    def test_optimistic_concurrency(self):
+        from pyArango.theExceptions import PreconditionFailedError
+        col = self.db.createCollection(name = "users")
+        doc = col.createDocument({"name" : "Tesla", "count" : 0})
+        doc.save()
+
+        other = col.fetchDocument(doc._key)
+        other["count"] = 10
+        other.patch(checkRev = True)
+
+        doc["count"] = 1
+        with self.assertRaises(PreconditionFailedError):
+            doc.patch(checkRev = True)
+        with self.assertRaises(PreconditionFailedError):
+            doc.delete(checkRev = True)
+
+        def increment(d):
+            d["count"] += 1
+        doc = col.update_with_retry(doc, increment)
+        self.assertEqual(doc["count"], 11)
+        self.assertEqual(col.fetchDocument(doc._key)["count"], 11)
+
+        doc.delete(checkRev = True)
+        self.assertEqual(col.count(), 0)
+
+    # @unittest.skip("stand by")
+    def test_nested_foreign_fields(self):
+        import pyArango.validation as VAL
+
+        class Col_strict(Collection):
+            _validation = {
+                "on_save": True,
+                "on_set": False,
+                "allow_foreign_fields": False
+            }
+
+            _fields = {
+                "str": Field(validators=[VAL.NotNull()]),
+                "nested": {
+                    "str": Field(validators=[VAL.NotNull()])
+                }
+            }
+
+        self.assertEqual(sorted(Col_strict._compiledFields.checks.keys()), [("nested", "str"), ("str", )])
+        myCol = self.db.createCollection('Col_strict')
+        doc = myCol.createDocument()
+        doc["str"] = "string"
+        doc["nested"] = {
+            "str": "string",
+            "foreigner": "string"
+        }
+        with self.assertRaises(InvalidDocument) as ctx:
+            doc.save()
+        self.assertEqual(list(ctx.exception.errors.keys()), ["foreigner"])
+
+        del doc["nested"]["foreigner"]
+        doc.save()
+        self.assertEqual(myCol[doc._key]._store.getStore(), doc._store.getStore())
+
     # @unittest.skip("stand by")
     def test_document_cache(self):
         class DummyDoc(object):
@@ -768,6 +1132,153 @@ class pyArangoTests(unittest.TestCase):
         self.assertEqual(cache.head._key, doc._key)
         self.assertEqual(cache.getChain(), [5, 9, 8, 7, 6])
 
+    # @unittest.skip("stand by")
+    def test_document_cache_revalidation(self):
+        col = self.db.createCollection(name = "users")
+        for i in range(3):
+            col.createDocument({"_key" : str(i), "n" : i}).save()
+
+        cache = col.activateCache(10, revalidate = True)
+        doc = col["0"]
+        self.assertIs(col["0"], doc)
+        self.assertEqual(cache.getStats()["revalidations"], 1)
+
+        other = col.fetchDocument("0")
+        other["n"] = 10
+        other.patch()
+        self.assertEqual(col["0"]["n"], 10)
+
+        col.fetchDocuments(["0", "1"])
+        col.fetchDocument("1").delete()
+        docs = col.fetchDocuments(["0", "1", "2"])
+        self.assertIs(docs[0], col.documentCache.peek("0"))
+        self.assertIsNone(docs[1])
+        self.assertEqual(docs[2]["n"], 2)
+        self.assertIsNone(col.fetchDocument("2", ifNoneMatch = docs[2]._rev))
+
+    # @unittest.skip("stand by")
+    def test_warm_cache(self):
+        col = self.db.createCollection(name = "users")
+        for i in range(10):
+            col.createDocument({"_key" : str(i), "n" : i}).save()
+
+        self.assertRaises(ValueError, col.warmCache)
+        cache = col.activateCache(5)
+        warmUp = col.warmCache(batchSize = 2)
+        self.assertEqual(len(cache), 5)
+        self.assertEqual(warmUp.progress()["batches"], 3)
+
+        cache.clear()
+        col.warmCache(keys = ["1", "2", "nope"])
+        self.assertEqual(sorted(cache.getChain()), ["1", "2"])
+
+        cache.clear()
+        warmUp = col.warmCache(query = "FOR d IN @@collection FILTER d.n >= @n RETURN d", bindVars = {"n" : 8}, background = True)
+        self.assertTrue(warmUp.wait())
+        self.assertEqual(sorted(cache.getChain()), ["8", "9"])
+        self.assertEqual(cache.getStats()["misses"], 0)
+
+    # @unittest.skip("stand by")
+    def test_get_many(self):
+        col = self.db.createCollection(name = "users")
+        for i in range(5):
+            col.createDocument({"_key" : str(i), "n" : i}).save()
+
+        cache = col.activateCache(10)
+        col["0"]
+        docs = col.getMany(["0", "1", "nope", "2"])
+        self.assertEqual([d["n"] if d is not None else None for d in docs], [0, 1, None, 2])
+        self.assertEqual((docs.hits, docs.misses), (1, 3))
+        self.assertIs(col["1"], docs[1])
+
+        col.activateCache(10, revalidate = True)
+        col.fetchDocuments(["3", "4"])
+        col.fetchDocument("4").delete()
+        docs = col.getMany(["3", "4"])
+        self.assertEqual(docs[0]["n"], 3)
+        self.assertIsNone(docs[1])
+        self.assertEqual(docs.misses, 2)
+
+    # @unittest.skip("stand by")
+    def test_shared_document_cache(self):
+        import tempfile
+        from pyArango.sharedcache import MmapCacheBackend, SharedDocumentCache
+        col = self.db.createCollection(name = "users")
+        col.createDocument({"_key" : "tesla", "name" : "Tesla"}).save()
+
+        path = tempfile.mktemp()
+        backend = MmapCacheBackend(path, nbSlots = 64, slotSize = 512)
+        try:
+            cache = col.activateCache(backend = backend)
+            self.assertEqual(col["tesla"]["name"], "Tesla")
+
+            # another process opening the same file sees the document
+            other = MmapCacheBackend(path, nbSlots = 64, slotSize = 512)
+            otherCache = SharedDocumentCache(col, other)
+            self.assertEqual(otherCache["tesla"]._rev, col["tesla"]._rev)
+            self.assertEqual(cache.getStats()["hits"], 1)
+            other.close()
+
+            doc = col["tesla"]
+            doc["name"] = "Nikola"
+            doc.save()
+            self.assertEqual(col["tesla"]["name"], "Nikola")
+            self.assertEqual(col["tesla"]._rev, doc._rev)
+
+            col["tesla"].delete()
+            self.assertNotIn("tesla", cache)
+        finally:
+            backend.close()
+            os.remove(path)
+
+    # @unittest.skip("stand by")
+    def test_change_feed(self):
+        import time
+        col = self.db.createCollection(name = "users")
+        col.createDocument({"_key" : "tesla", "n" : 0}).save()
+        col.createDocument({"_key" : "edison", "n" : 0}).save()
+
+        cache = col.activateCache(10)
+        changes = []
+        feed = self.db.activateChangeFeed(pollInterval = 0.1)
+        feed.addListener(lambda name, key: changes.append((name, key)), ["users"])
+        try:
+            col["tesla"]
+            col["edison"]
+            doc = col.fetchDocument("tesla")
+            doc["n"] = 1
+            doc.patch()
+            for i in range(50):
+                if "tesla" not in cache:
+                    break
+                time.sleep(0.1)
+            self.assertNotIn("tesla", cache)
+            self.assertIn("edison", cache)
+            self.assertIn(("users", "tesla"), changes)
+            self.assertEqual(col["tesla"]["n"], 1)
+        finally:
+            self.db.deactivateChangeFeed()
+
+    # @unittest.skip("stand by")
+    def test_existence_checks(self):
+        col = self.db.createCollection(name = "users")
+        for i in range(3):
+            col.createDocument({"_key" : str(i)}).save()
+
+        self.assertTrue("1" in col)
+        self.assertFalse("10" in col)
+        self.assertTrue("users/2" in self.db)
+        self.assertEqual(col.existing(["0", "2", "5", "10"], batchSize = 2), set(["0", "2"]))
+
+        missCache = col.activateMissCache(ttl = 60)
+        self.assertFalse("10" in col)
+        self.assertIn("10", missCache)
+        with self.assertRaises(DocumentNotFoundError):
+            col["10"]
+        col.createDocument({"_key" : "10"}).save()
+        self.assertTrue("10" in col)
+        self.assertEqual(col.existing(["5", "10"]), set(["10"]))
+
     # @unittest.skip("stand by")
     def test_validation_default_settings(self):
 
@@ -890,6 +1401,50 @@ class pyArangoTests(unittest.TestCase):
         for i in ins:
             self.assertEqual(i["number"] % 2, 0)
 
+    # @unittest.skip("stand by")
+    def test_get_edges_for_vertices(self):
+        class Human(Collection):
+            _fields = {
+                "number" : Field()
+            }
+
+        class Relation(Edges):
+            _fields = {
+                "number" : Field()
+            }
+
+        humans = self.db.createCollection("Human")
+        rels = self.db.createCollection("Relation")
+        humansList = []
+        for i in range(10):
+            h = humans.createDocument({"number" : i})
+            h.save()
+            humansList.append(h)
+
+        for i in range(1, 10):
+            e = rels.createEdge({"number" : i})
+            e.links(humansList[i % 2], humansList[i])
+
+        outs = rels.getEdgesForVertices(humansList[:3], direction = "out")
+        self.assertEqual(list(outs.keys()), [h._id for h in humansList[:3]])
+        self.assertEqual(sorted(e["number"] for e in outs[humansList[0]._id]), [2, 4, 6, 8])
+        self.assertEqual(sorted(e["number"] for e in outs[humansList[1]._id]), [1, 3, 5, 7, 9])
+        self.assertEqual(outs[humansList[2]._id], [])
+
+        anys = rels.getEdgesForVertices([humansList[1]._id], batchSize = 1, rawResults = True)
+        self.assertEqual(len(anys[humansList[1]._id]), 5)
+
+        cache = rels.activateAdjacencyCache()
+        self.assertEqual(len(humansList[0].getOutEdges(rels)), 4)
+        self.assertEqual(len(humansList[0].getOutEdges(rels)), 4)
+        self.assertEqual(cache.getStats()["hits"], 1)
+
+        e = rels.createEdge({"number" : 10})
+        e.links(humansList[0], humansList[9])
+        self.assertEqual(len(humansList[0].getOutEdges(rels)), 5)
+        e.delete()
+        self.assertEqual(len(humansList[0].getOutEdges(rels)), 4)
+
     # @unittest.skip("stand by")
     def test_graph(self):
         class Humans(Collection):
@@ -940,6 +1495,44 @@ class pyArangoTests(unittest.TestCase):
 
         # g.deleteEdge()
 
+    # @unittest.skip("stand by")
+    def test_graph_batch_creation(self):
+        class Humans(Collection):
+            _fields = {
+                "name" : Field()
+            }
+
+        class Friend(Edges):
+            _fields = {
+                "number" : Field()
+            }
+
+        class MyGraph(Graph):
+
+            _edgeDefinitions = (EdgeDefinition("Friend", fromCollections = ["Humans"], toCollections = ["Humans"]), )
+            _orphanedCollections = []
+
+        humans = self.db.createCollection("Humans")
+        rels = self.db.createCollection("Friend")
+        g = self.db.createGraph("MyGraph")
+
+        vertices = g.createVertices("Humans", [{"name" : "simba%d" % i} for i in range(25)], batchSize = 10)
+        self.assertEqual(len(vertices), 25)
+        self.assertEqual(humans.count(), 25)
+        self.assertEqual(vertices[3]["name"], "simba3")
+
+        edges = g.createEdges("Friend", [(vertices[0], v._id, {"number" : i}) for i, v in enumerate(vertices[1:])], batchSize = 10)
+        self.assertEqual(len(edges), 24)
+        self.assertEqual(len(vertices[0].getEdges(rels)), 24)
+        self.assertRaises(ValueError, g.createEdges, "Friend", [(vertices[0], "Friend/1", {})])
+        self.assertRaises(KeyError, g.createVertices, "Friend", [{}])
+        self.assertRaises(BulkOperationError, g.createVertices, "Humans", [{"_key" : vertices[0]._key}])
+
+        # dictionaries instead of documents
+        raw = g.createVertices("Humans", [{"name" : "nala"}], rawResults = True)
+        self.assertEqual(raw[0]["name"], "nala")
+        self.assertEqual(humans[raw[0]["_key"]]._id, raw[0]["_id"])
+
     # @unittest.skip("stand by")
     def test_traversal(self):
 
@@ -1069,6 +1662,33 @@ class pyArangoTests(unittest.TestCase):
     def test_transaction_exception(self):
         self.assertRaises(TransactionError, self.db.transaction, collections = {}, action = "function () { return value; }")
 
+    # @unittest.skip("stand by")
+    def test_stream_transaction(self):
+        users = self.db.createCollection(name = "users")
+        pets = self.db.createCollection(name = "pets")
+
+        with self.db.begin_transaction(write = ["users", pets]) as trx:
+            doc = trx["users"].createDocument({"name" : "Tesla"})
+            doc.save()
+            with BulkOperation(trx["pets"], batchSize = 10) as col:
+                for i in range(25):
+                    col.createDocument({"number" : i}).save()
+            self.assertEqual(users.count(), 0)
+            q = trx.AQLQuery("FOR p IN pets RETURN p", rawResults = True, count = True)
+            self.assertEqual(q.count, 25)
+        self.assertEqual(trx.status, "committed")
+        self.assertEqual(users.count(), 1)
+        self.assertEqual(pets.count(), 25)
+
+        try:
+            with self.db.begin_transaction(write = "users") as trx:
+                trx["users"].createDocument({"name" : "Edison"}).save()
+                raise ValueError("abort!")
+        except ValueError:
+            pass
+        self.assertEqual(trx.status, "aborted")
+        self.assertEqual(users.count(), 1)
+
     # @unittest.skip("stand by")
     def test_users_create_delete(self):
 
@@ -1152,6 +1772,44 @@ class pyArangoTests(unittest.TestCase):
 
         # Verify that the Connection session was created with the correct timeout
         assert connection.session.timeout == timeout
+
+    # @unittest.skip("stand by")
+    def test_metadata_lookups(self):
+        connection = Connection(arangoURL=ARANGODB_URL, username=ARANGODB_ROOT_USERNAME, password=ARANGODB_ROOT_PASSWORD, lazyMetadata=True, metadataMissTTL=60)
+        db = connection["test_db_2"]
+        self.assertEqual(db.collections, {})
+
+        self.db.createCollection(name = "users")
+        self.assertEqual(db["users"].name, "users")
+        self.assertEqual(list(db.collections.keys()), ["users"])
+
+        self.assertFalse(db.hasCollection("typo"))
+        self.db.createCollection(name = "typo")
+        # the miss is remembered for metadataMissTTL seconds
+        self.assertFalse(db.hasCollection("typo"))
+        db.reload()
+        self.assertTrue(db.hasCollection("typo"))
+
+        self.assertFalse("no_such_db" in connection)
+        with self.assertRaises(KeyError):
+            connection["no_such_db"]
+
+    # @unittest.skip("stand by")
+    def test_lazy_collection_handles(self):
+        col = self.db.createCollection(name = "users")
+        col.ensurePersistentIndex(["name"], name = "names")
+
+        db = self.conn["test_db_2"]
+        db.reload()
+        users = db["users"]
+        self.assertNotIn("indexes", users.__dict__)
+        self.assertEqual(users.getIndex("names").infos["fields"], ["name"])
+        self.assertEqual(len(users.indexes["persistent"]), 1)
+
+        with BulkOperation(users, batchSize = 10) as bulk:
+            bulk.createDocument({"name" : "Tesla"}).save()
+        self.assertEqual(users.count(), 1)
+        self.assertEqual(Collection._bulkCache, ())
             
 if __name__ == "__main__":
     # Change default username/password in bash like this:
@@ -0,0 +1,127 @@
+import unittest, json, time, threading
+from pyArango.collection import Collection
+from pyArango.writebehind import WriteBehind
+
+class StandInResponse(object):
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        return self.data
+
+class StandInSession(object):
+    """writes the documents it receives, after raising 'failures' transport errors"""
+    def __init__(self):
+        self.failures = 0
+        self.delay = 0
+        self.requests = []
+
+    def post(self, url, params = None, data = None):
+        time.sleep(self.delay)
+        if self.failures > 0:
+            self.failures -= 1
+            raise IOError("Connection reset by peer")
+        docs = json.loads(data)
+        self.requests.append(docs)
+        return StandInResponse(201, [{"_id" : "Users_writebehind/%d" % i, "_key" : str(i), "_rev" : "r"} for i in range(len(docs))])
+
+    put = post
+
+class StandInConnection(object):
+    writeBehind = None
+
+    def __init__(self):
+        self.session = StandInSession()
+
+class StandInDatabase(object):
+    name = "db"
+
+    def __init__(self):
+        self.connection = StandInConnection()
+
+    def getURL(self):
+        return "http://localhost:8529/_db/db/_api"
+
+class Users_writebehind(Collection):
+    pass
+
+class WriteBehindTests(unittest.TestCase):
+
+    def setUp(self):
+        self.db = StandInDatabase()
+        self.users = Users_writebehind(self.db, {"name" : "Users_writebehind", "type" : 2, "id" : "45"})
+        self.errors = []
+        self.writeBehind = WriteBehind(self.db.connection, flushInterval = 60, onError = lambda doc, error: self.errors.append(error))
+        self.db.connection.writeBehind = self.writeBehind
+
+    def tearDown(self):
+        self.writeBehind.stop()
+
+    def test_transport_errors(self):
+        self.db.connection.session.failures = 1
+        docs = [self.users.createDocument({"n" : i}) for i in range(3)]
+        for doc in docs:
+            doc.save()
+        self.writeBehind._wakeUp.set()
+        for i in range(100):
+            if len(self.errors) == 3:
+                break
+            time.sleep(0.01)
+        self.assertEqual([type(e) for e in self.errors], [IOError] * 3)
+        self.assertTrue(self.writeBehind._thread.is_alive())
+
+        for doc in docs:
+            doc.forceSave()
+        self.assertEqual(self.writeBehind.flush(), 3)
+        self.assertEqual(docs[0]._key, "0")
+
+    def test_saves_do_not_wait_for_flushes(self):
+        self.db.connection.session.delay = 0.2
+        doc = self.users.createDocument({"n" : 0})
+        doc.save()
+        flush = threading.Thread(target = self.writeBehind.flush)
+        flush.start()
+        time.sleep(0.05)
+
+        start = time.time()
+        self.users.createDocument({"n" : 1}).save()
+        self.assertLess(time.time() - start, 0.1)
+
+        # the insert in flight is waited for, the document is then replaced
+        doc["n"] = 2
+        doc.save()
+        self.assertEqual(self.writeBehind.pending[id(doc)][1], WriteBehind.REPLACE)
+        flush.join()
+
+    def test_on_error_saves_documents_of_the_failed_batch(self):
+        docs = [self.users.createDocument({"n" : i}) for i in range(2)]
+        def onError(doc, error):
+            self.errors.append(error)
+            # the other document of the batch is still in flight
+            docs[1]["n"] = 10
+            docs[1].save()
+        self.writeBehind.onError = onError
+        self.db.connection.session.failures = 1
+        for doc in docs:
+            doc.save()
+
+        flush = threading.Thread(target = self.writeBehind.flush)
+        flush.daemon = True
+        flush.start()
+        flush.join(2)
+        self.assertFalse(flush.is_alive())
+        self.assertEqual(len(self.errors), 2)
+        self.assertEqual(self.writeBehind.flush(), 1)
+        self.assertEqual(self.db.connection.session.requests[-1], [{"n" : 10}])
+
+    def test_deleting_a_buffered_insert(self):
+        doc = self.users.createDocument({"n" : 0})
+        doc.save()
+        doc.delete()
+        self.assertEqual(len(self.writeBehind), 0)
+        self.assertEqual(self.writeBehind.flush(), 0)
+        self.assertEqual(self.db.connection.session.requests, [])
+
+if __name__ == "__main__":
+    unittest.main()
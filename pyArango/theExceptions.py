@@ -59,6 +59,13 @@ class DeletionError(pyArangoException):
             errors = {}
         pyArangoException.__init__(self, message, errors)
 
+class PreconditionFailedError(UpdateError, DeletionError):
+    """Raised when a document is written with checkRev = True but its revision in the database is not the one of the document anymore"""
+    def __init__(self, message, errors = None):
+        if errors is None:
+            errors = {}
+        pyArangoException.__init__(self, message, errors)
+
 class TraversalError(pyArangoException):
     """Something went wrong when doing a graph traversal"""
     def __init__(self, message, errors = None):
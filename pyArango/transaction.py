@@ -0,0 +1,163 @@
+import copy
+import json
+
+from .theExceptions import TransactionError
+
+__all__ = ["Transaction", "TransactionSession", "TransactionConnection", "TransactionCollections"]
+
+class TransactionSession(object):
+    """Wraps a session so that every request it makes carries the 'x-arango-trx-id' header of a stream transaction"""
+
+    def __init__(self, session, transactionId):
+        self.session = session
+        self.transactionId = transactionId
+
+    def __getattr__(self, request_function_name):
+        request_function = getattr(self.session, request_function_name)
+        transactionId = self.transactionId
+        def request(*args, **kwargs):
+            headers = dict(kwargs.get("headers") or {})
+            headers["x-arango-trx-id"] = transactionId
+            kwargs["headers"] = headers
+            return request_function(*args, **kwargs)
+        return request
+
+class TransactionConnection(object):
+    """A stand-in for a connection that makes all requests within a stream transaction. Everything else is read from the real connection"""
+
+    def __init__(self, connection, transactionId):
+        self.connection = connection
+        self.session = TransactionSession(connection.session, transactionId)
+        # writes must go through the transaction, never through a write-behind buffer
+        self.writeBehind = None
+
+    def __getattr__(self, k):
+        return getattr(self.connection, k)
+
+class Transaction(object):
+    """A stream transaction, meant to be started by Database.begin_transaction() and used as a context manager::
+
+        with db.begin_transaction(write = ["users", "pets"]) as trx:
+            doc = trx["users"].createDocument({"name": "Tesla"})
+            doc.save()
+            with BulkOperation(trx["pets"], batchSize = 500) as pets:
+                ...
+            trx.AQLQuery("FOR u IN users UPDATE u WITH {seen: true} IN users")
+
+    The transaction is commited when the block exits normally and aborted if it raises. Collections, documents and queries
+    obtained through the transaction make all their requests within it. Document caches are not used inside transactions."""
+
+    def __init__(self, database, read = None, write = None, exclusive = None, waitForSync = False, allowImplicit = True, lockTimeout = None, maxTransactionSize = None):
+        self.database = database
+        self.collections = {
+            "read": _collectionNames(read),
+            "write": _collectionNames(write),
+            "exclusive": _collectionNames(exclusive),
+        }
+
+        payload = {"collections": self.collections, "waitForSync": waitForSync, "allowImplicit": allowImplicit}
+        if lockTimeout is not None:
+            payload["lockTimeout"] = lockTimeout
+        if maxTransactionSize is not None:
+            payload["maxTransactionSize"] = maxTransactionSize
+
+        r = database.connection.session.post("%s/begin" % database.getTransactionURL(), data = json.dumps(payload, default=str))
+        data = r.json()
+        if r.status_code != 201 or data.get("error"):
+            raise TransactionError(data.get("errorMessage", "Unable to begin the transaction"), "begin", data)
+
+        self.id = data["result"]["id"]
+        self.status = data["result"]["status"]
+        self.connection = TransactionConnection(database.connection, self.id)
+
+        try:
+            # the loading of a DBHandle must be triggered before copying it
+            database.collections
+            self.db = copy.copy(database)
+            self.db.connection = self.connection
+            self.db.collections = TransactionCollections(self)
+            for names in self.collections.values():
+                for name in names:
+                    self[name]
+        except Exception:
+            # the transaction is already open on the server, it must not keep its locks until it times out
+            try:
+                self.abort()
+            except Exception:
+                pass
+            raise
+
+    def getURL(self):
+        return "%s/%s" % (self.database.getTransactionURL(), self.id)
+
+    def _end(self, action, method):
+        r = getattr(self.database.connection.session, method)(self.getURL())
+        data = r.json()
+        if r.status_code != 200 or data.get("error"):
+            raise TransactionError(data.get("errorMessage", "Unable to %s the transaction" % action), action, data)
+        self.status = data["result"]["status"]
+
+    def commit(self):
+        """commits the transaction"""
+        self._end("commit", "put")
+
+    def abort(self):
+        """aborts the transaction"""
+        self._end("abort", "delete")
+
+    def getStatus(self):
+        """fetches the status of the transaction from the server: 'running', 'committed' or 'aborted'"""
+        r = self.database.connection.session.get(self.getURL())
+        data = r.json()
+        if r.status_code != 200 or data.get("error"):
+            raise TransactionError(data.get("errorMessage", "Unable to get the transaction status"), "status", data)
+        self.status = data["result"]["status"]
+        return self.status
+
+    def AQLQuery(self, query, **kwargs):
+        """runs an AQL query within the transaction, takes the same arguments as Database.AQLQuery()"""
+        return self.db.AQLQuery(query, **kwargs)
+
+    def __getitem__(self, name):
+        """returns a handle on the collection 'name' that makes all its requests within the transaction"""
+        return self.db.collections[name]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exceptionType, exceptionValue, traceback):
+        if self.status != "running":
+            return False
+        if exceptionType is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+    def __repr__(self):
+        return "ArangoDB stream transaction: %s, status: %s" % (self.id, self.status)
+
+class TransactionCollections(dict):
+    """The collections of a database as seen from within a transaction, they are bound to it on first access"""
+
+    def __init__(self, transaction):
+        dict.__init__(self)
+        self.transaction = transaction
+
+    def __missing__(self, name):
+        collection = copy.copy(self.transaction.database[name])
+        collection.database = self.transaction.db
+        collection.connection = self.transaction.connection
+        collection.documentCache = None
+        collection.missCache = None
+        collection._isBulkInProgress = False
+        collection._bulkCache = []
+        self[name] = collection
+        return collection
+
+def _collectionNames(collections):
+    if collections is None:
+        return []
+    if isinstance(collections, str) or hasattr(collections, "name"):
+        collections = [collections]
+    return [getattr(c, "name", c) for c in collections]
@@ -0,0 +1,147 @@
+import threading
+import time
+
+__all__ = ["CacheWarmUp"]
+
+class CacheWarmUp(object):
+    """Loads documents into the cache of a collection ahead of the requests that will read them, meant to be created by Collection.warmCache().
+
+    The documents are either those of 'keys', fetched 'batchSize' keys per request, or the results of the AQL 'query' (with 'bindVars'),
+    or by default the whole collection. Query results are read through a streaming cursor, 'batchSize' documents at a time, and must be whole
+    documents of the collection: projections would be cached as if they were. At most 'limit' documents are loaded, by default as many as the cache holds.
+
+    run() loads the documents, start() does it in a background thread: wait() then blocks until it is done and raises its error if it failed.
+    onProgress(warmUp) is called after every batch, progress() returns the figures of the warm-up."""
+
+    def __init__(self, collection, keys = None, query = None, bindVars = None, limit = None, batchSize = 1000, onProgress = None):
+        if collection.documentCache is None:
+            raise ValueError("The cache of collection %s is not active, call activateCache() first" % collection.name)
+        if keys is not None and query is not None:
+            raise ValueError("Either keys or a query can be given, not both")
+
+        self.collection = collection
+        self.keys = keys
+        self.query = query
+        self.bindVars = bindVars
+        if limit is None:
+            limit = getattr(collection.documentCache, "cacheSize", None)
+        self.limit = limit
+        self.batchSize = batchSize
+        self.onProgress = onProgress
+
+        self.total = None
+        self.loaded = 0
+        self.batches = 0
+        self.startTime = None
+        self.endTime = None
+        self.done = False
+        self.error = None
+        self._thread = None
+
+    def run(self):
+        """loads the documents into the cache. Returns the warm-up"""
+        self.startTime = time.time()
+        try:
+            if self.keys is not None:
+                self._loadKeys()
+            else:
+                self._loadQuery()
+        except Exception as e:
+            self.error = e
+            raise
+        finally:
+            self.endTime = time.time()
+            self.done = True
+        return self
+
+    def start(self):
+        """runs the warm-up in a background thread. Returns the warm-up"""
+        def run():
+            try:
+                self.run()
+            except Exception:
+                # kept in self.error for wait()
+                pass
+        self._thread = threading.Thread(target = run, name = "pyArango-warm-up-%s" % self.collection.name)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def wait(self, timeout = None):
+        """waits for a warm-up started with start() and raises its error if it failed. Returns True if it is done"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.done
+
+    def _batchLoaded(self, nbDocuments):
+        self.loaded += nbDocuments
+        self.batches += 1
+        if self.onProgress is not None:
+            self.onProgress(self)
+
+    def _loadKeys(self):
+        keys = list(self.keys)
+        if self.limit is not None:
+            keys = keys[:self.limit]
+        self.total = len(keys)
+        for i in range(0, len(keys), self.batchSize):
+            docs = self.collection.fetchDocuments(keys[i:i+self.batchSize], batchSize = self.batchSize)
+            self._batchLoaded(sum(1 for d in docs if d is not None))
+
+    def _loadQuery(self):
+        collection = self.collection
+        bindVars = dict(self.bindVars or {})
+        if self.query is None:
+            bindVars["@collection"] = collection.name
+            self.total = collection.count()
+            if self.limit is None:
+                query = "FOR d IN @@collection RETURN d"
+            else:
+                query = "FOR d IN @@collection LIMIT @limit RETURN d"
+                bindVars["limit"] = self.limit
+                self.total = min(self.total, self.limit)
+        else:
+            query = self.query
+            if "@@collection" in query:
+                bindVars.setdefault("@collection", collection.name)
+            self.total = self.limit
+
+        cursor = collection.database.AQLQuery(query, bindVars = bindVars, batchSize = self.batchSize, rawResults = True, options = {"stream" : True})
+        nbDocuments = 0
+        for docJson in cursor:
+            if self.limit is not None and self.loaded + nbDocuments >= self.limit:
+                break
+            if not isinstance(docJson, dict) or "_key" not in docJson:
+                raise ValueError("The warm-up query of collection %s must return documents, got: %s" % (collection.name, docJson))
+            collection.documentCache.cache(collection.documentClass(collection, docJson, on_load_validation = collection._validation["on_load"]))
+            nbDocuments += 1
+            if nbDocuments == self.batchSize:
+                self._batchLoaded(nbDocuments)
+                nbDocuments = 0
+        if nbDocuments > 0:
+            self._batchLoaded(nbDocuments)
+
+        if cursor.response.get("hasMore") and cursor.cursor is not None:
+            # the limit was reached before the end of the results
+            collection.connection.session.delete(cursor.cursor.getURL())
+
+    def progress(self):
+        """returns a dictionary with the figures of the warm-up so far"""
+        res = {"loaded": self.loaded, "total": self.total, "batches": self.batches, "done": self.done, "error": self.error}
+        if self.total:
+            res["fraction"] = float(self.loaded) / self.total
+        else:
+            res["fraction"] = None
+
+        elapsed = 0
+        if self.startTime is not None:
+            elapsed = (self.endTime or time.time()) - self.startTime
+        res["elapsed"] = elapsed
+        if elapsed > 0:
+            res["documentsPerSecond"] = self.loaded / elapsed
+        return res
+
+    def __repr__(self):
+        return "<CacheWarmUp of %s, loaded: %s/%s, done: %s>" % (self.collection.name, self.loaded, self.total, self.done)
@@ -0,0 +1,261 @@
+import json
+import threading
+
+from .theExceptions import ArangoError, UpdateError, BulkOperationError
+
+__all__ = ["WriteBehind"]
+
+class WriteBehind(object):
+    """Buffers the Document.save(), patch() and delete() calls made through a connection and sends them to ArangoDB in batches:
+    one request per collection, operation and set of parameters. WriteBehinds are meant to be created by Connection.activateWriteBehind().
+
+    Buffers are flushed by a background thread every 'flushInterval' seconds, or as soon as one of them holds 'batchSize' documents.
+    Within a flush, inserts are sent first, then replacements, updates and deletions. A document is never buffered twice:
+    saving or patching it again before the flush merges the new values into the pending write.
+
+    Buffers are swapped out before being sent, saving documents does not wait for a flush in progress, except for the documents it is writing.
+    Deleting a document whose insert is still buffered drops the insert, nothing is sent.
+    Failed writes, including those of batches whose request failed, are reported by calling onError(document, error). If no callback was given,
+    they are kept and raised as a BulkOperationError by the next call to flush() or barrier()."""
+
+    INSERT = "insert"
+    REPLACE = "replace"
+    UPDATE = "update"
+    DELETE = "delete"
+
+    OPERATIONS = (INSERT, REPLACE, UPDATE, DELETE)
+
+    def __init__(self, connection, batchSize = 1000, flushInterval = 1, onError = None):
+        self.connection = connection
+        self.batchSize = batchSize
+        self.flushInterval = flushInterval
+        self.onError = onError
+
+        self.lock = threading.RLock()
+        # held while sending, flushes happen one at a time and in order
+        self.flushLock = threading.Lock()
+        # the thread that holds flushLock, its onError calls must not wait for it
+        self.flushingThread = None
+        self.buffers = {}
+        self.pending = {}
+        # the ids of the documents being sent, their next write waits for the flush to end
+        self.inFlight = set()
+        self.failures = []
+
+        self._wakeUp = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target = self._run, name = "pyArango-write-behind")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeUp.wait(self.flushInterval)
+            self._wakeUp.clear()
+            try:
+                self._flush()
+            except Exception as e:
+                # raised by onError, the thread must keep flushing
+                with self.lock:
+                    self.failures.append((None, e))
+
+    def save(self, document, payload, params):
+        """buffers an insert if the document has never been saved, a replacement otherwise"""
+        if document._id is None:
+            self._buffer(document, self.INSERT, payload, params)
+        else:
+            self._buffer(document, self.REPLACE, payload, params)
+
+    def patch(self, document, payload, params):
+        """buffers an update of the document with the patches in payload"""
+        self._buffer(document, self.UPDATE, payload, params)
+
+    def delete(self, document, params):
+        """buffers the deletion of the document. As with a direct deletion, the document is reset right away"""
+        self._buffer(document, self.DELETE, None, params)
+
+    def _buffer(self, document, operation, payload, params):
+        params = dict(params)
+        params.pop("collection", None)
+
+        while True:
+            with self.lock:
+                if id(document) not in self.inFlight or self.flushingThread == threading.current_thread().ident:
+                    # writes of the flushing thread go to the next flush, whose inserts of saved documents become replacements
+                    self._bufferLocked(document, operation, payload, params)
+                    return
+            # an insert in flight must not be sent a second time
+            with self.flushLock:
+                pass
+
+    def _bufferLocked(self, document, operation, payload, params):
+        if operation == self.INSERT and document._id is not None:
+            # it was inserted by the flush that was waited for
+            operation = self.REPLACE
+        previous = self.pending.pop(id(document), None)
+        if previous is not None:
+            _, prevPayload, prevParams = self.buffers[previous].pop(id(document))
+            prevOperation = previous[1]
+            if operation == self.UPDATE:
+                if prevOperation == self.UPDATE:
+                    payload = _mergePatches(prevPayload, payload)
+                else:
+                    operation, payload = prevOperation, document._store.getStore()
+                params = dict(prevParams, **params)
+            elif operation == self.REPLACE and prevOperation == self.INSERT:
+                operation = self.INSERT
+            elif operation == self.DELETE and prevOperation == self.INSERT:
+                document.reset(document.collection)
+                return
+
+        group = (document.collection, operation, tuple(sorted(params.items())))
+        entries = self.buffers.setdefault(group, {})
+        if operation == self.DELETE:
+            if params.get("ignoreRevs") is False:
+                entries[document._key] = (document, {"_key": document._key, "_rev": document._rev}, params)
+            else:
+                entries[document._key] = (document, document._key, params)
+            document.reset(document.collection)
+        else:
+            if document._key is not None:
+                payload["_key"] = document._key
+            entries[id(document)] = (document, payload, params)
+            self.pending[id(document)] = group
+            document.modified = False
+
+        if len(entries) >= self.batchSize:
+            self._wakeUp.set()
+
+    def isPending(self, document):
+        """returns True if a write of the document is buffered"""
+        with self.lock:
+            return id(document) in self.pending
+
+    def __len__(self):
+        """returns the number of buffered writes"""
+        return len(self.pending)
+
+    def flush(self):
+        """sends all buffered writes now. Returns the number of documents written"""
+        nbWritten = self._flush()
+        self._raiseFailures()
+        return nbWritten
+
+    def barrier(self):
+        """a durability barrier: sends all buffered writes with waitForSync = True and returns once ArangoDB has synced them to disk"""
+        nbWritten = self._flush(waitForSync = True)
+        self._raiseFailures()
+        return nbWritten
+
+    def stop(self):
+        """flushes the buffers and stops the background thread"""
+        self._stopped = True
+        self._wakeUp.set()
+        self._thread.join()
+        return self.flush()
+
+    def _raiseFailures(self):
+        with self.lock:
+            failures, self.failures = self.failures, []
+
+        if len(failures) > 0:
+            bulkError = BulkOperationError("%d buffered writes failed" % len(failures))
+            for document, error in failures:
+                bulkError.addBulkError(error, document)
+            raise bulkError
+
+    def _flush(self, waitForSync = False):
+        nbWritten = 0
+        with self.flushLock:
+            self.flushingThread = threading.current_thread().ident
+            with self.lock:
+                buffers, self.buffers = self.buffers, {}
+                self.pending = {}
+                for group, entries in list(buffers.items()):
+                    for k, (document, payload, params) in list(entries.items()):
+                        self.inFlight.add(id(document))
+                        if group[1] == self.INSERT and document._id is not None:
+                            # saved again by onError while its insert was in flight
+                            del entries[k]
+                            payload["_key"] = document._key
+                            buffers.setdefault((group[0], self.REPLACE, group[2]), {})[k] = (document, payload, params)
+            try:
+                for operation in self.OPERATIONS:
+                    for group in [g for g in buffers if g[1] == operation]:
+                        entries = list(buffers[group].values())
+                        for i in range(0, len(entries), self.batchSize):
+                            batch = entries[i:i+self.batchSize]
+                            try:
+                                nbWritten += self._send(group[0], operation, batch, waitForSync)
+                            except Exception as e:
+                                for document, _, _ in batch:
+                                    self._fail(document, e)
+                            finally:
+                                with self.lock:
+                                    for document, _, _ in batch:
+                                        self.inFlight.discard(id(document))
+            finally:
+                with self.lock:
+                    self.inFlight.clear()
+                self.flushingThread = None
+        return nbWritten
+
+    def _send(self, collection, operation, entries, waitForSync):
+        params = dict(entries[0][2])
+        if waitForSync:
+            params["waitForSync"] = True
+
+        url = "%s/%s" % (collection.getDocumentsURL(), collection.name)
+        session = self.connection.session
+        payload = json.dumps([p for _, p, _ in entries], default=str)
+        if operation == self.INSERT:
+            r = session.post(url, params = params, data = payload)
+        elif operation == self.REPLACE:
+            r = session.put(url, params = params, data = payload)
+        elif operation == self.UPDATE:
+            r = session.patch(url, params = params, data = payload)
+        else:
+            r = session.delete(url, params = params, data = payload)
+
+        data = r.json()
+        if r.status_code >= 400 or not isinstance(data, list):
+            error = UpdateError("Unable to %s documents in collection %s" % (operation, collection.name), data)
+            for document, _, _ in entries:
+                self._fail(document, error)
+            return 0
+
+        nbWritten = 0
+        for (document, _, _), res in zip(entries, data):
+            if res.get("error"):
+                self._fail(document, ArangoError(res))
+            else:
+                if operation == self.INSERT:
+                    document.setPrivates(res)
+                elif operation != self.DELETE:
+                    document._rev = res["_rev"]
+                if operation == self.DELETE:
+                    collection._documentDeleted(res["_key"])
+                else:
+                    collection._documentWritten(document)
+                nbWritten += 1
+        return nbWritten
+
+    def _fail(self, document, error):
+        with self.lock:
+            # onError can save the document again
+            self.inFlight.discard(id(document))
+        if document._id is not None:
+            document.modified = True
+        if self.onError is not None:
+            self.onError(document, error)
+        else:
+            self.failures.append((document, error))
+
+def _mergePatches(old, new):
+    res = dict(old)
+    for k, v in new.items():
+        if isinstance(v, dict) and isinstance(res.get(k), dict):
+            res[k] = _mergePatches(res[k], v)
+        else:
+            res[k] = v
+    return res